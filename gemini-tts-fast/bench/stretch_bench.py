@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+变速基准: 进程内 WSOLA（tts_stretch）对比 ffmpeg atempo
+
+用合成的类语音信号（带谐波和音节包络的基频 + 少量噪声）测量 5 秒到 5 分钟
+片段的变速耗时，不需要 API Key。未安装 ffmpeg 时只测 native。
+
+Usage:
+    python bench/stretch_bench.py [--speed 1.2] [--durations 5,30,60,300] [--repeat 3] [--json out.json]
+"""
+
+import sys
+import json
+import time
+import shutil
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from gemini_tts import SAMPLE_RATE, ffmpeg_atempo
+from tts_stretch import time_stretch
+
+def speech_like(seconds, sample_rate=SAMPLE_RATE, seed=0):
+    """生成类语音的 s16le PCM: 缓慢滑动的基频 + 谐波 + 4Hz 音节包络"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 0.5
+    signal = 6000 * voice * envelope + 200 * rng.standard_normal(len(t))
+    return np.clip(signal, -32768, 32767).astype('<i2').tobytes()
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description='变速基准: native WSOLA vs ffmpeg atempo')
+    parser.add_argument('--speed', type=float, default=1.2, help='速度倍数（默认: 1.2）')
+    parser.add_argument('--durations', default='5,30,60,300', help='片段时长（秒），逗号分隔（默认: 5,30,60,300）')
+    parser.add_argument('--repeat', type=int, default=3, help='每项重复次数，取最快一次（默认: 3）')
+    parser.add_argument('--json', help='把结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    has_ffmpeg = shutil.which('ffmpeg') is not None
+    if not has_ffmpeg:
+        print("提示: 未找到 ffmpeg，只测量 native", file=sys.stderr)
+
+    results = []
+    print(f"{'时长':>8} {'native':>10} {'ffmpeg':>10} {'加速比':>8}")
+    for seconds in (float(d) for d in args.durations.split(',')):
+        pcm = speech_like(seconds)
+        native = best_of(lambda: time_stretch(pcm, args.speed, SAMPLE_RATE), args.repeat)
+        ffmpeg = best_of(lambda: ffmpeg_atempo(pcm, args.speed), args.repeat) if has_ffmpeg else None
+        results.append({
+            'seconds': seconds,
+            'speed': args.speed,
+            'native_s': round(native, 4),
+            'ffmpeg_s': round(ffmpeg, 4) if ffmpeg is not None else None,
+        })
+        ratio = f"{ffmpeg / native:.2f}x" if ffmpeg else '-'
+        ffmpeg_text = f"{ffmpeg * 1000:.1f}ms" if ffmpeg else '-'
+        print(f"{seconds:>7g}s {native * 1000:>8.1f}ms {ffmpeg_text:>10} {ratio:>8}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2) + '\n', encoding='utf-8')
+
+if __name__ == '__main__':
+    main()
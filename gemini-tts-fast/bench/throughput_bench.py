@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+吞吐量基准: 针对本地替身服务测量 tts_cli.py 的单条、批量和流式模式
+
+每个场景都以子进程方式运行真实的 CLI（包含解释器启动和 SDK 导入），指向
+进程内启动的 tts_mock_server，不消耗 API 配额、不需要网络。记录:
+  clips/sec、每段延迟的 p50/p95/p99、流式首字节时间、子进程峰值 RSS。
+
+结果写入 JSON（默认 bench/results/throughput-<时间戳>.json）；--compare 与基线
+对比，任一指标劣化超过 --tolerance 时退出码为 1，可用于回归检查。
+
+Usage:
+    python bench/throughput_bench.py [--profile fast] [--clips 20] [--workers 4] [--compare baseline.json]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import datetime, timezone
+
+BENCH_DIR = Path(__file__).resolve().parent
+SKILL_DIR = BENCH_DIR.parent
+CLI = SKILL_DIR / 'tts_cli.py'
+sys.path.insert(0, str(SKILL_DIR))
+import tts_mock_server
+
+SENTENCES = [
+    "Solar panels pay for themselves in six to eight years.",
+    "Modern panels come with twenty-five year performance warranties.",
+    "Installation typically takes one long weekend.",
+    "太阳能板通常六到八年就能收回成本。",
+    "Homes with solar sell faster and for more money.",
+]
+
+# 越大越差的指标；clips_per_s 越小越差
+LOWER_IS_BETTER = ('p50_ms', 'p95_ms', 'p99_ms', 'ttfb_p50_ms', 'peak_rss_mb')
+HIGHER_IS_BETTER = ('clips_per_s',)
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(p / 100 * len(values)))], 1)
+
+def run_cli(args, env):
+    """运行一次 CLI，返回 (耗时秒, 输出文本, 峰值 RSS MB, 退出码)"""
+    with tempfile.TemporaryFile() as out:
+        started = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, str(CLI), *args], stdout=out, stderr=subprocess.STDOUT, env=env)
+        _, status, usage = os.wait4(proc.pid, 0)
+        elapsed = time.perf_counter() - started
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        out.seek(0)
+        text = out.read().decode('utf-8', errors='replace')
+    # Linux 上 ru_maxrss 单位为 KB，macOS 为字节
+    rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return elapsed, text, rss_mb, proc.returncode
+
+def texts(count):
+    return [f"{SENTENCES[i % len(SENTENCES)]} ({i})" for i in range(count)]
+
+def bench_single(count, env, work_dir, common):
+    latencies, rss, failures = [], [], 0
+    started = time.perf_counter()
+    for index, text in enumerate(texts(count)):
+        elapsed, _, rss_mb, code = run_cli([text, '-o', str(work_dir / f'single-{index}.wav'), *common], env)
+        latencies.append(elapsed * 1000)
+        rss.append(rss_mb)
+        failures += code != 0
+    wall = time.perf_counter() - started
+    return summarize(count, wall, latencies, rss, failures)
+
+def bench_stream(count, env, work_dir, common):
+    latencies, ttfb, rss, failures = [], [], [], 0
+    started = time.perf_counter()
+    for index, text in enumerate(texts(count)):
+        elapsed, output, rss_mb, code = run_cli(
+            [text, '-o', str(work_dir / f'stream-{index}.wav'), '--stream', *common], env)
+        latencies.append(elapsed * 1000)
+        rss.append(rss_mb)
+        failures += code != 0
+        match = re.search(r'首字节: (\d+)ms', output)
+        if match:
+            ttfb.append(float(match.group(1)))
+    wall = time.perf_counter() - started
+    result = summarize(count, wall, latencies, rss, failures)
+    result['ttfb_p50_ms'] = percentile(ttfb, 50)
+    result['ttfb_p95_ms'] = percentile(ttfb, 95)
+    return result
+
+def bench_batch(count, workers, env, work_dir, common):
+    jobs_path = work_dir / 'jobs.ndjson'
+    with jobs_path.open('w', encoding='utf-8') as f:
+        for index, text in enumerate(texts(count)):
+            f.write(json.dumps({'id': f'clip-{index}', 'text': text}, ensure_ascii=False) + '\n')
+    out_dir = work_dir / 'batch'
+    elapsed, _, rss_mb, code = run_cli(
+        ['--batch', str(jobs_path), '--out-dir', str(out_dir), '--workers', str(workers), *common], env)
+    report_path = out_dir / 'batch-report.json'
+    report = json.loads(report_path.read_text(encoding='utf-8')) if report_path.exists() else {'jobs': []}
+    latencies = [job['seconds'] * 1000 for job in report['jobs']]
+    failures = sum(1 for job in report['jobs'] if job['status'] != 'ok') if report['jobs'] else count
+    result = summarize(count, elapsed, latencies, [rss_mb], failures)
+    result['workers'] = workers
+    return result
+
+def summarize(count, wall, latencies, rss, failures):
+    return {
+        'clips': count,
+        'failed': failures,
+        'wall_s': round(wall, 3),
+        'clips_per_s': round(count / wall, 3) if wall else None,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'peak_rss_mb': round(max(rss), 1) if rss else None,
+    }
+
+def compare(current, baseline, tolerance):
+    """逐项对比，返回劣化超过 tolerance 的条目列表"""
+    regressions = []
+    for scenario, metrics in current['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(scenario)
+        if not base:
+            continue
+        for name in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            new, old = metrics.get(name), base.get(name)
+            if not new or not old:
+                continue
+            change = (new - old) / old
+            worse = change > tolerance if name in LOWER_IS_BETTER else change < -tolerance
+            flag = '  ← 劣化' if worse else ''
+            print(f"  {scenario:>6}.{name:<12} {old:>10} → {new:>10} ({change:+.1%}){flag}")
+            if worse:
+                regressions.append(f"{scenario}.{name}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='tts_cli.py 吞吐量基准（本地替身服务）')
+    parser.add_argument('--profile', default='fast', choices=sorted(tts_mock_server.PROFILES),
+                        help='替身服务的延迟/错误配置（默认: fast）')
+    parser.add_argument('--latency-ms', type=float, help='覆盖替身服务的基础延迟')
+    parser.add_argument('--error-rate', type=float, help='覆盖替身服务的错误率')
+    parser.add_argument('--clips', type=int, default=20, help='每个场景的片段数（默认: 20）')
+    parser.add_argument('--workers', type=int, default=4, help='批量模式并发数（默认: 4）')
+    parser.add_argument('--speed', type=float, default=1.2, help='速度倍数（默认: 1.2）')
+    parser.add_argument('--scenarios', default='single,batch,stream', help='要运行的场景，逗号分隔')
+    parser.add_argument('--seed', type=int, default=0, help='替身服务随机种子（默认: 0）')
+    parser.add_argument('--out', help='结果 JSON 路径（默认: bench/results/throughput-<时间戳>.json）')
+    parser.add_argument('--compare', metavar='BASELINE', help='与基线结果 JSON 对比')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='允许的劣化比例（默认: 0.15）')
+    args = parser.parse_args()
+
+    server = tts_mock_server.start(profile=args.profile, seed=args.seed,
+                                   latency_ms=args.latency_ms, error_rate=args.error_rate)
+    env = dict(os.environ, GOOGLE_API_KEY=os.getenv('GOOGLE_API_KEY', 'bench'), GEMINI_TTS_ENDPOINT=server.endpoint)
+    # 替身服务的音频不是真实语速，不能写入 --predict 使用的合成历史
+    common = ['--speed', str(args.speed), '--no-cache', '--no-daemon', '--no-history']
+    print(f"[吞吐量基准] 替身服务 {server.endpoint} profile={args.profile} clips={args.clips}", file=sys.stderr)
+
+    scenarios = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        for name in args.scenarios.split(','):
+            name = name.strip()
+            print(f"  运行 {name}...", file=sys.stderr)
+            if name == 'single':
+                scenarios[name] = bench_single(args.clips, env, work_dir, common)
+            elif name == 'batch':
+                scenarios[name] = bench_batch(args.clips, args.workers, env, work_dir, common)
+            elif name == 'stream':
+                scenarios[name] = bench_stream(args.clips, env, work_dir, common)
+            else:
+                parser.error(f"未知场景: {name}")
+    server.shutdown()
+
+    result = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'profile': args.profile,
+        'mock': server.profile,
+        'clips': args.clips,
+        'speed': args.speed,
+        'python': sys.version.split()[0],
+        'scenarios': scenarios,
+    }
+
+    print(f"\n{'场景':<8} {'clips/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'RSS MB':>8} {'失败':>4}")
+    for name, m in scenarios.items():
+        print(f"{name:<8} {m['clips_per_s']:>8} {m['p50_ms']:>8} {m['p95_ms']:>8} {m['p99_ms']:>8} "
+              f"{m['peak_rss_mb']:>8} {m['failed']:>4}")
+
+    out_path = Path(args.out) if args.out else (
+        BENCH_DIR / 'results' / f"throughput-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(json.dumps(result, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+    print(f"\n结果: {out_path}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        print(f"\n对比基线 {args.compare}:")
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print(f"劣化: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
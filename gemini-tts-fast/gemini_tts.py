@@ -0,0 +1,611 @@
+#!/usr/bin/env python3
+"""
+Gemini TTS 库接口
+
+供编排脚本在进程内直接调用，无需启动 tts_cli.py 子进程再从磁盘读回文件:
+
+    from gemini_tts import Synthesizer
+
+    with Synthesizer(speed=1.2, voice='Kore') as tts:
+        audio = tts.synthesize("Hello world")
+        audio.pcm            # s16le 单声道 PCM 字节
+        audio.to_numpy()     # int16 数组（需要 numpy）
+        audio.sample_rate, audio.duration, audio.latency
+
+    async with AsyncSynthesizer(speed=1.2) as tts:
+        clips = await tts.synthesize_many(["第一段", "第二段"], concurrency=4)
+
+Synthesizer 持有同一个 genai.Client（首次需要调用 API 时才创建）、音频缓存、
+重试/对冲策略和后处理链，可在多个线程间共享。出错时抛出异常，不打印、不退出
+进程；tts_cli.py 是它之上的命令行包装。
+"""
+
+import asyncio
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from tts_cache import AudioCache, cache_key
+from tts_chunk import chunk_text, stitch
+from tts_dialogue import group_lines, group_request, silence, split_turns
+from tts_encode import write_wav
+from tts_retry import ResilientCaller, RetryPolicy
+try:
+    import tts_stretch  # 依赖 numpy
+    import tts_post
+except ImportError:
+    tts_stretch = tts_post = None
+
+# google.genai 在首次需要调用 API 时才导入：走守护进程或命中缓存时无需加载 SDK
+
+MODEL = 'gemini-2.5-pro-preview-tts'
+
+# Gemini TTS 输出格式: 24kHz, 单声道, 16-bit little-endian PCM
+SAMPLE_RATE = 24000
+CHANNELS = 1
+SAMPLE_WIDTH = 2
+
+VOICES = ['Puck', 'Charon', 'Kore', 'Fenrir', 'Aoede']
+
+# 变速实现: native 为进程内 WSOLA（需要 numpy），ffmpeg 为 atempo 滤镜，auto 优先 native
+STRETCH_BACKENDS = ['auto', 'native', 'ffmpeg']
+
+def _note(log, message):
+    """进度信息: log 为 None 时（库调用的默认值）不输出"""
+    if log is not None:
+        print(message, file=log)
+
+def stretch_backend(backend='auto'):
+    """实际使用的变速实现: auto 在安装了 numpy 时为 native，否则为 ffmpeg"""
+    if backend == 'auto':
+        return 'native' if tts_stretch is not None else 'ffmpeg'
+    return backend
+
+def change_speed(pcm, speed, backend='auto'):
+    """
+    调整语速（保持音高），返回变速后的原始 PCM 数据（格式不变）
+
+    backend 为 auto 时，安装了 numpy 就在进程内完成，否则使用 ffmpeg。
+    """
+    if stretch_backend(backend) == 'native':
+        if tts_stretch is None:
+            raise RuntimeError("native 变速需要 numpy，请运行: pip install numpy")
+        return tts_stretch.time_stretch(pcm, speed, SAMPLE_RATE)
+    return ffmpeg_atempo(pcm, speed)
+
+def ffmpeg_atempo(pcm, speed):
+    """
+    使用 ffmpeg atempo 滤镜调整语速
+
+    PCM 通过 stdin 以 memoryview 传入，结果从 stdout 读回，全程不落盘。
+    返回变速后的原始 PCM 数据（格式不变）。
+    """
+    ffmpeg_cmd = [
+        'ffmpeg',
+        '-loglevel', 'error',
+        '-f', 's16le',          # 输入格式: 16-bit little-endian PCM
+        '-ar', str(SAMPLE_RATE),  # 采样率: 24kHz
+        '-ac', str(CHANNELS),     # 通道数: 单声道
+        '-i', 'pipe:0',         # 从 stdin 读取
+        '-filter:a', f'atempo={speed}',
+        '-f', 's16le',          # 输出同样是原始 PCM
+        '-ar', str(SAMPLE_RATE),
+        '-ac', str(CHANNELS),
+        'pipe:1',               # 写到 stdout
+    ]
+    result = subprocess.run(ffmpeg_cmd, input=memoryview(pcm), capture_output=True, check=True)
+    return result.stdout
+
+def extract_pcm(response):
+    """从 generate_content 响应（或流式响应的一个分块）中取出第一段音频数据"""
+    if response and response.candidates:
+        for candidate in response.candidates:
+            if not candidate.content or not candidate.content.parts:
+                continue
+            for part in candidate.content.parts:
+                if hasattr(part, 'inline_data') and part.inline_data:
+                    return part.inline_data.data
+    return None
+
+def create_client(api_key, endpoint=None):
+    """
+    创建 genai.Client（延迟导入 google.genai）
+
+    指定 endpoint 或设置了 GEMINI_TTS_ENDPOINT 时（如本地替身服务 tts_mock_server.py）改用该地址。
+    """
+    from google import genai
+    from google.genai import types
+
+    endpoint = endpoint or os.getenv('GEMINI_TTS_ENDPOINT')
+    if endpoint:
+        return genai.Client(api_key=api_key, http_options=types.HttpOptions(base_url=endpoint))
+    return genai.Client(api_key=api_key)
+
+def speech_config(voice_name="Puck", speakers=None):
+    """
+    生成配置: 单一预置语音，或 speakers（说话人 → 语音，最多两个）的多人对话配置
+    """
+    from google.genai import types
+
+    if speakers:
+        return types.GenerateContentConfig(
+            response_modalities=["AUDIO"],
+            speech_config=types.SpeechConfig(
+                multi_speaker_voice_config=types.MultiSpeakerVoiceConfig(
+                    speaker_voice_configs=[
+                        types.SpeakerVoiceConfig(
+                            speaker=speaker,
+                            voice_config=types.VoiceConfig(
+                                prebuilt_voice_config=types.PrebuiltVoiceConfig(voice_name=voice)
+                            )
+                        )
+                        for speaker, voice in speakers.items()
+                    ]
+                )
+            )
+        )
+    return types.GenerateContentConfig(
+        response_modalities=["AUDIO"],
+        speech_config=types.SpeechConfig(
+            voice_config=types.VoiceConfig(
+                prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                    voice_name=voice_name
+                )
+            )
+        )
+    )
+
+def synthesize(client, text, voice_name="Puck", speakers=None):
+    """调用 Gemini TTS 生成音频，返回原始 PCM 数据（失败时返回 None）"""
+    response = client.models.generate_content(
+        model=MODEL,
+        contents=text,
+        config=speech_config(voice_name, speakers)
+    )
+    return extract_pcm(response)
+
+def synthesize_stream(client, text, voice_name="Puck"):
+    """流式调用 Gemini TTS，逐块产出原始 PCM 数据"""
+    for chunk in client.models.generate_content_stream(
+        model=MODEL,
+        contents=text,
+        config=speech_config(voice_name)
+    ):
+        data = extract_pcm(chunk)
+        if data:
+            yield data
+
+def render_pcm(text, voice_name="Puck", speed=1.0, client=None, api_key=None, cache=None, stretch='auto', caller=None,
+               speakers=None, get_client=None):
+    """
+    生成最终（已变速）的 PCM 数据
+
+    有缓存时依次查找: 变速后的结果 → API 原始音频（本地重新变速）→ 调用 API。
+    只有真正需要调用 API 时才取得客户端（client → get_client() → 按 api_key 新建）；
+    caller（ResilientCaller）负责重试和对冲。
+    speakers 不为空时为多人对话请求（忽略 voice_name）。失败时返回 None。
+    """
+    if speakers:
+        voice_name = ','.join(f"{speaker}={voice}" for speaker, voice in speakers.items())
+    final_key = cache_key(MODEL, voice_name, text, speed, stretch_backend(stretch)) if cache and speed != 1.0 else None
+    if final_key:
+        pcm = cache.get(final_key)
+        if pcm is not None:
+            cache.record('hits')
+            return memoryview(pcm)
+
+    base_key = cache_key(MODEL, voice_name, text) if cache else None
+    audio_data = cache.get(base_key) if cache else None
+    if audio_data is not None:
+        cache.record('pcm_hits' if final_key else 'hits')
+    else:
+        if cache:
+            cache.record('misses')
+        if client is None:
+            client = get_client() if get_client else create_client(api_key)
+        if caller:
+            audio_data = caller.call(synthesize, client, text, voice_name, speakers)
+        else:
+            audio_data = synthesize(client, text, voice_name, speakers)
+        if audio_data is None:
+            return None
+        if cache:
+            cache.put(base_key, audio_data)
+
+    if speed == 1.0:
+        return memoryview(audio_data)
+
+    pcm = change_speed(audio_data, speed, stretch)
+    if final_key:
+        cache.put(final_key, pcm)
+    return pcm
+
+def render_chunked(text, voice_name="Puck", speed=1.0, client=None, api_key=None, cache=None, stretch='auto',
+                   caller=None, chunk_chars=200, workers=4, retries=2, gap_ms=250, log=None):
+    """
+    分块合成长文本
+
+    按句子切成约 chunk_chars 字符的分块并发合成（每块单独走缓存），
+    失败的分块单独重试最多 retries 轮，全部成功后拼接成一段音频再统一变速。
+    任一分块最终仍失败时抛出 RuntimeError。
+    """
+    chunks = chunk_text(text, chunk_chars)
+    if len(chunks) <= 1:
+        return render_pcm(text, voice_name, speed, client=client, api_key=api_key, cache=cache, stretch=stretch, caller=caller)
+
+    if client is None:
+        client = create_client(api_key)
+    _note(log, f"  分块: {len(chunks)} 块（目标 {chunk_chars} 字符）")
+
+    results = [None] * len(chunks)
+    errors = {}
+    pending = list(range(len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for attempt in range(retries + 1):
+            if attempt:
+                _note(log, f"  重试 {len(pending)} 个失败分块（第 {attempt} 轮）")
+            futures = {
+                pool.submit(render_pcm, chunks[i], voice_name, 1.0, client=client, cache=cache, caller=caller): i
+                for i in pending
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    pcm = future.result()
+                    if pcm is None:
+                        raise RuntimeError("未能从响应中获取音频数据")
+                    results[index] = pcm
+                    errors.pop(index, None)
+                except Exception as e:
+                    errors[index] = str(e)
+            pending = sorted(errors)
+            if not pending:
+                break
+
+    if pending:
+        detail = '; '.join(f"#{i + 1}: {errors[i]}" for i in pending)
+        raise RuntimeError(f"{len(pending)} 个分块合成失败（{detail}）")
+
+    audio_data = stitch(results, sample_rate=SAMPLE_RATE, gap_ms=gap_ms)
+    return change_speed(audio_data, speed, stretch) if speed != 1.0 else memoryview(audio_data)
+
+
+def render_dialogue(lines, speakers, client=None, api_key=None, cache=None, caller=None, workers=4, gap_ms=300, log=None,
+                    gaps=None):
+    """
+    合成对话，返回与 lines 一一对应的 1.0x PCM 分段，首尾相接即为整段对话
+
+    连续的、最多两个说话人的行合并为一次多人请求，各组并发执行，再按静音间隔
+    切回每一行（见 tts_dialogue.split_turns）。某组无法可靠切分时，该组改为逐行
+    单语音合成，行与行之间补 gap_ms 静音；组与组之间同样补 gap_ms 静音。
+    gaps 为列表时，按行追加每个分段末尾补上的静音字节数（未补为 0）。
+    """
+    groups = group_lines(lines)
+    if client is None:
+        client = create_client(api_key)
+
+    def run_group(group):
+        prompt, voice_name, pair = group_request(group, speakers)
+        pcm = render_pcm(prompt, voice_name, 1.0, client=client, cache=cache, caller=caller, speakers=pair)
+        if pcm is None:
+            raise RuntimeError("未能从响应中获取音频数据")
+        spans = split_turns(pcm, [line['text'] for line in group], SAMPLE_RATE)
+        if spans is not None:
+            return [bytes(pcm[start * SAMPLE_WIDTH:end * SAMPLE_WIDTH]) for start, end in spans], [0] * len(spans), False
+
+        # 静音段不足，无法确定每行的边界: 逐行合成
+        pieces, padding = [], []
+        for index, line in enumerate(group):
+            piece = render_pcm(line['text'], speakers[line['speaker']], 1.0, client=client, cache=cache, caller=caller)
+            if piece is None:
+                raise RuntimeError(f"{line['id']}: 未能从响应中获取音频数据")
+            gap = silence(SAMPLE_RATE, gap_ms) if index < len(group) - 1 else b''
+            pieces.append(bytes(piece) + gap)
+            padding.append(len(gap))
+        return pieces, padding, True
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run_group, groups))
+
+    segments = []
+    for index, (pieces, padding, fallback) in enumerate(results):
+        if fallback:
+            _note(log, f"  第 {index + 1} 组无法按停顿切分，已改为逐行合成（{len(pieces)} 行）")
+        if index < len(results) - 1:
+            gap = silence(SAMPLE_RATE, gap_ms)
+            pieces[-1] += gap
+            padding[-1] += len(gap)
+        segments.extend(pieces)
+        if gaps is not None:
+            gaps.extend(padding)
+    _note(log, f"  请求分组: {len(groups)} 组 / {len(lines)} 行")
+    return segments
+
+
+class Audio:
+    """
+    一段合成结果
+
+    Attributes:
+        pcm: s16le 单声道 PCM 字节
+        sample_rate: 采样率（启用重采样时为输出采样率）
+        text / voice / speed: 合成参数
+        latency: 从开始合成到拿到最终 PCM 的耗时（秒）
+        gap: 末尾的行间静音采样数（对话分段），已包含在 pcm 中
+    """
+
+    def __init__(self, pcm, sample_rate=SAMPLE_RATE, text=None, voice=None, speed=1.0, latency=None, gap=0):
+        self.pcm = bytes(pcm)
+        self.sample_rate = sample_rate
+        self.text = text
+        self.voice = voice
+        self.speed = speed
+        self.latency = latency
+        self.gap = gap
+
+    @property
+    def samples(self):
+        return len(self.pcm) // SAMPLE_WIDTH
+
+    @property
+    def duration(self):
+        return self.samples / self.sample_rate
+
+    def to_numpy(self, normalize=False):
+        """返回 int16 数组；normalize=True 时返回 [-1, 1) 范围的 float32 数组"""
+        import numpy as np
+
+        samples = np.frombuffer(self.pcm, dtype='<i2')
+        return samples.astype(np.float32) / 32768 if normalize else samples
+
+    def save(self, path):
+        """写成 WAV 文件"""
+        write_wav(path, self.pcm, self.sample_rate)
+        return path
+
+    def metadata(self):
+        return {
+            'voice': self.voice,
+            'speed': self.speed,
+            'sample_rate': self.sample_rate,
+            'samples': self.samples,
+            'duration': round(self.duration, 4),
+            'latency': round(self.latency, 3) if self.latency is not None else None,
+        }
+
+    def __repr__(self):
+        return f"<Audio {self.duration:.2f}s @ {self.sample_rate}Hz voice={self.voice} speed={self.speed}>"
+
+def _job(item, voice, speed):
+    """synthesize_many 的输入: 文本，或 {"text", "voice", "speed"}"""
+    if isinstance(item, str):
+        return item, voice, speed
+    return item['text'], item.get('voice') or voice, item.get('speed', speed)
+
+class Synthesizer:
+    """
+    可复用的合成器，可在多个线程间共享
+
+    Args:
+        api_key: Google API Key（默认读取 GOOGLE_API_KEY）
+        voice: 默认语音
+        speed: 默认速度倍数（0.5-2.0）
+        cache: AudioCache 实例；True 表示使用默认缓存目录，None 表示不缓存
+        stretch: 变速实现（auto / native / ffmpeg）
+        caller: ResilientCaller；为 None 时按 retries 新建（不对冲）
+        post: tts_post.PostProcess（去静音/归一化/重采样）
+        client: 复用已有的 genai.Client
+        endpoint: 覆盖 API 地址（如本地替身服务）
+        retries: 未传入 caller 时，可恢复错误的最大重试次数
+    """
+
+    def __init__(self, api_key=None, voice='Puck', speed=1.0, cache=None, stretch='auto', caller=None, post=None,
+                 client=None, endpoint=None, retries=2):
+        if voice not in VOICES:
+            raise ValueError(f"无效的语音: {voice}（可选: {', '.join(VOICES)}）")
+        if not 0.5 <= speed <= 2.0:
+            raise ValueError("速度必须在 0.5 到 2.0 之间")
+        if stretch == 'native' and tts_stretch is None:
+            raise RuntimeError("native 变速需要 numpy，请运行: pip install numpy")
+        self.api_key = api_key or os.getenv('GOOGLE_API_KEY')
+        self.voice = voice
+        self.speed = speed
+        self.cache = AudioCache() if cache is True else cache
+        self.stretch = stretch
+        self.caller = caller or ResilientCaller(RetryPolicy(retries=retries))
+        self.post = post
+        self.endpoint = endpoint
+        self._client = client
+        self._lock = threading.Lock()
+
+    @property
+    def sample_rate(self):
+        """输出采样率"""
+        return self.post.output_rate(SAMPLE_RATE) if self.post else SAMPLE_RATE
+
+    @property
+    def client(self):
+        """共享的 genai.Client，首次访问时创建"""
+        with self._lock:
+            if self._client is None:
+                if not self.api_key:
+                    raise RuntimeError("未设置 GOOGLE_API_KEY")
+                self._client = create_client(self.api_key, self.endpoint)
+            return self._client
+
+    def warm(self):
+        """预先导入 SDK、创建客户端并预热连接，返回各步耗时（毫秒）"""
+        started = time.perf_counter()
+        from google import genai  # noqa: F401
+        import_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        client = self.client
+        client_ms = (time.perf_counter() - started) * 1000
+
+        # 一次轻量的模型元数据请求，提前完成 DNS 和 TLS 握手；失败不影响后续合成
+        started = time.perf_counter()
+        error = None
+        try:
+            client.models.get(model=MODEL)
+        except Exception as e:
+            error = str(e)
+        warmup_ms = (time.perf_counter() - started) * 1000
+
+        detail = {'import_sdk': round(import_ms, 1), 'client': round(client_ms, 1), 'warmup': round(warmup_ms, 1)}
+        if error:
+            detail['warmup_error'] = error
+        return detail
+
+    def render(self, text, voice=None, speed=None, chunk_chars=None, workers=4, log=None):
+        """合成并变速，返回 PCM（未经后处理，采样率为 SAMPLE_RATE）；失败时抛出异常"""
+        voice = voice or self.voice
+        speed = self.speed if speed is None else speed
+        if chunk_chars:
+            return render_chunked(text, voice, speed, client=self.client, cache=self.cache, stretch=self.stretch,
+                                  caller=self.caller, chunk_chars=chunk_chars, workers=workers, log=log)
+        pcm = render_pcm(text, voice, speed, cache=self.cache, stretch=self.stretch, caller=self.caller,
+                         get_client=lambda: self.client)
+        if pcm is None:
+            raise RuntimeError("未能从响应中获取音频数据")
+        return pcm
+
+    def finish(self, pcm, text=None, voice=None, speed=1.0, started=None):
+        """对 SAMPLE_RATE 的 PCM 执行后处理并包装成 Audio"""
+        if self.post:
+            pcm = self.post.apply(pcm, SAMPLE_RATE)
+        latency = time.perf_counter() - started if started is not None else None
+        return Audio(pcm, self.sample_rate, text, voice, speed, latency)
+
+    def synthesize(self, text, voice=None, speed=None, chunk_chars=None, workers=4, log=None):
+        """
+        合成一段文本，返回 Audio
+
+        chunk_chars 设置后按句子分块并发合成再拼接（长文本）。
+        """
+        voice = voice or self.voice
+        speed = self.speed if speed is None else speed
+        started = time.perf_counter()
+        pcm = self.render(text, voice, speed, chunk_chars=chunk_chars, workers=workers, log=log)
+        return self.finish(pcm, text, voice, speed, started)
+
+    def synthesize_many(self, items, voice=None, speed=None, workers=4):
+        """并发合成多段，items 为文本或 {"text", "voice", "speed"}，返回按输入顺序排列的 Audio 列表"""
+        jobs = [_job(item, voice, speed) for item in items]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda job: self.synthesize(*job), jobs))
+
+    def dialogue(self, lines, speakers, speed=None, workers=4, gap_ms=300, log=None):
+        """
+        合成对话（见 render_dialogue），返回与 lines 一一对应的 Audio 列表
+
+        各段首尾相接即为整段对话。各行的语音分别变速（行间补的 gap_ms 静音不变速），
+        后处理对拼接后的整段执行一次: 去静音只裁整段首尾，归一化按整段计算增益，
+        再按处理后的位置切回各行。
+        """
+        speed = self.speed if speed is None else speed
+        started = time.perf_counter()
+        gaps = []
+        segments = render_dialogue(lines, speakers, client=self.client, cache=self.cache, caller=self.caller,
+                                   workers=workers, gap_ms=gap_ms, log=log, gaps=gaps)
+        # marks: 每行的起点和语音结束点（采样），最后追加整段结尾
+        pcm, marks = bytearray(), []
+        for segment, gap in zip(segments, gaps):
+            speech = segment[:len(segment) - gap]
+            if speed != 1.0:
+                speech = change_speed(speech, speed, self.stretch)
+            marks.append(len(pcm) // SAMPLE_WIDTH)
+            pcm += speech
+            marks.append(len(pcm) // SAMPLE_WIDTH)
+            pcm += segment[len(segment) - gap:]
+        marks.append(len(pcm) // SAMPLE_WIDTH)
+        if self.post:
+            pcm, marks = self.post.apply_marked(bytes(pcm), SAMPLE_RATE, marks)
+        latency = time.perf_counter() - started
+        audios = []
+        for index, line in enumerate(lines):
+            start, speech_end, end = marks[2 * index:2 * index + 3]
+            audios.append(Audio(pcm[start * SAMPLE_WIDTH:end * SAMPLE_WIDTH], self.sample_rate, line['text'],
+                                speakers[line['speaker']], speed, latency, gap=end - speech_end))
+        return audios
+
+    def stream(self, text, voice=None):
+        """
+        流式合成，逐块产出 API 返回的原始 PCM（1.0x，未经变速和后处理）
+
+        全部分块收齐后写入缓存（若启用）。
+        """
+        voice = voice or self.voice
+        chunks = []
+        for data in synthesize_stream(self.client, text, voice):
+            chunks.append(data)
+            yield data
+        if self.cache and chunks:
+            self.cache.put(cache_key(MODEL, voice, text), b''.join(chunks))
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and hasattr(self._client, 'close'):
+                self._client.close()
+            self._client = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class AsyncSynthesizer:
+    """
+    Synthesizer 的 asyncio 版本，参数相同
+
+    合成流水线（缓存、变速、后处理）放在线程中运行，不阻塞事件循环；
+    stream 使用 SDK 的原生异步接口 client.aio。
+    """
+
+    def __init__(self, *args, synthesizer=None, **kwargs):
+        self.sync = synthesizer or Synthesizer(*args, **kwargs)
+
+    async def synthesize(self, text, voice=None, speed=None, chunk_chars=None, workers=4):
+        return await asyncio.to_thread(self.sync.synthesize, text, voice, speed, chunk_chars, workers)
+
+    async def synthesize_many(self, items, voice=None, speed=None, concurrency=4):
+        """并发合成多段（最多 concurrency 个同时进行），返回按输入顺序排列的 Audio 列表"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(job):
+            async with semaphore:
+                return await self.synthesize(*job)
+
+        return await asyncio.gather(*(one(_job(item, voice, speed)) for item in items))
+
+    async def dialogue(self, lines, speakers, speed=None, workers=4, gap_ms=300):
+        return await asyncio.to_thread(self.sync.dialogue, lines, speakers, speed, workers, gap_ms)
+
+    async def stream(self, text, voice=None):
+        """异步流式合成，逐块产出原始 PCM（1.0x，未经变速和后处理）"""
+        voice = voice or self.sync.voice
+        client = await asyncio.to_thread(lambda: self.sync.client)
+        chunks = []
+        async for chunk in await client.aio.models.generate_content_stream(
+            model=MODEL,
+            contents=text,
+            config=speech_config(voice)
+        ):
+            data = extract_pcm(chunk)
+            if data:
+                chunks.append(data)
+                yield data
+        if self.sync.cache and chunks:
+            self.sync.cache.put(cache_key(MODEL, voice, text), b''.join(chunks))
+
+    async def aclose(self):
+        await asyncio.to_thread(self.sync.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
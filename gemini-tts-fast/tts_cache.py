@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Gemini TTS 本地音频缓存
+
+按内容寻址：key 为 (模型, 语音, 文本[, 速度:变速实现]) 的 sha256，值为原始 PCM
+（s16le, 24kHz, 单声道）。不带速度的条目保存 API 返回的原始音频，
+改变速度时可直接在本地重新变速，无需再次调用 API；带速度的条目保存
+变速后的结果，命中时连 ffmpeg 都不用启动。native 与 ffmpeg 的变速结果
+不同，分别缓存。
+
+缓存总大小超过上限时按最近访问时间（LRU）淘汰最旧的条目。
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+def default_cache_dir():
+    """默认缓存目录: $XDG_CACHE_HOME/gemini-tts-fast（缺省为 ~/.cache/gemini-tts-fast）"""
+    base = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return Path(base) / 'gemini-tts-fast'
+
+def cache_key(model, voice, text, speed=None, stretch=None):
+    """
+    计算缓存 key；speed 为 None 表示 API 返回的原始（1.0x）音频
+
+    变速结果的 key 还包含实际使用的变速实现（native / ffmpeg）。
+    """
+    digest = hashlib.sha256()
+    if speed is None:
+        variant = ''
+    else:
+        variant = f'{speed:g}' if stretch is None else f'{speed:g}:{stretch}'
+    for field in (model, voice, text, variant):
+        digest.update(field.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class AudioCache:
+    """
+    基于文件系统的 PCM 缓存
+
+    每个条目是 <root>/<key 前两位>/<key>.pcm，写入使用临时文件 + os.replace
+    保证原子性，读取时刷新 mtime 作为 LRU 依据。可在多个线程间共享。
+    """
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = Path(root) if root else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'pcm_hits': 0, 'misses': 0, 'evicted': 0}
+        self._lock = threading.Lock()
+        self._size = None
+
+    def _path(self, key):
+        return self.root / key[:2] / f'{key}.pcm'
+
+    def _entries(self):
+        for path in self.root.glob('*/*.pcm'):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            yield st.st_mtime, st.st_size, path
+
+    def contains(self, key):
+        """条目是否存在（不读取内容、不刷新访问时间）"""
+        return self._path(key).exists()
+
+    def get(self, key):
+        """读取条目，不存在时返回 None"""
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # 刷新访问时间
+        except FileNotFoundError:
+            return None
+        return data
+
+    def put(self, key, pcm):
+        """写入条目，必要时触发 LRU 淘汰"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(pcm)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        with self._lock:
+            # 覆盖已有条目时只计入大小差
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(temp_path, path)
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += len(pcm) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """按 mtime 从旧到新删除，直到总大小不超过上限（调用方持有锁）"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.stats['evicted'] += 1
+        self._size = total
+
+    def record(self, outcome):
+        """记录一次查找结果: 'hits' / 'pcm_hits' / 'misses'"""
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def summary(self):
+        """返回本次运行的命中统计和缓存当前占用"""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['pcm_hits'] + stats['misses']
+        entries = list(self._entries()) if self.root.exists() else []
+        stats.update(
+            lookups=lookups,
+            hit_rate=round((stats['hits'] + stats['pcm_hits']) / lookups, 3) if lookups else 0.0,
+            entries=len(entries),
+            bytes=sum(size for _, size, _ in entries),
+            max_bytes=self.max_bytes,
+            dir=str(self.root),
+        )
+        return stats
+
+    def save_totals(self):
+        """把本次运行的计数累加到 <root>/stats.json，供 --cache-stats 查看"""
+        path = self.root / 'stats.json'
+        with self._lock:
+            run = dict(self.stats)
+        try:
+            totals = json.loads(path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            totals = {}
+        for name, count in run.items():
+            totals[name] = totals.get(name, 0) + count
+        self.root.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(totals, f)
+        os.replace(temp_path, path)
+        return totals
+
+    def load_totals(self):
+        """读取累计计数"""
+        try:
+            return json.loads((self.root / 'stats.json').read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            return {}
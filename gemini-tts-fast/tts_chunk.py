@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+长文本分块与拼接
+
+把长文本按句子边界（中文 。！？ 和英文 . ! ?）切分，再打包成接近目标长度的
+分块，分别合成后拼回一段音频。拼接时去掉每块首尾的静音，块与块之间插入
+固定长度的静音并做短淡入淡出，避免咔嗒声和忽长忽短的停顿。
+
+音频处理只用标准库 array，格式固定为 s16le 单声道。
+"""
+
+import re
+import sys
+from array import array
+
+# 句末标点（可带连续标点和收尾引号/括号）；英文句点要求后面是空白或文本结尾
+_SENTENCE = re.compile(
+    r'.+?(?:[。！？!?]+[”’」』）)"\']*|\.+[”’)"\']*(?=\s|$)|$)',
+    re.S,
+)
+_CJK_END = re.compile(r'[\u3000-\u303f\u4e00-\u9fff\uff00-\uffef”’」』）]$')
+
+def split_sentences(text):
+    """把文本切成句子列表（换行也视为句子边界）"""
+    sentences = []
+    for line in text.splitlines():
+        for match in _SENTENCE.finditer(line.strip()):
+            sentence = match.group().strip()
+            if sentence:
+                sentences.append(sentence)
+    return sentences
+
+def chunk_text(text, target_chars=200):
+    """
+    按句子打包成不超过 target_chars 的分块
+
+    单句超过目标长度时单独成块，不会在句中截断。
+    """
+    chunks = []
+    current = ''
+    for sentence in split_sentences(text):
+        if current and len(current) + len(sentence) + 1 > target_chars:
+            chunks.append(current)
+            current = ''
+        if not current:
+            current = sentence
+        elif _CJK_END.search(current):
+            current += sentence
+        else:
+            current += ' ' + sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _samples(pcm):
+    samples = array('h')
+    samples.frombytes(bytes(pcm))
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return samples
+
+def _to_bytes(samples):
+    if sys.byteorder == 'big':
+        samples = array('h', samples)
+        samples.byteswap()
+    return samples.tobytes()
+
+def trim_silence(samples, threshold=200):
+    """去掉首尾绝对幅值低于 threshold 的采样"""
+    start = 0
+    end = len(samples)
+    while start < end and abs(samples[start]) < threshold:
+        start += 1
+    while end > start and abs(samples[end - 1]) < threshold:
+        end -= 1
+    return samples[start:end]
+
+def _fade(samples, length, fade_in):
+    length = min(length, len(samples))
+    for i in range(length):
+        gain = (i + 1) / (length + 1)
+        index = i if fade_in else len(samples) - 1 - i
+        samples[index] = int(samples[index] * gain)
+
+def stitch(pcm_chunks, sample_rate=24000, gap_ms=250, fade_ms=10, trim_threshold=200):
+    """
+    拼接多段 PCM
+
+    Args:
+        pcm_chunks: 按顺序排列的 PCM 数据（s16le, 单声道）
+        sample_rate: 采样率
+        gap_ms: 块之间插入的静音长度；为 0 时改为重叠交叉淡化
+        fade_ms: 淡入淡出 / 交叉淡化的长度
+        trim_threshold: 首尾静音判定阈值（16-bit 幅值）
+    """
+    fade = int(sample_rate * fade_ms / 1000)
+    gap = array('h', bytes(2 * int(sample_rate * gap_ms / 1000)))
+    pieces = [trim_silence(_samples(pcm), trim_threshold) for pcm in pcm_chunks]
+    pieces = [piece for piece in pieces if piece]
+    if not pieces:
+        return b''
+
+    out = array('h')
+    for index, piece in enumerate(pieces):
+        if index > 0:
+            _fade(piece, fade, fade_in=True)
+        if index < len(pieces) - 1:
+            _fade(piece, fade, fade_in=False)
+
+        if index == 0:
+            out.extend(piece)
+        elif gap:
+            out.extend(gap)
+            out.extend(piece)
+        else:
+            # 无静音间隔: 前一块的淡出尾部与本块的淡入头部重叠相加
+            overlap = min(fade, len(out), len(piece))
+            base = len(out) - overlap
+            for i in range(overlap):
+                out[base + i] = max(-32768, min(32767, out[base + i] + piece[i]))
+            out.extend(piece[overlap:])
+    return _to_bytes(out)
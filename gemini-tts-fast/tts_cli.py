@@ -5,112 +5,565 @@ Usage: python tts_cli.py "text to convert" --output=file.wav --voice=Puck
 """
 
 import os
+import re
 import sys
+import json
+import time
+import shutil
 import argparse
 import subprocess
-import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from google import genai
-from google.genai import types
 
-def text_to_speech(api_key, text, output_file="output.wav", voice_name="Puck", speed=1.0):
+from gemini_tts import (
+    CHANNELS, MODEL, SAMPLE_RATE, SAMPLE_WIDTH, STRETCH_BACKENDS, VOICES,
+    Synthesizer, stretch_backend, tts_post, tts_stretch,
+)
+from tts_cache import AudioCache, DEFAULT_MAX_BYTES, cache_key, default_cache_dir
+from tts_encode import FORMATS, WAV_UNKNOWN_SIZE, EncoderPool, parse_formats, wav_header, write_wav
+from tts_dialogue import load_dialogue, parse_speakers
+from tts_history import DurationModel, History
+from tts_retry import ResilientCaller, RetryPolicy
+import tts_daemon
+
+# 守护进程按自己启动时的设置合成；调用方设置了这些选项时不转发，改为进程内合成
+DAEMON_BYPASS_OPTIONS = ('endpoint', 'no_cache', 'cache_dir', 'stretch', 'retries', 'retry_delay', 'hedge',
+                         'hedge_after', 'hedge_budget')
+
+def write_output(output_path, pcm, sample_rate=SAMPLE_RATE, encoder=None):
+    """
+    写出最终音频，返回写出的文件列表
+
+    没有 encoder 时按 output_path 写 WAV；否则以去掉扩展名的 output_path 为基础，
+    由 EncoderPool 并发编码出每种格式。
+    """
+    if encoder is None:
+        write_wav(output_path, pcm, sample_rate)
+        return [str(output_path)]
+    return list(encoder.encode(pcm, sample_rate, Path(output_path).with_suffix('')).values())
+
+def text_to_speech(synth, text, output_file="output.wav", voice_name="Puck", speed=1.0, raw_stdout=False, daemon_socket=None, chunk_chars=None, workers=4, info=None, encoder=None):
     """
     使用 Gemini API 将文本转换为语音
 
     Args:
-        api_key: Google API Key
+        synth: gemini_tts.Synthesizer（客户端、缓存、变速、重试和后处理）
         text: 要转换的文本
         output_file: 输出音频文件路径
         voice_name: 语音名称
         speed: 播放速度倍数 (0.5-2.0)
+        raw_stdout: 为 True 时把原始 PCM 写到 stdout，进度信息改写到 stderr
+        daemon_socket: 守护进程 socket 路径；守护进程未运行时回退到进程内合成
+        chunk_chars: 设置后按句子分块并发合成（见 render_chunked），不经由守护进程
+        workers: 分块合成的并发请求数
+        info: 传入 dict 时，成功后写入最终音频的采样数（samples）和采样率（sample_rate）
+        encoder: EncoderPool，从同一段 PCM 编码出多种格式（为 None 时只写 WAV）
     """
+    log = sys.stderr if raw_stdout else sys.stdout
+    post = synth.post
+    sample_rate = synth.sample_rate
     try:
-        # 创建客户端
-        client = genai.Client(api_key=api_key)
+        print(f"[Gemini TTS]", file=log)
+        print(f"  文本: {text[:50]}{'...' if len(text) > 50 else ''}", file=log)
+        print(f"  语音: {voice_name}", file=log)
+        print(f"  速度: {speed}x" if speed != 1.0 else "  速度: 正常", file=log)
+        print(f"  输出: {f'stdout (PCM s16le {sample_rate}Hz mono)' if raw_stdout else output_file}", file=log)
+        if post:
+            print(f"  后处理: {post.describe()}", file=log)
+        print(f"  正在生成...", file=log)
+
+        pcm = None
+        if daemon_socket and not chunk_chars:
+            try:
+                header, data = tts_daemon.request(daemon_socket, {'text': text, 'voice': voice_name, 'speed': speed})
+            except (FileNotFoundError, ConnectionRefusedError):
+                header = None  # 守护进程未运行，回退到进程内合成
+            if header is not None:
+                if not header.get('ok'):
+                    print(f"  × 守护进程错误: {header.get('error')}", file=sys.stderr)
+                    return False
+                pcm = data
+                print(f"  经由守护进程（{header.get('latency_ms')}ms）", file=log)
+
+        # 生成音频（优先使用缓存）
+        try:
+            if pcm is None:
+                pcm = synth.render(text, voice_name, speed, chunk_chars=chunk_chars, workers=workers, log=log)
+        except subprocess.CalledProcessError as e:
+            print(f"  × 转换错误: {e.stderr.decode()}", file=sys.stderr)
+            return False
+        except FileNotFoundError:
+            print("  × 错误: 未找到 ffmpeg，请先安装 ffmpeg", file=sys.stderr)
+            return False
+        pcm = synth.finish(pcm).pcm
+        if info is not None:
+            info['samples'] = len(pcm) // SAMPLE_WIDTH
+            info['sample_rate'] = sample_rate
+
+        if raw_stdout:
+            sys.stdout.buffer.write(pcm)
+            sys.stdout.buffer.flush()
+            print(f"  ✓ 成功!", file=log)
+            print(f"  数据大小: {len(pcm) / 1024:.2f} KB", file=log)
+            return True
+
+        outputs = write_output(Path(output_file), pcm, sample_rate, encoder)
+
+        # 获取输出文件大小
+        print(f"  ✓ 成功!", file=log)
+        for output in outputs:
+            file_size_kb = Path(output).stat().st_size / 1024
+            print(f"  文件大小: {file_size_kb:.2f} KB" + (f"（{output}）" if encoder else ''), file=log)
+        return True
+
+    except Exception as e:
+        print(f"  × 错误: {e}", file=sys.stderr)
+        return False
 
-        print(f"[Gemini TTS]")
-        print(f"  文本: {text[:50]}{'...' if len(text) > 50 else ''}")
-        print(f"  语音: {voice_name}")
+def dialogue_to_speech(synth, lines, speakers, output_file="output.wav", speed=1.0, split_dir=None, workers=4, info=None, encoder=None):
+    """
+    合成对话，写出整段音频，可选把每一行另存为 <split_dir>/<id>.wav
+
+    每行分段首尾相接即为整段音频（后处理对整段执行一次），每行的起始采样即为
+    前面各行的采样数之和（精确到采样）。info 中写入 samples、sample_rate 和
+    每行的 clips（id, file, samples, gap），供时间清单和历史记录使用；gap 为
+    分段末尾的行间静音采样数。
+    """
+    post = synth.post
+    sample_rate = synth.sample_rate
+    try:
+        print(f"[Gemini TTS 对话]")
+        print(f"  台词: {len(lines)} 行")
+        print(f"  说话人: {', '.join(f'{name}={voice}' for name, voice in speakers.items())}")
         print(f"  速度: {speed}x" if speed != 1.0 else "  速度: 正常")
-        print(f"  输出: {output_file}")
+        print(f"  输出: {output_file}" + (f"（逐行: {split_dir}）" if split_dir else ''))
+        if post:
+            print(f"  后处理: {post.describe()}")
         print(f"  正在生成...")
 
-        # 生成音频
-        response = client.models.generate_content(
-            model='gemini-2.5-pro-preview-tts',
-            contents=text,
-            config=types.GenerateContentConfig(
-                response_modalities=["AUDIO"],
-                speech_config=types.SpeechConfig(
-                    voice_config=types.VoiceConfig(
-                        prebuilt_voice_config=types.PrebuiltVoiceConfig(
-                            voice_name=voice_name
-                        )
-                    )
-                )
-            )
-        )
+        try:
+            audios = synth.dialogue(lines, speakers, speed, workers=workers, log=sys.stdout)
+        except subprocess.CalledProcessError as e:
+            print(f"  × 转换错误: {e.stderr.decode()}", file=sys.stderr)
+            return False
+        except FileNotFoundError:
+            print("  × 错误: 未找到 ffmpeg，请先安装 ffmpeg", file=sys.stderr)
+            return False
+        if encoder:
+            print(f"  格式: {', '.join(encoder.formats)}")
+
+        clips = []
+        offset = 0
+        if split_dir:
+            Path(split_dir).mkdir(parents=True, exist_ok=True)
+        for line, audio in zip(lines, audios):
+            samples = audio.samples
+            clip = {'id': line['id'], 'file': str(output_file), 'samples': samples, 'gap': audio.gap}
+            if split_dir:
+                safe_id = re.sub(r'[^\w.-]', '_', line['id'])
+                clip['file'] = write_output(Path(split_dir) / f"{safe_id}.wav", audio.pcm, sample_rate, encoder)[0]
+            print(f"  {line['id']:<10} {line['speaker']:<10} @{offset / sample_rate:8.3f}s  {samples / sample_rate:6.3f}s")
+            clips.append(clip)
+            offset += samples
 
-        # 保存音频文件
-        if response and response.candidates:
-            for candidate in response.candidates:
-                for part in candidate.content.parts:
-                    if hasattr(part, 'inline_data') and part.inline_data:
-                        audio_data = part.inline_data.data
-
-                        # 创建临时文件保存原始 PCM 数据
-                        with tempfile.NamedTemporaryFile(suffix='.pcm', delete=False) as temp_file:
-                            temp_path = temp_file.name
-                            temp_file.write(audio_data)
-
-                        try:
-                            # 使用 ffmpeg 将 PCM 转换为 WAV
-                            # Gemini TTS 输出格式: 24kHz, 单声道, 16-bit PCM
-                            output_path = Path(output_file)
-
-                            # 构建 ffmpeg 命令
-                            ffmpeg_cmd = [
-                                'ffmpeg',
-                                '-f', 's16le',  # 输入格式: 16-bit little-endian PCM
-                                '-ar', '24000',  # 采样率: 24kHz
-                                '-ac', '1',      # 通道数: 单声道
-                                '-i', temp_path, # 输入文件
-                            ]
-
-                            # 如果需要加速，添加音频滤镜
-                            if speed != 1.0:
-                                ffmpeg_cmd.extend(['-filter:a', f'atempo={speed}'])
-
-                            ffmpeg_cmd.extend([
-                                '-y',            # 覆盖输出文件
-                                str(output_path) # 输出文件
-                            ])
-
-                            subprocess.run(ffmpeg_cmd, check=True, capture_output=True)
-
-                            # 获取输出文件大小
-                            file_size_kb = output_path.stat().st_size / 1024
-                            print(f"  ✓ 成功!")
-                            print(f"  文件大小: {file_size_kb:.2f} KB")
-                            return True
-
-                        except subprocess.CalledProcessError as e:
-                            print(f"  × 转换错误: {e.stderr.decode()}", file=sys.stderr)
-                            return False
-                        except FileNotFoundError:
-                            print("  × 错误: 未找到 ffmpeg，请先安装 ffmpeg", file=sys.stderr)
-                            return False
-                        finally:
-                            # 删除临时文件
-                            if os.path.exists(temp_path):
-                                os.unlink(temp_path)
-
-        print("  × 未能从响应中获取音频数据")
+        outputs = write_output(Path(output_file), b''.join(audio.pcm for audio in audios), sample_rate, encoder)
+        if not split_dir:
+            for clip in clips:
+                clip['file'] = outputs[0]
+        if info is not None:
+            info.update(samples=offset, sample_rate=sample_rate, clips=clips)
+        print(f"  ✓ 成功! 总时长 {offset / sample_rate:.3f}s")
+        return True
+
+    except Exception as e:
+        print(f"  × 错误: {e}", file=sys.stderr)
         return False
 
+class WavStreamWriter:
+    """
+    增量写 WAV：先写流式占位头，边收边写 PCM，关闭时回填 RIFF/data 长度
+
+    直接写到 output_path，合成过程中即可边写边读（占位头的长度为最大值，
+    ffmpeg、sox 等按流读到文件结尾）。close(ok=False) 时删除普通文件，
+    输出路径上不会留下不完整的 WAV；输出不可 seek（如管道）时保留占位头。
+    """
+
+    def __init__(self, output_path):
+        self.path = output_path
+        self.file = open(output_path, 'wb')
+        self.file.write(wav_header(WAV_UNKNOWN_SIZE))
+        self.file.flush()
+        self.data_size = 0
+
+    def write(self, data):
+        self.file.write(data)
+        self.file.flush()
+        self.data_size += len(data)
+
+    def close(self, ok=True):
+        regular = os.path.isfile(self.path)
+        try:
+            if ok and self.file.seekable():
+                self.file.seek(0)
+                self.file.write(wav_header(self.data_size))
+        finally:
+            self.file.close()
+            if not ok and regular:
+                os.unlink(self.path)
+
+class RawStreamWriter:
+    """把 PCM 分块直接写到 stdout"""
+
+    def __init__(self):
+        self.file = sys.stdout.buffer
+        self.data_size = 0
+
+    def write(self, data):
+        self.file.write(data)
+        self.file.flush()
+        self.data_size += len(data)
+
+    def close(self, ok=True):
+        self.file.flush()
+
+def _pump(source, writer, first_write):
+    """把 ffmpeg stdout 的数据转写到输出，并记录首次写出的时间"""
+    while True:
+        data = source.read1(65536)
+        if not data:
+            break
+        if not first_write:
+            first_write.append(time.perf_counter())
+        writer.write(data)
+
+def stream_to_speech(synth, text, output_file="output.wav", voice_name="Puck", speed=1.0, raw_stdout=False, info=None):
+    """
+    流式合成：音频分块一到就写出，降低首段音频的等待时间
+
+    速度为 1.0 时分块直接写入输出；否则按 synth.stretch 边收边变速: native 用增量
+    WSOLA（输出只滞后约 25ms 的输入），ffmpeg 经由长驻的 atempo 管道。
+    完整结果会写入缓存（若启用）。返回 True/False，同时打印首字节时间与总耗时。
+    """
+    cache = synth.cache
+    if cache and cache.contains(cache_key(MODEL, voice_name, text)):
+        # 已有完整音频，无需再请求 API，直接走本地路径
+        return text_to_speech(synth, text, output_file, voice_name, speed, raw_stdout, info=info)
+    if cache:
+        cache.record('misses')
+
+    log = sys.stderr if raw_stdout else sys.stdout
+    print(f"[Gemini TTS 流式]", file=log)
+    print(f"  文本: {text[:50]}{'...' if len(text) > 50 else ''}", file=log)
+    print(f"  语音: {voice_name}", file=log)
+    print(f"  速度: {speed}x" if speed != 1.0 else "  速度: 正常", file=log)
+    print(f"  输出: {'stdout (PCM s16le 24kHz mono)' if raw_stdout else output_file}", file=log)
+    if speed != 1.0:
+        print(f"  变速: {stretch_backend(synth.stretch)}", file=log)
+
+    started = time.perf_counter()
+    first_chunk = None
+    first_write = []
+    chunks = []
+    writer = None
+    ffmpeg = None
+    pump = None
+    ok = False
+    stretcher = None
+    if speed != 1.0 and stretch_backend(synth.stretch) == 'native':
+        stretcher = tts_stretch.StreamStretcher(speed, SAMPLE_RATE)
+    try:
+        # 先启动 ffmpeg 再创建输出，缺少 ffmpeg 时不会留下空文件
+        if speed != 1.0 and not stretcher:
+            try:
+                ffmpeg = subprocess.Popen([
+                    'ffmpeg', '-loglevel', 'error',
+                    '-f', 's16le', '-ar', str(SAMPLE_RATE), '-ac', str(CHANNELS), '-i', 'pipe:0',
+                    '-filter:a', f'atempo={speed}',
+                    '-f', 's16le', '-ar', str(SAMPLE_RATE), '-ac', str(CHANNELS), 'pipe:1',
+                ], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            except FileNotFoundError:
+                print("  × 错误: 未找到 ffmpeg，请先安装 ffmpeg", file=sys.stderr)
+                return False
+
+        writer = RawStreamWriter() if raw_stdout else WavStreamWriter(output_file)
+        if ffmpeg:
+            pump = threading.Thread(target=_pump, args=(ffmpeg.stdout, writer, first_write), daemon=True)
+            pump.start()
+
+        for data in synth.stream(text, voice_name):
+            if first_chunk is None:
+                first_chunk = time.perf_counter()
+            chunks.append(data)
+            if ffmpeg:
+                ffmpeg.stdin.write(data)
+                ffmpeg.stdin.flush()
+                continue
+            if stretcher:
+                data = stretcher.feed(data)
+            if data:
+                if not first_write:
+                    first_write.append(time.perf_counter())
+                writer.write(data)
+
+        if ffmpeg:
+            ffmpeg.stdin.close()
+            pump.join()
+            if ffmpeg.wait() != 0:
+                print(f"  × 转换错误: {ffmpeg.stderr.read().decode()}", file=sys.stderr)
+                return False
+
+        if not chunks:
+            print("  × 未能从响应中获取音频数据", file=log)
+            return False
+        if stretcher:
+            writer.write(stretcher.flush())
+        if info is not None:
+            info['samples'] = writer.data_size // SAMPLE_WIDTH
+            info['sample_rate'] = SAMPLE_RATE
+
+        total = time.perf_counter() - started
+        first_output = first_write[0] if first_write else time.perf_counter()
+        print(f"  ✓ 成功!", file=log)
+        print(f"  首字节: {(first_chunk - started) * 1000:.0f}ms（API） / {(first_output - started) * 1000:.0f}ms（输出）", file=log)
+        print(f"  总耗时: {total * 1000:.0f}ms，{len(chunks)} 个分块，{writer.data_size / 1024:.2f} KB", file=log)
+        ok = True
+        return True
+
     except Exception as e:
         print(f"  × 错误: {e}", file=sys.stderr)
         return False
+    finally:
+        if ffmpeg and ffmpeg.poll() is None:
+            ffmpeg.kill()
+            ffmpeg.wait()
+        if writer:
+            writer.close(ok)
+
+def load_jobs(path, default_voice="Puck"):
+    """
+    读取批量任务
+
+    支持两种格式:
+      - script.json: 取 scenes[].narration，id 使用 scene.id（缺省为 scene-N）
+      - NDJSON: 每行一个 {"id": ..., "text": ..., "voice": ...}
+    """
+    content = Path(path).read_text(encoding='utf-8')
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        data = None
+
+    jobs = []
+    if isinstance(data, dict) and 'scenes' in data:
+        for index, scene in enumerate(data['scenes'], start=1):
+            text = (scene.get('narration') or '').strip()
+            if not text:
+                continue
+            jobs.append({
+                'id': str(scene.get('id') or f'scene-{index}'),
+                'text': text,
+                'voice': scene.get('voice') or default_voice,
+            })
+    else:
+        for line_no, line in enumerate(content.splitlines(), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            text = (item.get('text') or '').strip()
+            if not text:
+                raise ValueError(f"第 {line_no} 行缺少 text")
+            jobs.append({
+                'id': str(item.get('id') or f'line-{line_no}'),
+                'text': text,
+                'voice': item.get('voice') or default_voice,
+            })
+
+    for job in jobs:
+        if job['voice'] not in VOICES:
+            raise ValueError(f"任务 {job['id']} 的语音无效: {job['voice']}")
+    if len({job['id'] for job in jobs}) != len(jobs):
+        raise ValueError("任务 id 存在重复")
+    return jobs
+
+def _run_job(synth, job, out_dir, speed, encoder=None):
+    """
+    执行单个批量任务，返回结果记录（不抛异常）
+
+    有 encoder 时只提交编码任务（结果记录的 encodes 中为各格式的 Future）就返回，
+    工作线程随即去处理下一个任务，编码与后续 API 请求重叠进行。
+    """
+    safe_id = re.sub(r'[^\w.-]', '_', job['id'])
+    output_path = out_dir / f"{safe_id}.{encoder.formats[0] if encoder else 'wav'}"
+    started = time.perf_counter()
+    result = {'id': job['id'], 'voice': job['voice'], 'output': str(output_path)}
+    try:
+        audio = synth.synthesize(job['text'], job['voice'], speed)
+        pcm, sample_rate = audio.pcm, audio.sample_rate
+        if encoder:
+            result['encodes'] = encoder.submit(pcm, sample_rate, out_dir / safe_id)
+        else:
+            write_wav(output_path, pcm, sample_rate)
+        result.update(status='ok', bytes=len(pcm), samples=len(pcm) // SAMPLE_WIDTH, sample_rate=sample_rate)
+    except subprocess.CalledProcessError as e:
+        result.update(status='failed', error=f"转换错误: {e.stderr.decode().strip()}")
+    except FileNotFoundError:
+        result.update(status='failed', error="未找到 ffmpeg，请先安装 ffmpeg")
+    except Exception as e:
+        result.update(status='failed', error=str(e))
+    result['seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+def run_batch(synth, jobs, out_dir, speed=1.0, workers=4, encoder=None):
+    """
+    并发执行批量合成
+
+    所有任务共享 synth 的同一个 genai.Client，最多同时发起 workers 个请求。
+    有 encoder 时各任务的多格式编码在后台进行，全部请求结束后再等待编码完成。
+    单个任务失败不会中断其他任务，返回汇总报告。
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    cache, caller, post = synth.cache, synth.caller, synth.post
+
+    print(f"[Gemini TTS 批量]")
+    print(f"  任务数: {len(jobs)}")
+    print(f"  并发数: {workers}")
+    print(f"  速度: {speed}x" if speed != 1.0 else "  速度: 正常")
+    print(f"  输出目录: {out_dir}")
+    if post:
+        print(f"  后处理: {post.describe()}")
+    if encoder:
+        print(f"  格式: {', '.join(encoder.formats)}")
+
+    started = time.perf_counter()
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_run_job, synth, job, out_dir, speed, encoder): job['id'] for job in jobs}
+        for future in as_completed(futures):
+            result = future.result()
+            results[result['id']] = result
+            if result['status'] == 'ok':
+                print(f"  ✓ {result['id']} ({result['seconds']:.2f}s)")
+            else:
+                print(f"  × {result['id']}: {result['error']}", file=sys.stderr)
+    synth_seconds = time.perf_counter() - started
+
+    # 等待仍在进行的编码；编码失败的任务记为失败
+    for result in results.values():
+        encodes = result.pop('encodes', None)
+        if not encodes:
+            continue
+        try:
+            result['outputs'] = {fmt: future.result() for fmt, future in encodes.items()}
+        except subprocess.CalledProcessError as e:
+            result.update(status='failed', error=f"编码错误: {e.stderr.decode().strip()}")
+        except Exception as e:
+            result.update(status='failed', error=f"编码错误: {e}")
+        if result['status'] != 'ok':
+            print(f"  × {result['id']}: {result['error']}", file=sys.stderr)
+    wall_seconds = time.perf_counter() - started
+
+    ordered = [results[job['id']] for job in jobs]
+    succeeded = sum(1 for r in ordered if r['status'] == 'ok')
+    report = {
+        'total': len(ordered),
+        'succeeded': succeeded,
+        'failed': len(ordered) - succeeded,
+        'workers': workers,
+        'speed': speed,
+        'sample_rate': synth.sample_rate,
+        'formats': encoder.formats if encoder else ['wav'],
+        'wall_seconds': round(wall_seconds, 3),
+        'encode_wait_seconds': round(wall_seconds - synth_seconds, 3),
+        'sum_job_seconds': round(sum(r['seconds'] for r in ordered), 3),
+        'jobs': ordered,
+    }
+    if cache:
+        report['cache'] = cache.summary()
+    if caller:
+        report['requests'] = caller.summary()
+    print(f"  完成: {succeeded}/{len(ordered)}，耗时 {wall_seconds:.2f}s")
+    if cache:
+        stats = report['cache']
+        print(f"  缓存: 命中 {stats['hits'] + stats['pcm_hits']} / 查找 {stats['lookups']}")
+    if caller:
+        print(f"  请求: {format_call_stats(report['requests'])}")
+    return report
+
+def format_call_stats(stats):
+    """把 ResilientCaller 的计数格式化成一行"""
+    return (f"{stats['requests']} 次，重试 {stats['retries']}，对冲 {stats['hedges']}"
+            f"（胜出 {stats['hedge_wins']}），丢弃 {stats['wasted']}，失败 {stats['failed']}")
+
+def build_timing(clips, fps=30, sample_rate=SAMPLE_RATE, speed=1.0):
+    """
+    根据实际采样数生成时间清单
+
+    clips 为按播放顺序排列的 {'id', 'file', 'samples'}。字段名与 script.json 的
+    scenes 一致（duration / durationFrames / startTime / startFrame）。帧数向上取整，
+    保证画面时长不短于音频；每段从帧边界开始，startTime = startFrame / fps。
+    startSample 为各段首尾相接时的精确起始采样（如对话的整段音频）。
+    """
+    entries = []
+    start_frame = 0
+    start_samples = 0
+    for clip in clips:
+        samples = clip['samples']
+        frames = -(-samples * fps // sample_rate)  # 向上取整
+        entries.append({
+            'id': clip['id'],
+            'file': clip['file'],
+            'samples': samples,
+            'duration': round(samples / sample_rate, 4),
+            'durationFrames': frames,
+            'startTime': round(start_frame / fps, 4),
+            'startFrame': start_frame,
+            'startSample': start_samples,
+        })
+        start_frame += frames
+        start_samples += samples
+    return {
+        'sampleRate': sample_rate,
+        'fps': fps,
+        'speed': speed,
+        'totalSamples': start_samples,
+        'totalDuration': round(start_samples / sample_rate, 4),
+        'totalFrames': start_frame,
+        'clips': entries,
+    }
+
+def write_json(path, data):
+    """写 JSON 文件（UTF-8，带缩进）"""
+    Path(path).write_text(json.dumps(data, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+
+def predict_durations(jobs, model, speed=1.0):
+    """
+    不调用 API，按历史拟合的模型估计每个任务的时长
+
+    返回 build_timing 可用的 clips（samples 为估计值）和每个任务的预测详情。
+    """
+    clips, details = [], []
+    for job in jobs:
+        estimate = model.predict(job['text'], job['voice'], speed)
+        details.append({'id': job['id'], 'voice': job['voice'], **estimate})
+        clips.append({'id': job['id'], 'file': None, 'samples': round(estimate['seconds'] * SAMPLE_RATE)})
+    return clips, details
+
+def serve(synth, socket_path):
+    """
+    启动常驻服务：预先导入 SDK、创建客户端并预热连接
+
+    守护进程只负责合成和变速，后处理和编码由调用方的 CLI 完成。
+    """
+    def make_render():
+        detail = synth.warm()
+        if 'warmup_error' in detail:
+            print(f"  预热失败（不影响服务）: {detail.pop('warmup_error')}", file=sys.stderr)
+        return synth.render, detail
+
+    return tts_daemon.serve(socket_path, make_render)
 
 def main():
     parser = argparse.ArgumentParser(
@@ -127,12 +580,21 @@ def main():
 示例:
   %(prog)s "Hello world"
   %(prog)s "你好世界" --output=hello.wav --voice=Aoede
+  %(prog)s "Hello world" --speed=1.2 --raw | ffplay -f s16le -ar 24000 -ac 1 -
+  %(prog)s "Hello world" --trim --normalize --sample-rate 48000    # 直接输出 Remotion 可用的成品
+  %(prog)s --batch script.json --out-dir public/audio --workers 6 --speed=1.2 --timing timing.json
+  %(prog)s --batch script.json --out-dir public/audio --format mp3,wav    # scene-N.mp3 + scene-N.wav
+  %(prog)s --dialogue interview.txt --speakers Host=Kore,Guest=Puck --split --out-dir public/audio
+  %(prog)s "很长的旁白……" --stream --raw | ffplay -f s16le -ar 24000 -ac 1 -
+  %(prog)s --batch script.json --speed=1.2 --predict --timing planned.json    # 不调用 API，按历史预估时长
+  %(prog)s --serve &    # 启动常驻服务，之后的调用自动经由它合成
         """
     )
 
     parser.add_argument(
         'text',
-        help='要转换为语音的文本'
+        nargs='?',
+        help='要转换为语音的文本（使用 --batch 时省略）'
     )
     parser.add_argument(
         '--output', '-o',
@@ -142,7 +604,7 @@ def main():
     parser.add_argument(
         '--voice', '-v',
         default='Puck',
-        choices=['Puck', 'Charon', 'Kore', 'Fenrir', 'Aoede'],
+        choices=VOICES,
         help='语音选项（默认: Puck）'
     )
     parser.add_argument(
@@ -151,29 +613,452 @@ def main():
         default=1.0,
         help='播放速度倍数，范围 0.5-2.0（默认: 1.0）'
     )
+    parser.add_argument(
+        '--stretch',
+        default='auto',
+        choices=STRETCH_BACKENDS,
+        help='变速实现: native 为进程内 WSOLA（需要 numpy），ffmpeg 为 atempo 滤镜（默认: auto，优先 native）'
+    )
+    parser.add_argument(
+        '--format', '-f',
+        default='wav',
+        metavar='FMT[,FMT]',
+        help=f'输出格式，逗号分隔，可选 {", ".join(FORMATS)}；同一段 PCM 并发编码出每种格式（默认: wav，mp3/opus 需要 ffmpeg）'
+    )
+    parser.add_argument(
+        '--trim',
+        type=float,
+        nargs='?',
+        const=-45.0,
+        metavar='DB',
+        help='去掉首尾静音: 按 10ms 帧 RMS 判定，低于阈值的首尾部分裁掉（默认阈值: -45 dBFS，需要 numpy）'
+    )
+    parser.add_argument(
+        '--normalize',
+        type=float,
+        nargs='?',
+        const=-16.0,
+        metavar='DB',
+        help='增益归一化: 有声部分的 RMS 调到目标值，峰值不超过 -1 dBFS（默认目标: -16 dBFS，需要 numpy）'
+    )
+    parser.add_argument(
+        '--sample-rate',
+        type=int,
+        metavar='HZ',
+        help=f'输出采样率，多相重采样，如 48000（默认: {SAMPLE_RATE}，需要 numpy）'
+    )
+    parser.add_argument(
+        '--raw',
+        action='store_true',
+        help='把原始 PCM（s16le, 24kHz, 单声道）写到 stdout，供下游管道使用（忽略 --output）'
+    )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='流式合成: 音频分块到达即写出，并报告首字节时间（不经由守护进程）。'
+             '非 1.0x 时边收边变速，首段输出比 1.0x 多等约一帧（native 约 25ms 的输入）'
+    )
+    parser.add_argument(
+        '--chunk',
+        type=int,
+        nargs='?',
+        const=200,
+        metavar='CHARS',
+        help='长文本按句子分块并发合成后无缝拼接，可指定目标分块长度（默认: 200 字符）'
+    )
+    parser.add_argument(
+        '--batch',
+        metavar='FILE',
+        help='批量模式: 读取 script.json（scenes[].narration）或 NDJSON（每行 {"id", "text", "voice"}）'
+    )
+    parser.add_argument(
+        '--dialogue',
+        metavar='FILE',
+        help='对话模式: 读取 "说话人: 台词" 文本或 JSON（{"speakers", "lines"}），两人一组合并为一次多人请求'
+    )
+    parser.add_argument(
+        '--speakers',
+        metavar='MAP',
+        help='对话的说话人 → 语音映射，如 Host=Kore,Guest=Puck（未指定的按顺序自动分配）'
+    )
+    parser.add_argument(
+        '--split',
+        action='store_true',
+        help='对话模式下另外把每一行写成 <out-dir>/<id>.wav'
+    )
+    parser.add_argument(
+        '--out-dir',
+        default='.',
+        help='批量模式的输出目录，每个任务生成 <id>.wav（默认: 当前目录）'
+    )
+    parser.add_argument(
+        '--workers', '-j',
+        type=int,
+        default=4,
+        help='批量/分块模式的并发请求数（默认: 4）'
+    )
+    parser.add_argument(
+        '--report',
+        help='批量模式的汇总报告路径（默认: <out-dir>/batch-report.json）'
+    )
+    parser.add_argument(
+        '--endpoint',
+        metavar='URL',
+        help='覆盖 API 地址（等同于设置 GEMINI_TTS_ENDPOINT），如本地替身服务 http://127.0.0.1:8765'
+    )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=2,
+        help='可恢复错误（429/5xx/网络超时）的最大重试次数，指数退避 + 抖动（默认: 2）'
+    )
+    parser.add_argument(
+        '--retry-delay',
+        type=float,
+        default=1.0,
+        help='首次重试的退避基数（秒），之后每次翻倍（默认: 1.0）'
+    )
+    parser.add_argument(
+        '--hedge',
+        action='store_true',
+        help='启用对冲请求: 超过延迟阈值仍未返回时再发一个相同请求，取先完成的'
+    )
+    parser.add_argument(
+        '--hedge-after',
+        type=float,
+        metavar='MS',
+        help='对冲阈值（毫秒）；默认使用本次运行最近请求延迟的 p95'
+    )
+    parser.add_argument(
+        '--hedge-budget',
+        type=int,
+        default=5,
+        help='每次运行最多发起的对冲请求数（默认: 5）'
+    )
+    parser.add_argument(
+        '--timing',
+        metavar='FILE',
+        help='写出时间清单 JSON: 每段音频的精确采样数、秒数、帧数和累计起始帧'
+    )
+    parser.add_argument(
+        '--fps',
+        type=int,
+        default=30,
+        help='时间清单使用的帧率（默认: 30）'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='不使用本地音频缓存，每次都调用 API'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        help=f'本地音频缓存目录（默认: {default_cache_dir()}）'
+    )
+    parser.add_argument(
+        '--cache-max-mb',
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help=f'缓存大小上限（MB），超出后按 LRU 淘汰（默认: {DEFAULT_MAX_BYTES // (1024 * 1024)}）'
+    )
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='以常驻服务运行，保持预热的客户端，通过 Unix socket 接收请求'
+    )
+    parser.add_argument(
+        '--socket',
+        help=f'守护进程 socket 路径（默认: {tts_daemon.default_socket_path()}）'
+    )
+    parser.add_argument(
+        '--no-daemon',
+        action='store_true',
+        help='不转发到守护进程，始终在本进程内合成（设置了 --endpoint/--no-cache/--cache-dir/--stretch/'
+             '重试或对冲选项时同样不转发）'
+    )
+    parser.add_argument(
+        '--daemon-status',
+        action='store_true',
+        help='打印守护进程的启动耗时和请求延迟统计后退出'
+    )
+    parser.add_argument(
+        '--predict',
+        action='store_true',
+        help='不调用 API，按合成历史拟合的每语音模型预估文本/--batch/--dialogue 的时长（配合 --timing 写出预估清单）'
+    )
+    parser.add_argument(
+        '--history',
+        metavar='FILE',
+        help=f'合成历史文件（默认: {default_cache_dir() / "history.jsonl"}）'
+    )
+    parser.add_argument(
+        '--no-history',
+        action='store_true',
+        help='不记录本次合成的时长历史'
+    )
+    parser.add_argument(
+        '--cache-stats',
+        action='store_true',
+        help='打印缓存的累计命中统计和占用后退出'
+    )
 
     args = parser.parse_args()
+    daemon_overrides = [name for name in DAEMON_BYPASS_OPTIONS if getattr(args, name) != parser.get_default(name)]
+    use_daemon = tts_daemon.SUPPORTED and not args.no_daemon and not daemon_overrides
+
+    if args.endpoint:
+        os.environ['GEMINI_TTS_ENDPOINT'] = args.endpoint
+
+    cache = None
+    if not args.no_cache:
+        cache = AudioCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+
+    if args.cache_stats:
+        if cache is None:
+            print("错误: --cache-stats 不能与 --no-cache 同时使用", file=sys.stderr)
+            sys.exit(1)
+        summary = cache.summary()
+        stats = {name: summary[name] for name in ('dir', 'entries', 'bytes', 'max_bytes')}
+        stats['totals'] = cache.load_totals()
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        sys.exit(0)
+
+    socket_path = Path(args.socket) if args.socket else tts_daemon.default_socket_path()
+    if args.daemon_status:
+        try:
+            status, _ = tts_daemon.request(socket_path, {'op': 'status'}, timeout=5)
+        except OSError:
+            print(f"错误: 守护进程未运行: {socket_path}", file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(status, ensure_ascii=False, indent=2))
+        sys.exit(0)
+
+    # 验证输入参数
+    if args.serve:
+        if args.text or args.batch or args.dialogue:
+            print("错误: --serve 不能与文本、--batch 或 --dialogue 同时使用", file=sys.stderr)
+            sys.exit(1)
+    elif sum(map(bool, (args.text, args.batch, args.dialogue))) != 1:
+        print("错误: 请提供要转换的文本，或使用 --batch / --dialogue 指定文件（三者只能选一）", file=sys.stderr)
+        sys.exit(1)
+    if args.batch and (args.raw or args.stream or args.chunk):
+        print("错误: --raw/--stream/--chunk 不能与 --batch 同时使用", file=sys.stderr)
+        sys.exit(1)
+    if args.dialogue and (args.raw or args.stream or args.chunk):
+        print("错误: --raw/--stream/--chunk 不能与 --dialogue 同时使用", file=sys.stderr)
+        sys.exit(1)
+    if args.stream and args.chunk:
+        print("错误: --stream 不能与 --chunk 同时使用", file=sys.stderr)
+        sys.exit(1)
+    if args.chunk is not None and args.chunk < 20:
+        print("错误: --chunk 分块长度至少为 20 字符", file=sys.stderr)
+        sys.exit(1)
+    if args.workers < 1:
+        print("错误: --workers 必须大于 0", file=sys.stderr)
+        sys.exit(1)
 
     # 验证速度参数
     if args.speed < 0.5 or args.speed > 2.0:
         print("错误: 速度必须在 0.5 到 2.0 之间", file=sys.stderr)
         sys.exit(1)
 
-    # 检查 API Key
+    if args.retries < 0 or args.hedge_budget < 0:
+        print("错误: --retries 和 --hedge-budget 不能为负数", file=sys.stderr)
+        sys.exit(1)
+
+    if args.stretch == 'native' and tts_stretch is None:
+        print("错误: --stretch=native 需要 numpy，请运行: pip install numpy", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        formats = parse_formats(args.format)
+    except ValueError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        sys.exit(1)
+    encoder = None
+    if formats != ['wav']:
+        if args.raw or args.stream:
+            print("错误: --format 不能与 --raw/--stream 同时使用（只输出 WAV/PCM）", file=sys.stderr)
+            sys.exit(1)
+        encoder = EncoderPool(formats)
+        if encoder.needs_ffmpeg() and shutil.which('ffmpeg') is None:
+            print("错误: mp3/opus 编码需要 ffmpeg，请先安装 ffmpeg", file=sys.stderr)
+            sys.exit(1)
+
+    post = None
+    if args.trim is not None or args.normalize is not None or args.sample_rate:
+        if tts_post is None:
+            print("错误: --trim/--normalize/--sample-rate 需要 numpy，请运行: pip install numpy", file=sys.stderr)
+            sys.exit(1)
+        if args.stream:
+            print("错误: --trim/--normalize/--sample-rate 需要完整音频，不能与 --stream 同时使用", file=sys.stderr)
+            sys.exit(1)
+        if args.sample_rate is not None and not 8000 <= args.sample_rate <= 192000:
+            print("错误: --sample-rate 必须在 8000 到 192000 之间", file=sys.stderr)
+            sys.exit(1)
+        post = tts_post.PostProcess(trim_db=args.trim, normalize_db=args.normalize, sample_rate=args.sample_rate)
+
+    history = None if args.no_history else History(args.history or default_cache_dir() / 'history.jsonl')
+
+    if args.predict:
+        try:
+            if args.batch:
+                jobs = load_jobs(args.batch, default_voice=args.voice)
+            elif args.dialogue:
+                lines, speakers = load_dialogue(args.dialogue, parse_speakers(args.speakers), VOICES)
+                jobs = [{'id': line['id'], 'text': line['text'], 'voice': speakers[line['speaker']]} for line in lines]
+            else:
+                jobs = [{'id': Path(args.output).stem, 'text': args.text, 'voice': args.voice}]
+            records = History(args.history or default_cache_dir() / 'history.jsonl').load()
+        except (OSError, ValueError) as e:
+            print(f"错误: 无法读取输入: {e}", file=sys.stderr)
+            sys.exit(1)
+        model = DurationModel.fit(records)
+        clips, details = predict_durations(jobs, model, args.speed)
+        print(f"[Gemini TTS 时长预估]（{len(records)} 条历史，速度 {args.speed}x）")
+        for item in details:
+            print(f"  {item['id']:<12} {item['voice']:<7} {item['language']} {item['seconds']:7.2f}s"
+                  f"（{item['low']:.2f}-{item['high']:.2f}，{item['basis']}，n={item['n']}）")
+        timing = build_timing(clips, fps=args.fps, speed=args.speed)
+        print(f"  合计: {timing['totalDuration']}s，{timing['totalFrames']} 帧 @ {args.fps}fps")
+        if args.timing:
+            timing['predicted'] = True
+            timing['model'] = model.describe()
+            for entry, item in zip(timing['clips'], details):
+                entry.update(low=item['low'], high=item['high'], basis=item['basis'])
+            write_json(args.timing, timing)
+            print(f"  预估清单: {args.timing}")
+        sys.exit(0)
+
+    # 检查 API Key；只转发给守护进程的调用不需要（守护进程不可用、回退到进程内合成时才需要）
     api_key = os.getenv('GOOGLE_API_KEY')
-    if not api_key:
+    forward_only = use_daemon and args.text and not (args.serve or args.stream or args.chunk) and socket_path.exists()
+    if not api_key and not forward_only:
         print("错误: 未设置 GOOGLE_API_KEY 环境变量", file=sys.stderr)
         print("\n请运行: export GOOGLE_API_KEY='your-api-key'", file=sys.stderr)
         sys.exit(1)
 
-    # 生成语音
-    success = text_to_speech(
-        api_key=api_key,
-        text=args.text,
-        output_file=args.output,
-        voice_name=args.voice,
-        speed=args.speed
+    caller = ResilientCaller(
+        RetryPolicy(retries=args.retries, base_delay=args.retry_delay),
+        hedge=args.hedge,
+        hedge_after=args.hedge_after / 1000 if args.hedge_after is not None else None,
+        hedge_budget=args.hedge_budget,
     )
+    synth = Synthesizer(api_key, voice=args.voice, speed=args.speed, cache=cache, stretch=args.stretch, caller=caller,
+                        post=post)
+
+    if args.serve:
+        success = serve(synth, socket_path)
+        sys.exit(0 if success else 1)
+
+    if args.dialogue:
+        try:
+            lines, speakers = load_dialogue(args.dialogue, parse_speakers(args.speakers), VOICES)
+        except (OSError, ValueError) as e:
+            print(f"错误: 无法读取对话文件: {e}", file=sys.stderr)
+            sys.exit(1)
+        if not lines:
+            print("错误: 对话文件中没有台词", file=sys.stderr)
+            sys.exit(1)
+        info = {}
+        success = dialogue_to_speech(synth, lines, speakers, args.output, speed=args.speed,
+                                     split_dir=args.out_dir if args.split else None, workers=args.workers, info=info,
+                                     encoder=encoder)
+        if cache:
+            cache.save_totals()
+        if caller.stats.counts['requests']:
+            print(f"  请求: {format_call_stats(caller.summary())}")
+        if success and history:
+            # 行的时长不含末尾补的行间静音
+            for line, clip in zip(lines, info['clips']):
+                history.record(line['text'], speakers[line['speaker']], args.speed, clip['samples'] - clip['gap'],
+                               info['sample_rate'], source='dialogue')
+        if success and args.timing:
+            timing = build_timing(info['clips'], fps=args.fps, sample_rate=info['sample_rate'], speed=args.speed)
+            write_json(args.timing, timing)
+            print(f"  时间清单: {args.timing}（{timing['totalDuration']}s，{timing['totalFrames']} 帧 @ {args.fps}fps）")
+        sys.exit(0 if success else 1)
+
+    if args.batch:
+        try:
+            jobs = load_jobs(args.batch, default_voice=args.voice)
+        except (OSError, ValueError) as e:
+            print(f"错误: 无法读取任务文件: {e}", file=sys.stderr)
+            sys.exit(1)
+        if not jobs:
+            print("错误: 任务文件中没有可合成的文本", file=sys.stderr)
+            sys.exit(1)
+
+        report = run_batch(synth, jobs, args.out_dir, speed=args.speed, workers=args.workers, encoder=encoder)
+        if cache:
+            cache.save_totals()
+        if history:
+            texts = {job['id']: job['text'] for job in jobs}
+            for job in report['jobs']:
+                if job['status'] == 'ok':
+                    history.record(texts[job['id']], job['voice'], args.speed, job['samples'], job['sample_rate'], source='batch')
+        report_path = Path(args.report) if args.report else Path(args.out_dir) / 'batch-report.json'
+        write_json(report_path, report)
+        print(f"  报告: {report_path}")
+        if args.timing:
+            clips = [{'id': job['id'], 'file': job['output'], 'samples': job['samples']}
+                     for job in report['jobs'] if job['status'] == 'ok']
+            timing = build_timing(clips, fps=args.fps, sample_rate=report['sample_rate'], speed=args.speed)
+            missing = [job['id'] for job in report['jobs'] if job['status'] != 'ok']
+            if missing:
+                timing['missing'] = missing
+            write_json(args.timing, timing)
+            print(f"  时间清单: {args.timing}（{timing['totalFrames']} 帧 @ {args.fps}fps）")
+        sys.exit(0 if report['failed'] == 0 else 1)
+
+    # 生成语音
+    info = {}
+    if args.stream:
+        success = stream_to_speech(
+            synth,
+            text=args.text,
+            output_file=args.output,
+            voice_name=args.voice,
+            speed=args.speed,
+            raw_stdout=args.raw,
+            info=info
+        )
+    else:
+        success = text_to_speech(
+            synth,
+            text=args.text,
+            output_file=args.output,
+            voice_name=args.voice,
+            speed=args.speed,
+            raw_stdout=args.raw,
+            daemon_socket=socket_path if use_daemon else None,
+            chunk_chars=args.chunk,
+            workers=args.workers,
+            info=info,
+            encoder=encoder
+        )
+    if cache and cache.summary()['lookups']:
+        cache.save_totals()
+        stats = cache.summary()
+        log = sys.stderr if args.raw else sys.stdout
+        print(f"  缓存: 命中 {stats['hits'] + stats['pcm_hits']} / 查找 {stats['lookups']}（{stats['dir']}）", file=log)
+
+    if caller.stats.counts['requests']:
+        log = sys.stderr if args.raw else sys.stdout
+        print(f"  请求: {format_call_stats(caller.summary())}", file=log)
+
+    if success and history:
+        source = 'stream' if args.stream else 'chunk' if args.chunk else 'single'
+        history.record(args.text, args.voice, args.speed, info['samples'], info['sample_rate'], source=source)
+
+    if success and args.timing:
+        output = '-' if args.raw else args.output
+        clip_id = 'stdout' if args.raw else Path(args.output).stem
+        timing = build_timing([{'id': clip_id, 'file': output, 'samples': info['samples']}], fps=args.fps,
+                              sample_rate=info['sample_rate'], speed=args.speed)
+        write_json(args.timing, timing)
+        log = sys.stderr if args.raw else sys.stdout
+        print(f"  时间清单: {args.timing}（{timing['totalDuration']}s，{timing['totalFrames']} 帧 @ {args.fps}fps）", file=log)
 
     sys.exit(0 if success else 1)
 
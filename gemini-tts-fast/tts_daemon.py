@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Gemini TTS 常驻服务
+
+`tts_cli.py --serve` 启动后常驻一个已预热的 genai.Client（连接池和 TLS 会话
+复用），通过 Unix domain socket 接收合成请求。`tts_cli.py` 在发现 socket 时
+把请求转发过来，省掉每次调用的解释器启动、SDK 导入和 TLS 握手；守护进程
+不存在时自动回退到进程内合成。
+
+协议（每个连接一个请求）:
+  请求: 一行 JSON，{"text": ..., "voice": ..., "speed": ...} 或 {"op": "status"}
+  响应: 一行 JSON 头，{"ok": true, "bytes": N, ...} 后跟 N 字节 PCM
+        （s16le, 24kHz, 单声道，已按 speed 变速）；失败时 {"ok": false, "error": ...}
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import signal
+import tempfile
+import threading
+import socketserver
+from pathlib import Path
+
+# Windows 等不支持 AF_UNIX 的平台上不启用守护进程转发
+SUPPORTED = hasattr(socket, 'AF_UNIX')
+
+def default_socket_path():
+    """默认 socket 路径: $XDG_RUNTIME_DIR/gemini-tts-fast.sock（缺省放在临时目录）"""
+    runtime_dir = os.getenv('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return Path(runtime_dir) / 'gemini-tts-fast.sock'
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    return Path(tempfile.gettempdir()) / f'gemini-tts-fast-{uid}.sock'
+
+def _read_line(sock_file):
+    line = sock_file.readline()
+    if not line:
+        raise ConnectionError("连接已关闭")
+    return json.loads(line)
+
+def request(socket_path, payload, timeout=300):
+    """
+    向守护进程发送一个请求
+
+    返回 (header, pcm)。守护进程未运行时抛出 OSError（FileNotFoundError /
+    ConnectionRefusedError），调用方据此回退到进程内合成。
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(socket_path))
+        with sock.makefile('rwb') as sock_file:
+            sock_file.write(json.dumps(payload, ensure_ascii=False).encode('utf-8') + b'\n')
+            sock_file.flush()
+            header = _read_line(sock_file)
+            size = header.get('bytes', 0)
+            pcm = sock_file.read(size) if size else b''
+    if len(pcm) != size:
+        raise ConnectionError(f"响应不完整: {len(pcm)}/{size} 字节")
+    return header, pcm
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        server = self.server
+        try:
+            payload = _read_line(self.rfile)
+        except (ConnectionError, ValueError) as e:
+            self._reply({'ok': False, 'error': f"请求无效: {e}"})
+            return
+
+        if payload.get('op') == 'status':
+            self._reply(dict(ok=True, **server.status()))
+            return
+
+        started = time.perf_counter()
+        text = payload.get('text') or ''
+        voice = payload.get('voice') or 'Puck'
+        speed = float(payload.get('speed') or 1.0)
+        try:
+            pcm = server.render(text, voice, speed)
+            if pcm is None:
+                raise RuntimeError("未能从响应中获取音频数据")
+        except Exception as e:
+            latency_ms = (time.perf_counter() - started) * 1000
+            server.record(latency_ms, ok=False)
+            print(f"  × {voice} {speed}x {latency_ms:.0f}ms: {e}", file=sys.stderr)
+            self._reply({'ok': False, 'error': str(e), 'latency_ms': round(latency_ms, 1)})
+            return
+
+        latency_ms = (time.perf_counter() - started) * 1000
+        server.record(latency_ms, ok=True)
+        print(f"  ✓ {voice} {speed}x {len(text)} 字符 {latency_ms:.0f}ms", file=sys.stderr)
+        self._reply({'ok': True, 'bytes': len(pcm), 'latency_ms': round(latency_ms, 1)}, pcm)
+
+    def _reply(self, header, pcm=None):
+        try:
+            self.wfile.write(json.dumps(header, ensure_ascii=False).encode('utf-8') + b'\n')
+            if pcm is not None:
+                self.wfile.write(pcm)
+            self.wfile.flush()
+        except BrokenPipeError:
+            pass
+
+class TTSServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """多线程 Unix socket 服务，所有请求共享同一个 render 函数（及其客户端/缓存）"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, render, startup_ms):
+        self.render = render
+        self.startup_ms = startup_ms
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._latencies = []
+        self._failed = 0
+        super().__init__(str(socket_path), _Handler)
+
+    def record(self, latency_ms, ok):
+        with self._lock:
+            if ok:
+                self._latencies.append(latency_ms)
+                del self._latencies[:-1000]  # 只保留最近 1000 次
+            else:
+                self._failed += 1
+
+    def status(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            failed = self._failed
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))], 1)
+
+        return {
+            'pid': os.getpid(),
+            'uptime_s': round(time.time() - self.started_at, 1),
+            'startup_ms': self.startup_ms,
+            'requests': len(latencies) + failed,
+            'failed': failed,
+            'latency_ms': {'p50': percentile(50), 'p95': percentile(95), 'max': percentile(100)},
+        }
+
+def _is_alive(socket_path):
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(socket_path))
+        return True
+    except OSError:
+        return False
+
+def serve(socket_path, make_render):
+    """
+    启动守护进程并阻塞运行
+
+    make_render() 负责导入 SDK、创建客户端并返回 (render, startup_detail)，
+    其耗时计入启动延迟。
+    """
+    socket_path = Path(socket_path)
+    if socket_path.exists():
+        if _is_alive(socket_path):
+            print(f"错误: 守护进程已在运行: {socket_path}", file=sys.stderr)
+            return False
+        socket_path.unlink()  # 清理上次异常退出留下的 socket 文件
+
+    started = time.perf_counter()
+    render, startup_detail = make_render()
+    startup_ms = dict(total=round((time.perf_counter() - started) * 1000, 1), **startup_detail)
+
+    server = TTSServer(socket_path, render, startup_ms)
+    os.chmod(socket_path, 0o600)
+
+    def shutdown(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, shutdown)
+
+    detail = ', '.join(f"{name} {value}ms" for name, value in startup_detail.items())
+    print(f"[Gemini TTS 守护进程]", file=sys.stderr)
+    print(f"  socket: {socket_path}", file=sys.stderr)
+    print(f"  启动耗时: {startup_ms['total']}ms ({detail})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path.exists():
+            socket_path.unlink()
+        print(f"  已停止，共处理 {server.status()['requests']} 个请求", file=sys.stderr)
+    return True
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+多人对话合成
+
+对话脚本的每一行带说话人，说话人映射到预置语音。相邻的、最多包含两个说话人
+（API 的 multi-speaker 上限）的连续行合并成一次请求，使用 MultiSpeakerVoiceConfig
+一次合成整段对话；只有一个说话人的段落用普通的单语音请求。
+
+需要逐行的音频文件时，按静音间隔把整段音频切回每一行: 先找出所有足够长的
+静音段，再按每行文本长度估计的位置，选出单调递增、离估计位置最近（且尽量长）
+的 N-1 个静音段，在其中点切分，偏移精确到采样。找不到足够的静音段时返回 None，
+由调用方改为逐行合成。
+
+输入格式:
+  - JSON: {"speakers": {"Host": "Kore", "Guest": "Puck"},
+           "lines": [{"id": "l1", "speaker": "Host", "text": "..."}, ...]}
+    （也可以直接是 lines 列表）
+  - 文本: 每行 "说话人: 台词"（也接受全角冒号），语音由 --speakers 指定或按顺序自动分配
+
+音频处理只用标准库，格式固定为 s16le 单声道。
+"""
+
+import json
+import re
+from pathlib import Path
+
+from tts_chunk import _samples
+
+MAX_SPEAKERS = 2
+
+_LINE = re.compile(r'^\s*(?P<speaker>[^:：]{1,40}?)\s*[:：]\s*(?P<text>.+)$')
+
+def parse_speakers(spec):
+    """解析 "Host=Kore,Guest=Puck" 形式的说话人映射"""
+    speakers = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        name, sep, voice = item.partition('=')
+        if not sep or not name.strip() or not voice.strip():
+            raise ValueError(f"说话人映射格式应为 名字=语音: {item}")
+        speakers[name.strip()] = voice.strip()
+    return speakers
+
+def load_dialogue(path, speakers=None, voices=()):
+    """
+    读取对话脚本
+
+    Args:
+        path: JSON 或 "说话人: 台词" 文本文件
+        speakers: 说话人 → 语音映射（覆盖文件中的设置）
+        voices: 可用语音列表，用于校验和自动分配
+    Returns:
+        (lines, speakers)，lines 为 [{'id', 'speaker', 'text'}]
+    """
+    content = Path(path).read_text(encoding='utf-8')
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        data = None
+
+    mapping = {}
+    lines = []
+    if data is not None:
+        items = data.get('lines', []) if isinstance(data, dict) else data
+        if isinstance(data, dict):
+            mapping.update(data.get('speakers') or {})
+        for index, item in enumerate(items, start=1):
+            text = (item.get('text') or '').strip()
+            speaker = (item.get('speaker') or '').strip()
+            if not text or not speaker:
+                raise ValueError(f"第 {index} 条缺少 speaker 或 text")
+            lines.append({'id': str(item.get('id') or f'line-{index}'), 'speaker': speaker, 'text': text})
+    else:
+        for line_no, line in enumerate(content.splitlines(), start=1):
+            if not line.strip():
+                continue
+            match = _LINE.match(line)
+            if not match:
+                raise ValueError(f"第 {line_no} 行缺少说话人（格式: 说话人: 台词）")
+            lines.append({'id': f'line-{len(lines) + 1}', 'speaker': match['speaker'], 'text': match['text'].strip()})
+
+    mapping.update(speakers or {})
+    # 未指定语音的说话人按出现顺序分配尚未使用的语音
+    unused = [voice for voice in voices if voice not in mapping.values()]
+    for line in lines:
+        if line['speaker'] not in mapping:
+            if not unused:
+                raise ValueError(f"说话人 {line['speaker']} 没有可分配的语音，请用 --speakers 指定")
+            mapping[line['speaker']] = unused.pop(0)
+    for name, voice in mapping.items():
+        if voices and voice not in voices:
+            raise ValueError(f"说话人 {name} 的语音无效: {voice}")
+    if len({line['id'] for line in lines}) != len(lines):
+        raise ValueError("台词 id 存在重复")
+    return lines, {name: mapping[name] for name in dict.fromkeys(line['speaker'] for line in lines)}
+
+def group_lines(lines, max_speakers=MAX_SPEAKERS):
+    """把连续的行分组，每组最多 max_speakers 个不同说话人，返回 [[line, ...], ...]"""
+    groups = []
+    current, names = [], set()
+    for line in lines:
+        if current and line['speaker'] not in names and len(names) >= max_speakers:
+            groups.append(current)
+            current, names = [], set()
+        current.append(line)
+        names.add(line['speaker'])
+    if current:
+        groups.append(current)
+    return groups
+
+def group_request(group, speakers):
+    """
+    一组台词对应的请求: 返回 (prompt, voice_name, speaker_voices)
+
+    两个说话人时 prompt 为 "说话人: 台词" 逐行排列，speaker_voices 为该组的映射；
+    单个说话人时只拼接台词，用普通单语音请求（speaker_voices 为 None）。
+    """
+    names = list(dict.fromkeys(line['speaker'] for line in group))
+    if len(names) == 1:
+        return '\n'.join(line['text'] for line in group), speakers[names[0]], None
+    prompt = f"TTS the following conversation between {' and '.join(names)}:\n"
+    prompt += '\n'.join(f"{line['speaker']}: {line['text']}" for line in group)
+    return prompt, None, {name: speakers[name] for name in names}
+
+def _frame_levels(samples, frame):
+    """每帧的平均绝对幅值"""
+    return [sum(map(abs, samples[i:i + frame])) / len(samples[i:i + frame]) for i in range(0, len(samples), frame)]
+
+def find_gaps(samples, sample_rate, min_gap_ms=150, threshold=300, frame_ms=10):
+    """找出内部（不含首尾）连续静音段，返回 [(起始采样, 结束采样), ...]"""
+    frame = int(sample_rate * frame_ms / 1000)
+    levels = _frame_levels(samples, frame)
+    min_frames = max(1, min_gap_ms // frame_ms)
+    gaps = []
+    start = None
+    for index, level in enumerate(levels + [threshold]):
+        if level < threshold and start is None:
+            start = index
+        elif level >= threshold and start is not None:
+            if start > 0 and index < len(levels) and index - start >= min_frames:
+                gaps.append((start * frame, index * frame))
+            start = None
+    return gaps
+
+def split_turns(pcm, texts, sample_rate=24000, min_gap_ms=150):
+    """
+    按静音间隔把整段音频切回每一行
+
+    Args:
+        pcm: 一组台词合成出的完整 PCM
+        texts: 该组每一行的文本（用于按长度估计切分位置）
+    Returns:
+        每行的 (起始采样, 结束采样) 列表，首尾相接覆盖整段音频；静音段不足时返回 None
+    """
+    samples = _samples(pcm)
+    total = len(samples)
+    if len(texts) <= 1:
+        return [(0, total)]
+    gaps = find_gaps(samples, sample_rate, min_gap_ms)
+    need = len(texts) - 1
+    if len(gaps) < need:
+        return None
+
+    # 按文本长度把整段时长按比例分配，得到每个边界的估计位置
+    weights = [max(1, len(text)) for text in texts]
+    expected = []
+    acc = 0
+    for weight in weights[:-1]:
+        acc += weight
+        expected.append(total * acc / sum(weights))
+
+    # 动态规划: 第 k 个边界选第 j 个静音段，静音段下标严格递增；
+    # 代价为离估计位置的距离减去静音段长度（更长的停顿更可能是换人）
+    def cost(k, j):
+        start, end = gaps[j]
+        return abs((start + end) / 2 - expected[k]) - (end - start)
+
+    inf = float('inf')
+    best = [[inf] * len(gaps) for _ in range(need)]
+    choice = [[-1] * len(gaps) for _ in range(need)]
+    for j in range(len(gaps) - need + 1):
+        best[0][j] = cost(0, j)
+    for k in range(1, need):
+        running, running_j = inf, -1
+        for j in range(k, len(gaps) - need + k + 1):
+            if best[k - 1][j - 1] < running:
+                running, running_j = best[k - 1][j - 1], j - 1
+            best[k][j] = running + cost(k, j)
+            choice[k][j] = running_j
+
+    j = min(range(len(gaps)), key=lambda index: best[need - 1][index])
+    picked = [j]
+    for k in range(need - 1, 0, -1):
+        j = choice[k][j]
+        picked.append(j)
+    picked.reverse()
+
+    cuts = [0] + [(gaps[j][0] + gaps[j][1]) // 2 for j in picked] + [total]
+    return [(cuts[i], cuts[i + 1]) for i in range(len(texts))]
+
+def silence(sample_rate, ms):
+    """ms 毫秒的静音 PCM"""
+    return bytes(2 * int(sample_rate * ms / 1000))
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+多格式编码
+
+同一段内存中的 PCM 直接编码成多种格式，不再先写 WAV 再逐个转换:
+  - wav:  在进程内写 44 字节头 + PCM
+  - mp3:  ffmpeg libmp3lame（VBR -q:a 2）
+  - opus: ffmpeg libopus（Ogg 封装）
+
+PCM 通过 stdin 交给 ffmpeg，编码结果直接写到目标文件。EncoderPool 在线程池中
+并发执行这些编码（实际编码在 ffmpeg 子进程里，线程只负责喂数据和等待），
+submit 立即返回，调用方可以在编码进行时继续请求下一段音频。
+"""
+
+import os
+import struct
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# ffmpeg 输出参数；wav 在进程内写出
+FFMPEG_CODECS = {
+    'mp3': ['-c:a', 'libmp3lame', '-q:a', '2', '-f', 'mp3'],
+    'opus': ['-c:a', 'libopus', '-b:a', '64k', '-f', 'ogg'],
+}
+FORMATS = ['wav', *FFMPEG_CODECS]
+
+# 流式写出时长度未知：RIFF/data 长度先写成最大值，读取方按“读到文件结尾”处理
+WAV_UNKNOWN_SIZE = 0xFFFFFFFF
+
+def wav_header(data_size, sample_rate=24000, channels=1, sample_width=2):
+    """构建 44 字节的标准 PCM WAV 头（data_size 为 WAV_UNKNOWN_SIZE 时生成流式占位头）"""
+    block_align = channels * sample_width
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', min(36 + data_size, WAV_UNKNOWN_SIZE), b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate, sample_rate * block_align, block_align, sample_width * 8,
+        b'data', data_size,
+    )
+
+def write_wav(output_path, pcm, sample_rate=24000):
+    """直接把 PCM 缓冲区写成 WAV（不经过临时文件和 ffmpeg）"""
+    with open(output_path, 'wb') as f:
+        f.write(wav_header(len(pcm), sample_rate))
+        f.write(pcm)
+
+def parse_formats(spec):
+    """解析 "wav,mp3" 形式的格式列表（去重，保持顺序）"""
+    formats = list(dict.fromkeys(part.strip().lower() for part in spec.split(',') if part.strip()))
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if unknown or not formats:
+        raise ValueError(f"不支持的格式: {', '.join(unknown) or spec}（可选: {', '.join(FORMATS)}）")
+    return formats
+
+def encode(pcm, sample_rate, fmt, output_path):
+    """把 s16le 单声道 PCM 编码为 fmt 并写到 output_path，返回路径"""
+    if fmt == 'wav':
+        write_wav(output_path, pcm, sample_rate)
+        return str(output_path)
+    ffmpeg_cmd = [
+        'ffmpeg', '-loglevel', 'error', '-y',
+        '-f', 's16le', '-ar', str(sample_rate), '-ac', '1', '-i', 'pipe:0',
+        *FFMPEG_CODECS[fmt],
+        str(output_path),
+    ]
+    subprocess.run(ffmpeg_cmd, input=memoryview(pcm), capture_output=True, check=True)
+    return str(output_path)
+
+class EncoderPool:
+    """
+    编码任务池
+
+    Args:
+        formats: 输出格式列表
+        workers: 同时运行的编码数（默认为 CPU 核数，最多 8）
+    """
+
+    def __init__(self, formats=('wav',), workers=None):
+        self.formats = list(formats)
+        self._pool = ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1),
+                                        thread_name_prefix='tts-encode')
+
+    def submit(self, pcm, sample_rate, base_path):
+        """
+        提交一段 PCM 的全部格式编码，立即返回 {格式: Future}
+
+        输出路径为 base_path 加各格式的扩展名；Future 的结果为写出的路径。
+        """
+        base_path = Path(base_path)
+        return {
+            fmt: self._pool.submit(encode, pcm, sample_rate, fmt, base_path.with_name(f"{base_path.name}.{fmt}"))
+            for fmt in self.formats
+        }
+
+    def encode(self, pcm, sample_rate, base_path):
+        """编码并等待全部完成，返回 {格式: 路径}；任一格式失败时抛出其异常"""
+        return {fmt: future.result() for fmt, future in self.submit(pcm, sample_rate, base_path).items()}
+
+    def needs_ffmpeg(self):
+        return any(fmt in FFMPEG_CODECS for fmt in self.formats)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
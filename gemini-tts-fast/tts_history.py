@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+合成历史与时长预测
+
+每次成功合成后追加一条记录（语音、语言、速度、字数/词数、实际采样数）到
+NDJSON 历史文件。DurationModel 按 (语音, 语言) 用最小二乘拟合
+
+    1.0x 时长（秒） = intercept + seconds_per_unit × 单位数
+
+其中单位数为汉字数 + 英文词数，实际时长按速度换算回 1.0x 后参与拟合；预测时再
+除以目标速度。样本不足时依次退回到同语言所有语音的拟合、内置的默认语速，
+不需要调用 API。
+"""
+
+import json
+import math
+import re
+import threading
+import time
+from pathlib import Path
+
+# 没有历史数据时的默认语速（1.0x）：英文约 2.5 词/秒，中文约 4.5 字/秒
+DEFAULT_RATES = {'en': 2.5, 'zh': 4.5}
+DEFAULT_INTERCEPT = 0.3
+DEFAULT_SPREAD = 0.15  # 默认模型的相对误差
+MIN_SAMPLES = 3
+
+_CJK = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]')
+_WORD = re.compile(r"[A-Za-z0-9]+(?:['’][A-Za-z]+)?")
+
+def text_units(text):
+    """返回 (汉字数, 英文词数)"""
+    return len(_CJK.findall(text)), len(_WORD.findall(text))
+
+def detect_language(text):
+    """汉字数多于英文词数时视为中文"""
+    cjk, words = text_units(text)
+    return 'zh' if cjk > words else 'en'
+
+class History:
+    """追加写入的 NDJSON 历史文件，可在多个线程间共享"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def record(self, text, voice, speed, samples, sample_rate, source='single'):
+        cjk, words = text_units(text)
+        entry = {
+            'time': int(time.time()),
+            'source': source,
+            'voice': voice,
+            'language': detect_language(text),
+            'speed': speed,
+            'chars': len(text),
+            'cjk': cjk,
+            'words': words,
+            'samples': samples,
+            'sample_rate': sample_rate,
+        }
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open('a', encoding='utf-8') as f:
+                f.write(line)
+
+    def load(self):
+        """读取全部记录；损坏的行跳过"""
+        if not self.path.exists():
+            return []
+        records = []
+        for line in self.path.read_text(encoding='utf-8').splitlines():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return records
+
+def _fit(points):
+    """对 [(units, seconds)] 做一元线性回归，返回 (intercept, slope, rmse)"""
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if var_x == 0:
+        # 所有样本长度相同: 只拟合过原点的斜率
+        intercept, slope = 0.0, mean_y / mean_x if mean_x else 0.0
+    else:
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+        intercept = mean_y - slope * mean_x
+        if slope <= 0:
+            intercept, slope = 0.0, sum(y for _, y in points) / max(1, sum(x for x, _ in points))
+    residual = sum((y - intercept - slope * x) ** 2 for x, y in points)
+    return intercept, slope, math.sqrt(residual / max(1, n - 2))
+
+class DurationModel:
+    """按 (语音, 语言) 拟合的时长模型"""
+
+    def __init__(self, fits=None):
+        self.fits = fits or {}
+
+    @classmethod
+    def fit(cls, records, min_samples=MIN_SAMPLES):
+        groups = {}
+        for record in records:
+            units = record.get('cjk', 0) + record.get('words', 0)
+            if not units or not record.get('samples') or not record.get('sample_rate'):
+                continue
+            seconds = record['samples'] / record['sample_rate'] * record.get('speed', 1.0)
+            for key in ((record['voice'], record['language']), ('*', record['language'])):
+                groups.setdefault(key, []).append((units, seconds))
+        fits = {}
+        for key, points in groups.items():
+            if len(points) >= min_samples:
+                intercept, slope, rmse = _fit(points)
+                fits[key] = {'intercept': intercept, 'seconds_per_unit': slope, 'rmse': rmse, 'n': len(points)}
+        return cls(fits)
+
+    def predict(self, text, voice, speed=1.0):
+        """
+        预测时长，返回 {'seconds', 'low', 'high', 'language', 'units', 'basis', 'n'}
+
+        basis 为 voice（该语音的拟合）、language（同语言所有语音）或 default（默认语速）；
+        low/high 为约 95% 区间。
+        """
+        language = detect_language(text)
+        cjk, words = text_units(text)
+        units = cjk + words
+        for basis, key in (('voice', (voice, language)), ('language', ('*', language))):
+            fit = self.fits.get(key)
+            if fit:
+                base = fit['intercept'] + fit['seconds_per_unit'] * units
+                spread = 1.96 * fit['rmse']
+                n = fit['n']
+                break
+        else:
+            basis, n = 'default', 0
+            base = DEFAULT_INTERCEPT + units / DEFAULT_RATES[language]
+            spread = base * DEFAULT_SPREAD
+        base = max(base, 0.0)
+        return {
+            'seconds': round(base / speed, 3),
+            'low': round(max(0.0, base - spread) / speed, 3),
+            'high': round((base + spread) / speed, 3),
+            'language': language,
+            'units': units,
+            'basis': basis,
+            'n': n,
+        }
+
+    def describe(self):
+        """每个拟合的摘要（1.0x 下每秒单位数），供 --predict 输出"""
+        return {
+            f"{voice}/{language}": {
+                'units_per_second': round(1 / fit['seconds_per_unit'], 3) if fit['seconds_per_unit'] else None,
+                'intercept': round(fit['intercept'], 3),
+                'rmse': round(fit['rmse'], 3),
+                'n': fit['n'],
+            }
+            for (voice, language), fit in sorted(self.fits.items())
+        }
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+本地 Gemini TTS 替身服务
+
+实现 tts_cli.py 用到的 generate_content 音频 API 子集，返回确定性的 PCM，
+延迟、抖动和错误率可配置，用于压测和无网络的 CI，不消耗 API 配额:
+
+  POST /v1beta/models/{model}:generateContent
+  POST /v1beta/models/{model}:streamGenerateContent?alt=sse
+  GET  /v1beta/models/{model}
+
+音频: 按 (文本, 语音) 的哈希选一个音高，时长与文本长度成正比，同样的输入
+总是得到同样的字节。多行文本逐行合成，行间插入停顿；多人对话配置下按
+"说话人: 台词" 使用各自的语音（其余行视为指令，不发音）。
+
+Usage:
+    python tts_mock_server.py [--port 8765] [--profile realistic] [--latency-ms 800] [--error-rate 0.02]
+    GEMINI_TTS_ENDPOINT=http://127.0.0.1:8765 python tts_cli.py "Hello" --output=hello.wav
+"""
+
+import re
+import sys
+import json
+import math
+import time
+import base64
+import random
+import struct
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+SAMPLE_RATE = 24000
+
+# 预设的延迟/错误配置: latency_ms 为基础延迟，jitter_ms 为均匀抖动上限，
+# per_char_ms 随文本长度增加，tail_rate/tail_factor 模拟长尾，error_rate 返回 503/429
+PROFILES = {
+    'fast': dict(latency_ms=20, jitter_ms=5, per_char_ms=0.0, error_rate=0.0, tail_rate=0.0, tail_factor=1.0),
+    'realistic': dict(latency_ms=800, jitter_ms=400, per_char_ms=8.0, error_rate=0.02, tail_rate=0.05, tail_factor=4.0),
+    'flaky': dict(latency_ms=500, jitter_ms=300, per_char_ms=4.0, error_rate=0.15, tail_rate=0.05, tail_factor=3.0),
+    'slow-tail': dict(latency_ms=300, jitter_ms=100, per_char_ms=2.0, error_rate=0.0, tail_rate=0.1, tail_factor=8.0),
+}
+
+_PATH = re.compile(r'^/(?P<version>v1\w*)/models/(?P<model>[^/:]+)(?::(?P<method>\w+))?$')
+_PERIODS = {}
+
+def _period(frequency):
+    """一个周期的正弦波（整数采样长度），缓存复用"""
+    if frequency not in _PERIODS:
+        length = SAMPLE_RATE // frequency
+        _PERIODS[frequency] = b''.join(
+            struct.pack('<h', int(6000 * math.sin(2 * math.pi * i / length))) for i in range(length)
+        )
+    return _PERIODS[frequency]
+
+def synth_pcm(text, voice, seconds_per_char=0.06):
+    """确定性 PCM: 音高由 (文本, 语音) 哈希决定，时长约为 字符数 × seconds_per_char（至少 0.5 秒）"""
+    digest = hashlib.sha256(f'{voice}\0{text}'.encode('utf-8')).digest()
+    frequency = (120, 150, 160, 200, 240, 300)[digest[0] % 6]
+    samples = int(max(0.5, len(text) * seconds_per_char) * SAMPLE_RATE)
+    period = _period(frequency)
+    repeats = -(-samples * 2 // len(period))
+    return (period * repeats)[:samples * 2]
+
+def _request_text(body):
+    parts = []
+    contents = body.get('contents', [])
+    if isinstance(contents, dict):
+        contents = [contents]
+    for content in contents:
+        if isinstance(content, str):
+            parts.append(content)
+            continue
+        for part in content.get('parts', []):
+            if 'text' in part:
+                parts.append(part['text'])
+    return '\n'.join(parts)
+
+def _field(data, name):
+    """按 camelCase 或 snake_case 取字段（API 两种写法都接受，SDK 的嵌套配置用 snake_case）"""
+    snake = re.sub(r'([A-Z])', lambda m: '_' + m.group(1).lower(), name)
+    return data.get(name, data.get(snake)) or {}
+
+def _voice_name(config):
+    return _field(_field(_field(config, 'voiceConfig'), 'prebuiltVoiceConfig'), 'voiceName') or None
+
+def synth_request(text, body, seconds_per_char=0.06, pause_s=0.4):
+    """按请求的语音配置合成整段音频"""
+    speech = _field(_field(body, 'generationConfig'), 'speechConfig')
+    speakers = {
+        config.get('speaker'): _voice_name(config) or 'Puck'
+        for config in _field(_field(speech, 'multiSpeakerVoiceConfig'), 'speakerVoiceConfigs') or []
+    }
+    voice = _voice_name(speech) or 'Puck'
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if len(lines) <= 1 and not speakers:
+        return synth_pcm(text, voice, seconds_per_char)
+
+    pieces = []
+    for line in lines:
+        if speakers:
+            name, sep, spoken = line.partition(':')
+            if not sep or name.strip() not in speakers:
+                continue  # 指令行
+            pieces.append(synth_pcm(spoken.strip(), speakers[name.strip()], seconds_per_char))
+        else:
+            pieces.append(synth_pcm(line, voice, seconds_per_char))
+    return (b'\0\0' * int(pause_s * SAMPLE_RATE)).join(pieces) or synth_pcm(text, voice, seconds_per_char)
+
+def _response(model, pcm, text):
+    return {
+        'candidates': [{
+            'content': {
+                'role': 'model',
+                'parts': [{'inlineData': {'mimeType': f'audio/L16;codec=pcm;rate={SAMPLE_RATE}',
+                                          'data': base64.b64encode(pcm).decode('ascii')}}],
+            },
+            'finishReason': 'STOP',
+            'index': 0,
+        }],
+        'usageMetadata': {'promptTokenCount': len(text) // 4 + 1, 'candidatesTokenCount': len(pcm) // 960},
+        'modelVersion': model,
+    }
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message, api_status):
+        self._send_json(status, {'error': {'code': status, 'message': message, 'status': api_status}})
+
+    def do_GET(self):
+        match = _PATH.match(urlparse(self.path).path)
+        if not match or match['method']:
+            self._send_error(404, 'Not found', 'NOT_FOUND')
+            return
+        self._send_json(200, {'name': f"models/{match['model']}", 'displayName': match['model'],
+                              'supportedActions': ['generateContent', 'streamGenerateContent']})
+
+    def do_POST(self):
+        match = _PATH.match(urlparse(self.path).path)
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_error(400, 'Invalid JSON payload', 'INVALID_ARGUMENT')
+            return
+        if not match or match['method'] not in ('generateContent', 'streamGenerateContent'):
+            self._send_error(404, 'Not found', 'NOT_FOUND')
+            return
+
+        server = self.server
+        text = _request_text(body)
+        if not text:
+            self._send_error(400, 'contents must not be empty', 'INVALID_ARGUMENT')
+            return
+
+        delay, error = server.plan(len(text))
+        if error:
+            time.sleep(delay / 4)
+            if error == 429:
+                self._send_error(429, 'Resource has been exhausted (mock).', 'RESOURCE_EXHAUSTED')
+            else:
+                self._send_error(503, 'The model is overloaded (mock).', 'UNAVAILABLE')
+            return
+
+        pcm = synth_request(text, body, server.seconds_per_char)
+        if match['method'] == 'generateContent':
+            time.sleep(delay)
+            self._send_json(200, _response(match['model'], pcm, text))
+            return
+
+        # SSE: 首块在 delay 的一半时到达，其余分块均匀分布在剩余时间
+        chunk_bytes = SAMPLE_RATE  # 0.5 秒音频
+        chunks = [pcm[i:i + chunk_bytes] for i in range(0, len(pcm), chunk_bytes)]
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        time.sleep(delay / 2)
+        for index, chunk in enumerate(chunks):
+            if index:
+                time.sleep(delay / 2 / len(chunks))
+            event = f"data: {json.dumps(_response(match['model'], chunk, text))}\r\n\r\n".encode('utf-8')
+            self.wfile.write(f'{len(event):x}\r\n'.encode('ascii') + event + b'\r\n')
+            self.wfile.flush()
+        self.wfile.write(b'0\r\n\r\n')
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, profile, seed=None, seconds_per_char=0.06, verbose=False):
+        self.profile = profile
+        self.seconds_per_char = seconds_per_char
+        self.verbose = verbose
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        super().__init__(address, MockHandler)
+
+    def plan(self, text_length):
+        """为一次请求抽取 (延迟秒数, 错误码或 None)"""
+        p = self.profile
+        with self._lock:
+            roll = self._random.random()
+            jitter = self._random.uniform(0, p['jitter_ms'])
+            tail = self._random.random() < p['tail_rate']
+        delay_ms = p['latency_ms'] + jitter + p['per_char_ms'] * text_length
+        if tail:
+            delay_ms *= p['tail_factor']
+        error = None
+        if roll < p['error_rate']:
+            error = 429 if roll < p['error_rate'] / 4 else 503
+        return delay_ms / 1000, error
+
+    @property
+    def endpoint(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+def start(port=0, profile='fast', host='127.0.0.1', **overrides):
+    """在后台线程启动替身服务，返回 MockServer（用 server.endpoint 取地址，server.shutdown() 停止）"""
+    settings = dict(PROFILES[profile])
+    seed = overrides.pop('seed', None)
+    seconds_per_char = overrides.pop('seconds_per_char', 0.06)
+    settings.update({k: v for k, v in overrides.items() if v is not None})
+    server = MockServer((host, port), settings, seed=seed, seconds_per_char=seconds_per_char)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description='本地 Gemini TTS 替身服务（确定性 PCM，可配置延迟/错误率）')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址（默认: 127.0.0.1）')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口（默认: 8765）')
+    parser.add_argument('--profile', default='realistic', choices=sorted(PROFILES), help='预设配置（默认: realistic）')
+    parser.add_argument('--latency-ms', type=float, help='覆盖基础延迟（毫秒）')
+    parser.add_argument('--jitter-ms', type=float, help='覆盖抖动上限（毫秒）')
+    parser.add_argument('--per-char-ms', type=float, help='覆盖每字符附加延迟（毫秒）')
+    parser.add_argument('--error-rate', type=float, help='覆盖错误率（0-1，返回 503/429）')
+    parser.add_argument('--seed', type=int, help='随机种子，固定延迟和错误序列')
+    parser.add_argument('--verbose', action='store_true', help='打印每个请求')
+    args = parser.parse_args()
+
+    settings = dict(PROFILES[args.profile])
+    for name in ('latency_ms', 'jitter_ms', 'per_char_ms', 'error_rate'):
+        value = getattr(args, name)
+        if value is not None:
+            settings[name] = value
+
+    server = MockServer((args.host, args.port), settings, seed=args.seed, verbose=args.verbose)
+    print(f"[Gemini TTS 替身服务] {server.endpoint}  profile={args.profile} {settings}", file=sys.stderr)
+    print(f"  使用: GEMINI_TTS_ENDPOINT={server.endpoint} python tts_cli.py ...", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
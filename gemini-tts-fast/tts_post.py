@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+单次内存后处理: 去首尾静音、增益归一化、重采样
+
+替代合成后依次跑的多个 ffmpeg 命令（silenceremove → loudnorm → aresample），
+每个都要完整解码/编码一遍文件。这里 PCM 只转换一次为 float32 数组，各步骤
+依次在数组上完成，最后转换回 s16le，由 tts_cli 直接写出最终文件。
+
+- 去静音: 按 frame_ms 分帧计算 RMS，裁掉首尾低于阈值（dBFS）的帧，两端保留 pad_ms
+- 归一化: 把有声部分（RMS 高于门限的帧）的 RMS 调到目标 dBFS，峰值不超过 peak_db
+- 重采样: 多相 FIR（Kaiser 窗 sinc），只计算实际需要的输出点，如 24k → 48k
+
+依赖 numpy（可选）；未安装时 tts_cli 不提供这些选项。
+"""
+
+from math import gcd
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+FULL_SCALE = 32768.0
+
+def _db(value):
+    return 20 * np.log10(np.maximum(value, 1e-10))
+
+def frame_rms(samples, sample_rate, frame_ms=10):
+    """每帧的 RMS（dBFS），最后不足一帧的部分单独成帧"""
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    count = -(-len(samples) // frame)
+    padded = np.zeros(count * frame, dtype=np.float32)
+    padded[:len(samples)] = samples
+    energy = np.mean(np.square(padded.reshape(count, frame) / FULL_SCALE), axis=1)
+    return _db(np.sqrt(energy)), frame
+
+def trim_bounds(samples, sample_rate, threshold_db=-45.0, frame_ms=10, pad_ms=50):
+    """trim 保留的范围 (start, end)；整段都低于阈值时为整段"""
+    if len(samples) == 0:
+        return 0, 0
+    levels, frame = frame_rms(samples, sample_rate, frame_ms)
+    loud = np.flatnonzero(levels >= threshold_db)
+    if len(loud) == 0:
+        return 0, len(samples)
+    pad = int(sample_rate * pad_ms / 1000)
+    return max(0, loud[0] * frame - pad), min(len(samples), (loud[-1] + 1) * frame + pad)
+
+def trim(samples, sample_rate, threshold_db=-45.0, frame_ms=10, pad_ms=50):
+    """裁掉首尾 RMS 低于 threshold_db 的部分，两端各保留 pad_ms；整段都低于阈值时原样返回"""
+    start, end = trim_bounds(samples, sample_rate, threshold_db, frame_ms, pad_ms)
+    return samples[start:end]
+
+def normalize(samples, sample_rate, target_db=-16.0, peak_db=-1.0, gate_db=-50.0, frame_ms=10):
+    """
+    增益归一化
+
+    只按有声帧（RMS 高于 gate_db）计算响度，避免停顿拉低测量值；
+    增益同时受 peak_db 限制，不会削波。
+    """
+    if len(samples) == 0:
+        return samples
+    levels, _ = frame_rms(samples, sample_rate, frame_ms)
+    active = levels[levels >= gate_db]
+    if len(active) == 0:
+        return samples
+    # 帧能量的平均值（而不是 dB 的平均值）
+    current_db = 10 * np.log10(np.mean(10 ** (active / 10)))
+    gain = 10 ** ((target_db - current_db) / 20)
+    peak = np.max(np.abs(samples)) / FULL_SCALE
+    if peak > 0:
+        gain = min(gain, 10 ** (peak_db / 20) / peak)
+    return samples * np.float32(gain)
+
+def lowpass_bank(up, down, half_taps=16, beta=8.0):
+    """
+    多相抗混叠滤波器组
+
+    原型滤波器以上采样后的采样率设计，截止频率取输入/输出较低 Nyquist 的 95%，
+    按相位拆成 up 行，每行 taps 个系数。返回 (bank, 原型滤波器的群延迟)。
+    """
+    factor = max(up, down)
+    cutoff = 0.95 / factor
+    n = np.arange(-half_taps * factor, half_taps * factor + 1)
+    h = cutoff * np.sinc(cutoff * n) * np.kaiser(len(n), beta)
+    h *= up / h.sum()  # 每个相位的直流增益为 1
+    taps = -(-len(h) // up)
+    h = np.concatenate([h, np.zeros(taps * up - len(h))])
+    return h.reshape(taps, up).T[:, ::-1].astype(np.float32), (len(n) - 1) // 2
+
+def resample(samples, src_rate, dst_rate, block=16384):
+    """
+    多相重采样
+
+    输出第 n 点只用到 taps 个输入采样: 对同一相位的输出点，输入窗口以 down 为步长
+    等距排列，用跨步视图取窗口后按块做矩阵乘法，不生成上采样的中间序列。
+    """
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    g = gcd(src_rate, dst_rate)
+    up, down = dst_rate // g, src_rate // g
+    bank, delay = lowpass_bank(up, down)
+    taps = bank.shape[1]
+
+    n_out = -(-len(samples) * up // down)
+    right = taps + delay // up + down + 1
+    padded = np.concatenate([
+        np.zeros(taps - 1, dtype=np.float32),
+        samples.astype(np.float32, copy=False),
+        np.zeros(right, dtype=np.float32),
+    ])
+    # windows[i] = 输入 x[i - taps + 1 .. i]
+    windows = sliding_window_view(padded, taps)
+
+    out = np.empty(n_out, dtype=np.float32)
+    for first in range(min(up, n_out)):
+        position = first * down + delay
+        phase, base = position % up, position // up
+        outputs = out[first::up]
+        rows = windows[base:base + len(outputs) * down:down]
+        for start in range(0, len(outputs), block):
+            outputs[start:start + block] = rows[start:start + block] @ bank[phase]
+    return out
+
+class PostProcess:
+    """
+    后处理链配置
+
+    Args:
+        trim_db: 去首尾静音的阈值（dBFS）；None 表示不裁剪
+        normalize_db: 归一化目标 RMS（dBFS）；None 表示不调整增益
+        sample_rate: 输出采样率；None 表示保持输入采样率
+        peak_db: 归一化时允许的最大峰值（dBFS）
+    """
+
+    def __init__(self, trim_db=None, normalize_db=None, sample_rate=None, peak_db=-1.0):
+        self.trim_db = trim_db
+        self.normalize_db = normalize_db
+        self.sample_rate = sample_rate
+        self.peak_db = peak_db
+
+    def __bool__(self):
+        return any(value is not None for value in (self.trim_db, self.normalize_db, self.sample_rate))
+
+    def output_rate(self, sample_rate):
+        return self.sample_rate or sample_rate
+
+    def apply(self, pcm, sample_rate):
+        """对 s16le 单声道 PCM 依次执行启用的步骤，返回同格式的字节（采样率为 output_rate）"""
+        return self.apply_marked(pcm, sample_rate, [])[0]
+
+    def apply_marked(self, pcm, sample_rate, marks):
+        """
+        同 apply，并把 marks（输入中的采样位置，升序）换算为输出中的位置
+
+        用于先拼接再整段处理的音频（如对话）按处理后的位置切回各段。返回 (pcm, marks)。
+        """
+        samples = np.frombuffer(pcm, dtype='<i2').astype(np.float32)
+        marks = list(marks)
+        if self.trim_db is not None:
+            start, end = trim_bounds(samples, sample_rate, self.trim_db)
+            samples = samples[start:end]
+            marks = [min(max(mark - start, 0), end - start) for mark in marks]
+        if self.normalize_db is not None:
+            samples = normalize(samples, sample_rate, self.normalize_db, self.peak_db)
+        if self.sample_rate and self.sample_rate != sample_rate:
+            g = gcd(sample_rate, self.sample_rate)
+            up, down = self.sample_rate // g, sample_rate // g
+            samples = resample(samples, sample_rate, self.sample_rate)
+            # 与 resample 的输出长度（向上取整）一致，末尾位置正好对应输出结尾
+            marks = [-(-mark * up // down) for mark in marks]
+        pcm = np.clip(np.rint(samples), -32768, 32767).astype('<i2').tobytes()
+        return pcm, [int(mark) for mark in marks]
+
+    def describe(self):
+        steps = []
+        if self.trim_db is not None:
+            steps.append(f"去静音 {self.trim_db:g}dBFS")
+        if self.normalize_db is not None:
+            steps.append(f"归一化 {self.normalize_db:g}dBFS")
+        if self.sample_rate:
+            steps.append(f"重采样 {self.sample_rate}Hz")
+        return '，'.join(steps)
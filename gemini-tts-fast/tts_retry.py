@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Gemini TTS 请求的重试与对冲
+
+- 重试: 只对可恢复的错误（429、408、5xx、网络错误/超时）按指数退避 + 随机抖动重试，
+  参数错误、鉴权失败等 4xx 立即失败。
+- 对冲: 请求耗时超过阈值（固定值，或最近请求延迟的 p95）仍未返回时，再发一个
+  相同的请求，谁先成功用谁；每次运行最多对冲 hedge_budget 次。
+
+所有计数（请求数、重试、对冲、被丢弃的请求）汇总在 CallStats 中，供输出报告使用。
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+RETRYABLE_STATUS = {408, 429}
+
+def is_retryable(exc):
+    """判断异常是否值得重试"""
+    code = getattr(exc, 'code', None)  # google.genai.errors.APIError
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS or code >= 500
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    try:
+        import httpx
+    except ImportError:
+        return False
+    return isinstance(exc, httpx.TransportError)
+
+class RetryPolicy:
+    """指数退避: 第 n 次重试前等待 uniform(0, min(max_delay, base_delay * 2^n)) 秒（full jitter）"""
+
+    def __init__(self, retries=2, base_delay=1.0, max_delay=20.0):
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, retry_index):
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry_index)))
+
+class CallStats:
+    """线程安全的请求计数和最近延迟窗口"""
+
+    def __init__(self, window=200):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.counts = {'calls': 0, 'requests': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0, 'wasted': 0, 'failed': 0}
+
+    def add(self, name, amount=1):
+        with self._lock:
+            self.counts[name] += amount
+
+    def observe(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def percentile(self, p, min_samples=5):
+        """最近延迟的 p 分位数（秒）；样本不足时返回 None"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+    def summary(self):
+        with self._lock:
+            summary = dict(self.counts)
+        p95 = self.percentile(95, min_samples=1)
+        summary['p95_ms'] = round(p95 * 1000, 1) if p95 is not None else None
+        return summary
+
+class ResilientCaller:
+    """
+    带重试和对冲的调用器，可在多个线程间共享
+
+    Args:
+        policy: RetryPolicy
+        hedge: 是否启用对冲
+        hedge_after: 固定对冲阈值（秒）；为 None 时使用最近延迟的 p95（样本不足时不对冲）
+        hedge_budget: 每次运行最多发起的对冲请求数
+    """
+
+    def __init__(self, policy=None, hedge=False, hedge_after=None, hedge_budget=5, stats=None):
+        self.policy = policy or RetryPolicy()
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.hedge_budget = hedge_budget
+        self.stats = stats or CallStats()
+        self._budget_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix='tts-hedge') if hedge else None
+
+    def call(self, fn, *args, **kwargs):
+        """调用 fn(*args, **kwargs)，可恢复的错误按策略重试"""
+        self.stats.add('calls')
+        for retry_index in range(self.policy.retries + 1):
+            try:
+                return self._attempt(fn, args, kwargs)
+            except Exception as e:
+                if retry_index >= self.policy.retries or not is_retryable(e):
+                    self.stats.add('failed')
+                    raise
+                self.stats.add('retries')
+                time.sleep(self.policy.delay(retry_index))
+
+    def _timed(self, fn, args, kwargs):
+        self.stats.add('requests')
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.stats.observe(time.perf_counter() - started)
+        return result
+
+    def _take_hedge(self):
+        with self._budget_lock:
+            if self.hedge_budget <= 0:
+                return False
+            self.hedge_budget -= 1
+            return True
+
+    def _attempt(self, fn, args, kwargs):
+        threshold = self.hedge_after if self.hedge_after is not None else self.stats.percentile(95)
+        if not self.hedge or threshold is None:
+            return self._timed(fn, args, kwargs)
+
+        primary = self._pool.submit(self._timed, fn, args, kwargs)
+        done, _ = wait([primary], timeout=threshold)
+        if done or not self._take_hedge():
+            return primary.result()
+
+        self.stats.add('hedges')
+        backup = self._pool.submit(self._timed, fn, args, kwargs)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self.stats.add('hedge_wins')
+                    if pending or len(done) > 1:
+                        self.stats.add('wasted')  # 另一个请求的结果被丢弃
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def summary(self):
+        summary = self.stats.summary()
+        summary['hedge_budget_left'] = self.hedge_budget if self.hedge else None
+        return summary
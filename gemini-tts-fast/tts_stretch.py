@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+进程内变速（保持音高）
+
+WSOLA（波形相似叠加）时间伸缩，直接在 PCM 缓冲区上用 NumPy 运算，
+替代 ffmpeg atempo 的一次进程启动和完整解码/编码。
+
+算法: 输出以固定步长 Hs 叠加 Hann 窗帧；第 k 帧的理想输入位置是 k * Hs * speed，
+在其 ±tolerance 范围内搜索与上一帧“自然延续”波形最相似的位置（互相关最大），
+再对齐叠加，避免相位不连续带来的颤音。搜索逐帧进行（每帧内部是向量化的相关
+运算），叠加一次性向量化完成。
+
+StreamStretcher 以同样的逐帧搜索增量处理流式分块：输入足够确定下一帧位置时
+立即输出该帧，结果与对整段 PCM 调用 time_stretch 逐字节一致。
+
+依赖 numpy（可选）；未安装时 tts_cli 会回退到 ffmpeg。
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+MIN_SPEED = 0.5
+MAX_SPEED = 2.0
+
+def stretch_samples(samples, speed, sample_rate=24000, frame_ms=20, tolerance_ms=5):
+    """
+    对 float32 单声道采样做时间伸缩
+
+    Args:
+        samples: 一维 float32 数组
+        speed: 速度倍数（>1 变快，<1 变慢），范围 0.5-2.0
+        sample_rate: 采样率
+        frame_ms: 分析帧长度
+        tolerance_ms: 相似度搜索范围
+    Returns:
+        伸缩后的 float32 数组，长度约为 len(samples) / speed
+    """
+    if not MIN_SPEED <= speed <= MAX_SPEED:
+        raise ValueError(f"速度必须在 {MIN_SPEED} 到 {MAX_SPEED} 之间")
+    if speed == 1.0 or len(samples) == 0:
+        return samples.astype(np.float32, copy=True)
+
+    frame = int(sample_rate * frame_ms / 1000) // 2 * 2
+    hop = frame // 2
+    tolerance = int(sample_rate * tolerance_ms / 1000)
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame) / frame)).astype(np.float32)  # periodic Hann, 50% 重叠时和为 1
+
+    # 两端补零，保证搜索和取帧不越界
+    pad = frame + tolerance
+    padded = np.concatenate([
+        np.zeros(pad, dtype=np.float32),
+        samples.astype(np.float32, copy=False),
+        np.zeros(pad + frame + int(hop * speed) + tolerance, dtype=np.float32),
+    ])
+
+    out_len = int(np.ceil(len(samples) / speed))
+    n_frames = out_len // hop + 2
+    positions = np.empty(n_frames, dtype=np.int64)
+
+    analysis_hop = hop * speed
+    previous = pad
+    positions[0] = previous
+    candidates = np.arange(-tolerance, tolerance + 1)
+    for k in range(1, n_frames):
+        nominal = pad + int(round(k * analysis_hop))
+        # 上一帧在输入中的自然延续，只比较与新帧重叠的那一半
+        template = padded[previous + hop:previous + hop + hop]
+        region = padded[nominal - tolerance:nominal + tolerance + hop]
+        scores = sliding_window_view(region, hop) @ template
+        previous = nominal + int(candidates[np.argmax(scores)])
+        positions[k] = previous
+
+    frames = padded[positions[:, None] + np.arange(frame)] * window
+    # 50% 重叠: 输出第 j 段 = 第 j 帧前半 + 第 j-1 帧后半
+    out = frames[:, :hop].copy()
+    out[1:] += frames[:-1, hop:]
+    return out.reshape(-1)[:out_len]
+
+def time_stretch(pcm, speed, sample_rate=24000):
+    """对 s16le PCM 字节做时间伸缩，返回同格式的字节"""
+    samples = np.frombuffer(pcm, dtype='<i2').astype(np.float32)
+    stretched = stretch_samples(samples, speed, sample_rate)
+    return np.clip(np.rint(stretched), -32768, 32767).astype('<i2').tobytes()
+
+class StreamStretcher:
+    """
+    增量 WSOLA：feed() 接收 s16le PCM 分块，返回已能确定的变速输出，flush() 输出剩余部分
+
+    第 k 帧需要输入覆盖到 k * Hs * speed + tolerance + frame 才能完成搜索，
+    因此输出只比输入滞后约一帧加搜索范围（默认 20ms + 5ms 对应的输入量）。
+    已用过的输入会被丢弃，内存占用与总时长无关。
+    """
+
+    def __init__(self, speed, sample_rate=24000, frame_ms=20, tolerance_ms=5):
+        if not MIN_SPEED <= speed <= MAX_SPEED:
+            raise ValueError(f"速度必须在 {MIN_SPEED} 到 {MAX_SPEED} 之间")
+        self.speed = speed
+        self.frame = int(sample_rate * frame_ms / 1000) // 2 * 2
+        self.hop = self.frame // 2
+        self.tolerance = int(sample_rate * tolerance_ms / 1000)
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(self.frame) / self.frame)).astype(np.float32)
+        self.candidates = np.arange(-self.tolerance, self.tolerance + 1)
+        self.pad = self.frame + self.tolerance
+        # buffer[0] 对应补零后输入中的 offset 位置（与 stretch_samples 的 padded 坐标一致）
+        self.buffer = np.zeros(self.pad, dtype=np.float32)
+        self.offset = 0
+        self.k = 0
+        self.previous = self.pad
+        self.tail = np.zeros(self.hop, dtype=np.float32)
+        self.samples_in = 0
+        self.samples_out = 0
+        self.remainder = b''
+
+    def _nominal(self, k):
+        return self.pad + int(round(k * self.hop * self.speed))
+
+    def _run(self, max_frames=None):
+        """生成输入已足够确定的所有帧，返回输出的 float32 采样"""
+        end = self.offset + len(self.buffer)
+        segments = []
+        while max_frames is None or self.k < max_frames:
+            nominal = self._nominal(self.k)
+            if self.k and nominal + self.tolerance + self.frame > end:
+                break
+            if self.k:
+                base = self.previous + self.hop - self.offset
+                template = self.buffer[base:base + self.hop]
+                start = nominal - self.tolerance - self.offset
+                region = self.buffer[start:start + 2 * self.tolerance + self.hop]
+                scores = sliding_window_view(region, self.hop) @ template
+                self.previous = nominal + int(self.candidates[np.argmax(scores)])
+            elif self.pad + self.frame > end:
+                break
+            start = self.previous - self.offset
+            frame = self.buffer[start:start + self.frame] * self.window
+            segments.append(frame[:self.hop] + self.tail)
+            self.tail = frame[self.hop:]
+            self.k += 1
+        # 丢弃后续帧不再用到的输入
+        keep = min(self.previous, self._nominal(self.k) - self.tolerance) - self.offset
+        if keep > 0:
+            self.buffer = self.buffer[keep:]
+            self.offset += keep
+        return np.concatenate(segments) if segments else np.zeros(0, dtype=np.float32)
+
+    def _to_pcm(self, stretched):
+        self.samples_out += len(stretched)
+        return np.clip(np.rint(stretched), -32768, 32767).astype('<i2').tobytes()
+
+    def feed(self, pcm):
+        """追加一段 s16le PCM，返回新产生的变速输出（可能为空）"""
+        pcm = self.remainder + pcm
+        usable = len(pcm) // 2 * 2
+        self.remainder = pcm[usable:]
+        samples = np.frombuffer(pcm[:usable], dtype='<i2').astype(np.float32)
+        self.samples_in += len(samples)
+        if self.speed == 1.0:
+            return self._to_pcm(samples)
+        self.buffer = np.concatenate([self.buffer, samples])
+        return self._to_pcm(self._run())
+
+    def flush(self):
+        """输入结束：补零完成最后几帧，输出总长约为输入 / speed"""
+        if self.speed == 1.0 or self.samples_in == 0:
+            return b''
+        self.buffer = np.concatenate([
+            self.buffer,
+            np.zeros(self.pad + self.frame + int(self.hop * self.speed) + self.tolerance, dtype=np.float32),
+        ])
+        out_len = int(np.ceil(self.samples_in / self.speed))
+        stretched = self._run(out_len // self.hop + 2)
+        return self._to_pcm(stretched[:max(out_len - self.samples_out, 0)])
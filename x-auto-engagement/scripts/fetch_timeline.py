@@ -2,36 +2,144 @@
 """
 fetch_timeline.py - Fetch home timeline and apply rule-based pre-filters.
 
-Reads OAuth 1.0a credentials from .env. Uses hardcoded filter defaults
-with optional CLI overrides. Outputs filtered tweets as JSON to stdout.
+Reads OAuth 1.0a credentials from .env. Pre-filters are a declarative rule
+list (FILTER_RULES, or --filters <json>) compiled by filter_rules.py, with
+--lang/--min-likes overrides; per-rule hit counts and timing are reported
+in the output. Follows pagination tokens until --count tweets
+or --max-pages pages have been read. Outputs filtered tweets as JSON to
+stdout, or with --ndjson one line per passed tweet as each page arrives,
+followed by a summary line.
+
+The newest tweet id seen for X_USER_ID is saved as a cursor in the state
+directory (default: .x-auto-engagement/ next to the .env file, or
+<--state-dir>/<X_USER_ID>/) and sent as since_id on the next run, so
+scheduled runs only read new tweets. If the page budget runs out before
+since_id is reached, the cursor is not moved;
+the window's newest id and the next pagination token are saved instead,
+and the next run finishes that window before advancing. --full ignores the
+cursor for one run.
+
+Remaining read quota is tracked from the x-rate-limit-* response headers.
+Pagination stops before the quota runs out (or, with --wait-for-reset,
+sleeps until the window resets), and the last snapshot is saved so the
+next run can size its page budget without probing the API.
+
+Fetched tweets are recorded in a local SQLite store (tweet_store.py) in the
+same state directory; tweets already shown to the agent, rejected or
+engaged with in an earlier run are dropped before filtering. --no-store
+disables this.
+
+Passed tweets are then collapsed by near-duplicate text (near_dup.py:
+MinHash + LSH over normalized text), keeping the most-engaged tweet of each
+cluster; --no-dedup disables this.
+
+--fields limits both the API request (tweet.fields/user.fields/expansions
+are derived from the output fields plus what the enabled filters need) and
+each output tweet. --format compact drops indentation and collapses
+skipped reasons to counts; --format columnar also lists the field names
+once and each tweet as a row. The output size in bytes and estimated tokens
+is reported.
+
+--accounts fetches several accounts (each a .env file or a workspace root
+containing one) concurrently on one asyncio event loop. Every account
+keeps its own OAuth credentials, proxy, cursor, quota and tweet store, and
+writes to its own output file; the sessions share one connection pool. A
+failing account is reported and does not stop the others.
+
+--source adds candidate sources besides the home timeline: list:<list id>
+and search:<query>. Sources are fetched concurrently, merged newest-first
+on created_at (k-way heap merge over the page streams), deduplicated by
+tweet id with each tweet recording every source that surfaced it, and then
+filtered and formatted once. The since_id cursor applies to the home
+timeline; each source has its own quota snapshot.
+
+--hydrate attaches the text and author of each passed tweet's quoted or
+replied-to tweet. Referenced ids are collected from the passed set, looked
+up in the tweet store first, and the rest resolved with GET /2/tweets in
+batches of up to 100 ids, so context costs one or two requests per run.
 
 Usage:
-    python3 fetch_timeline.py --env <path> [--count <n>] [--lang <code>] [--min-likes <n>]
+    python3 fetch_timeline.py --env <path> | --accounts <env-or-dir> [...] [--out-dir <path>] [--concurrency <n>]
+                              [--source home|list:<id>|search:<query> ...] [--count <n>] [--max-pages <n>] [--ndjson] [--full] [--state-dir <path>]
+                              [--wait-for-reset] [--max-wait <s>] [--no-store] [--no-dedup] [--dedup-threshold <j>]
+                              [--fields <a,b,...>] [--format json|compact|columnar]
+                              [--filters <json>] [--lang <code>] [--min-likes <n>] [--hydrate]
 """
 from __future__ import annotations
 
 import argparse
+import asyncio
+import hashlib
+import heapq
 import json
+import math
 import os
+import queue
+import re
 import sys
+import tempfile
+import threading
+import time
+from collections import Counter
 from pathlib import Path
+from typing import Callable, Iterator
 
 import requests
-from dotenv import load_dotenv
+from dotenv import dotenv_values, load_dotenv
+from requests.adapters import HTTPAdapter
 from requests_oauthlib import OAuth1
 
+from filter_rules import FilterChain
+from near_dup import DEFAULT_THRESHOLD, NearDuplicateIndex, collapse
+from tweet_store import DB_NAME, STATE_DIR_NAME, STORE_FIELDS, TweetStore, state_dir
+
 
 API_BASE = "https://api.x.com/2"
+PAGE_SIZE = 100  # max_results upper bound for the timeline endpoint
+LOOKUP_BATCH = 100  # ids per GET /2/tweets lookup
 
-# Hardcoded filter defaults
+# Hardcoded defaults
 DEFAULTS = {
     "language": "en",
     "min_likes": 5,
-    "skip_retweets": True,
-    "skip_replies": True,
-    "skip_media_only": True,
+    "max_pages": 10,
+    "quota_reserve": 1,  # timeline requests left unused in each rate-limit window
+    "max_wait_seconds": 900,
+    "concurrency": 8,  # accounts fetched at once with --accounts
 }
 
+# Output fields: name -> (getter, tweet.fields needed, user.fields needed)
+OUTPUT_FIELDS = {
+    "tweet_id": (lambda t: t["id"], (), ()),
+    "text": (lambda t: t.get("text", ""), ("text",), ()),
+    "author_id": (lambda t: t.get("author_id", ""), ("author_id",), ()),
+    "author_username": (lambda t: t.get("_author", {}).get("username", ""), ("author_id",), ("username",)),
+    "author_name": (lambda t: t.get("_author", {}).get("name", ""), ("author_id",), ("name",)),
+    "author_followers": (lambda t: t.get("_author", {}).get("followers_count", 0), ("author_id",), ("public_metrics",)),
+    "lang": (lambda t: t.get("lang", ""), ("lang",), ()),
+    "likes": (lambda t: t.get("public_metrics", {}).get("like_count", 0), ("public_metrics",), ()),
+    "retweets": (lambda t: t.get("public_metrics", {}).get("retweet_count", 0), ("public_metrics",), ()),
+    "replies": (lambda t: t.get("public_metrics", {}).get("reply_count", 0), ("public_metrics",), ()),
+    "created_at": (lambda t: t.get("created_at", ""), ("created_at",), ()),
+    "is_quote": (lambda t: is_quote(t), ("referenced_tweets",), ()),
+}
+DEFAULT_FIELDS = list(OUTPUT_FIELDS)
+OUTPUT_FORMATS = ("json", "compact", "columnar")
+BYTES_PER_TOKEN = 4  # rough estimate for mostly-English JSON
+
+# Default pre-filter rules (see filter_rules.py); replaced by --filters <json>
+FILTER_RULES = [
+    {"rule": "retweet"},
+    {"rule": "reply"},
+    {"rule": "lang", "value": DEFAULTS["language"]},
+    {"rule": "min_likes", "value": DEFAULTS["min_likes"]},
+    {"rule": "media_only"},
+    {"rule": "min_followers", "value": 0},
+    {"rule": "max_followers", "value": None},
+    {"rule": "deny_keywords", "value": []},
+    {"rule": "deny_regex", "value": []},
+]
+
 
 def load_env(env_path: str | None) -> None:
     if env_path:
@@ -44,14 +152,15 @@ def load_env(env_path: str | None) -> None:
         load_dotenv()
 
 
-def get_oauth() -> OAuth1:
+def get_oauth(env=None) -> OAuth1:
+    env = os.environ if env is None else env
     required = [
         "X_CONSUMER_KEY",
         "X_CONSUMER_SECRET",
         "X_ACCESS_TOKEN",
         "X_ACCESS_TOKEN_SECRET",
     ]
-    missing = [k for k in required if not os.getenv(k)]
+    missing = [k for k in required if not env.get(k)]
     if missing:
         print(
             f"ERROR: Missing environment variables: {', '.join(missing)}",
@@ -60,64 +169,525 @@ def get_oauth() -> OAuth1:
         sys.exit(2)
 
     return OAuth1(
-        os.environ["X_CONSUMER_KEY"],
-        os.environ["X_CONSUMER_SECRET"],
-        os.environ["X_ACCESS_TOKEN"],
-        os.environ["X_ACCESS_TOKEN_SECRET"],
+        env["X_CONSUMER_KEY"],
+        env["X_CONSUMER_SECRET"],
+        env["X_ACCESS_TOKEN"],
+        env["X_ACCESS_TOKEN_SECRET"],
     )
 
 
-def get_session() -> requests.Session:
+def get_session(env=None, adapter: HTTPAdapter | None = None) -> requests.Session:
+    """Session for one account; pass a shared `adapter` to share its connection pool."""
+    env = os.environ if env is None else env
     session = requests.Session()
-    proxy = os.getenv("X_PROXY_URL")
+    if adapter:
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+    proxy = env.get("X_PROXY_URL")
     if proxy:
         session.proxies = {"http": proxy, "https": proxy}
     return session
 
 
-def fetch_home_timeline(auth: OAuth1, user_id: str, count: int) -> list[dict]:
-    """Fetch reverse-chronological home timeline."""
-    session = get_session()
-    url = f"{API_BASE}/users/{user_id}/timelines/reverse_chronological"
-    params = {
-        "max_results": min(count, 100),
-        "tweet.fields": "id,text,author_id,lang,public_metrics,created_at,referenced_tweets",
-        "user.fields": "id,username,name,public_metrics",
-        "expansions": "author_id",
+def write_json_atomic(path: Path, data: dict) -> None:
+    """Write JSON via a temp file in the same directory and rename it into place."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def cursor_path(directory: Path, user_id: str) -> Path:
+    return directory / f"cursor-{user_id}.json"
+
+
+def load_cursor(directory: Path, user_id: str) -> dict:
+    """Return the saved cursor ({"since_id", "fetched_at"[, "pending"]}) or {} if none.
+
+    `pending` ({"newest_id", "pagination_token"}) marks a window that an
+    earlier run did not finish.
+    """
+    path = cursor_path(directory, user_id)
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            cursor = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"WARNING: Ignoring unreadable cursor {path}: {e}", file=sys.stderr)
+        return {}
+    return cursor if cursor.get("user_id") == user_id and cursor.get("since_id") else {}
+
+
+def save_cursor(directory: Path, user_id: str, newest_id: str, pending: dict | None = None) -> dict:
+    cursor = {
+        "user_id": user_id,
+        "since_id": newest_id,
+        "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
     }
+    if pending:
+        cursor["pending"] = pending
+    write_json_atomic(cursor_path(directory, user_id), cursor)
+    return cursor
 
-    resp = session.get(url, auth=auth, params=params)
 
-    if resp.status_code == 401:
-        print("ERROR: X API 401 Unauthorized. Check OAuth credentials.", file=sys.stderr)
-        sys.exit(3)
-    if resp.status_code == 429:
-        print("ERROR: X API 429 Rate Limited. Try again later.", file=sys.stderr)
-        sys.exit(4)
-    if resp.status_code != 200:
-        print(
-            f"ERROR: X API returned {resp.status_code}: {resp.text}",
-            file=sys.stderr,
-        )
-        sys.exit(5)
-
-    data = resp.json()
-    tweets = data.get("data", [])
-
-    # Build author lookup from includes
-    authors = {}
-    for user in data.get("includes", {}).get("users", []):
-        authors[user["id"]] = user
-
-    # Attach author info to each tweet
-    for tweet in tweets:
-        author = authors.get(tweet.get("author_id"), {})
-        tweet["_author"] = {
-            "username": author.get("username", ""),
-            "name": author.get("name", ""),
-            "followers_count": author.get("public_metrics", {}).get("followers_count", 0),
+class Quota:
+    """Read quota for one endpoint, tracked from x-rate-limit-* headers.
+
+    `remaining` is None until a response (or a still-valid saved snapshot)
+    says otherwise; an unknown quota never blocks a request.
+    """
+
+    def __init__(self, path: Path | None = None, reserve: int = DEFAULTS["quota_reserve"]):
+        self.path = path
+        self.reserve = reserve
+        self.limit: int | None = None
+        self.remaining: int | None = None
+        self.reset: int | None = None
+        self.used = 0
+
+    @classmethod
+    def load(cls, path: Path, reserve: int = DEFAULTS["quota_reserve"]) -> "Quota":
+        """Restore the saved snapshot if its window has not reset yet."""
+        quota = cls(path, reserve)
+        try:
+            with path.open("r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return quota
+        if snapshot.get("reset", 0) > time.time():
+            quota.limit = snapshot.get("limit")
+            quota.remaining = snapshot.get("remaining")
+            quota.reset = snapshot.get("reset")
+        return quota
+
+    def update(self, headers) -> None:
+        self.used += 1
+        try:
+            self.limit = int(headers["x-rate-limit-limit"])
+            self.remaining = int(headers["x-rate-limit-remaining"])
+            self.reset = int(headers["x-rate-limit-reset"])
+        except (KeyError, ValueError):
+            pass
+
+    def seconds_until_reset(self) -> float:
+        return max(0.0, (self.reset or 0) - time.time())
+
+    def allows(self) -> bool:
+        """True if another request fits in the current window (keeping the reserve)."""
+        if self.remaining is None or self.seconds_until_reset() == 0:
+            return True
+        return self.remaining > self.reserve
+
+    def page_budget(self, max_pages: int) -> int:
+        if self.remaining is None or self.seconds_until_reset() == 0:
+            return max_pages
+        return max(0, min(max_pages, self.remaining - self.reserve))
+
+    def wait(self, max_wait: float) -> bool:
+        """Sleep until the window resets if that is within max_wait seconds."""
+        delay = self.seconds_until_reset()
+        if delay > max_wait:
+            return False
+        print(f"Rate limit reached, waiting {delay:.0f}s for reset...", file=sys.stderr)
+        time.sleep(delay + 1)
+        self.remaining = None
+        return True
+
+    def summary(self) -> dict:
+        return {
+            "used": self.used,
+            "remaining": self.remaining,
+            "limit": self.limit,
+            "reset_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.reset)) if self.reset else None,
+        }
+
+    def save(self) -> None:
+        if self.path and self.reset:
+            write_json_atomic(self.path, {"limit": self.limit, "remaining": self.remaining, "reset": self.reset})
+
+
+def quota_path(directory: Path, user_id: str, source: dict | None = None) -> Path:
+    slug = f"-{source['slug']}" if source and source["kind"] != "home" else ""
+    return directory / f"quota-{user_id}{slug}.json"
+
+
+def parse_source(spec: str) -> dict:
+    """Parse a --source spec: home, list:<list id> or search:<query>."""
+    kind, _, value = spec.partition(":")
+    kind = kind.strip().lower()
+    value = value.strip()
+    if kind == "home" and not value:
+        return {"name": "home", "kind": "home", "value": None, "slug": "home"}
+    if kind == "list" and value.isdigit():
+        return {"name": f"list:{value}", "kind": "list", "value": value, "slug": f"list-{value}"}
+    if kind == "search" and value:
+        digest = hashlib.sha1(value.encode("utf-8")).hexdigest()[:10]
+        return {"name": f"search:{value}", "kind": "search", "value": value, "slug": f"search-{digest}"}
+    print(f"ERROR: Invalid --source {spec!r} (use home, list:<id> or search:<query>)", file=sys.stderr)
+    sys.exit(1)
+
+
+def source_endpoint(source: dict, user_id: str) -> tuple[str, dict, str, int]:
+    """(url, fixed params, pagination parameter, minimum max_results) for a source."""
+    if source["kind"] == "list":
+        return f"{API_BASE}/lists/{source['value']}/tweets", {}, "pagination_token", 1
+    if source["kind"] == "search":
+        return f"{API_BASE}/tweets/search/recent", {"query": source["value"]}, "next_token", 10
+    return f"{API_BASE}/users/{user_id}/timelines/reverse_chronological", {}, "pagination_token", 1
+
+
+def fetch_timeline_pages(
+    auth: OAuth1,
+    user_id: str,
+    count: int,
+    max_pages: int = DEFAULTS["max_pages"],
+    session: requests.Session | None = None,
+    since_id: str | None = None,
+    meta: dict | None = None,
+    quota: Quota | None = None,
+    wait_for_reset: bool = False,
+    max_wait: float = DEFAULTS["max_wait_seconds"],
+    fields: tuple[set[str], set[str]] | None = None,
+    source: dict | None = None,
+    resume: dict | None = None,
+) -> Iterator[list[dict]]:
+    """Yield pages of the reverse-chronological home timeline (or another `source`).
+
+    Follows meta.next_token until `count` tweets or `max_pages` pages have
+    been read, or the timeline is exhausted. Each tweet carries `_author`.
+    With `since_id`, only tweets newer than it are returned. If `meta` is
+    given it is filled with the newest tweet id seen and whether the budget
+    ran out before the timeline (or since_id) was reached, with the token
+    of the first unread page in `next_token`.
+
+    `resume` is a cursor's `pending` window: paging starts from its
+    pagination token instead of the newest tweet. If the API rejects the
+    token (400), paging restarts from the newest tweet.
+
+    `fields` is (tweet.fields, user.fields) to request; by default every
+    field any output or filter can use. Authors are only expanded when
+    user fields are requested.
+
+    With `quota`, pagination stops (or waits, with `wait_for_reset`) before
+    the rate-limit window is exhausted, and a 429 after the first page ends
+    the run with what has been read so far. A 429 before any page exits 4.
+    """
+    session = session or get_session()
+    url, source_params, token_param, min_results = source_endpoint(source or parse_source("home"), user_id)
+    tweet_fields, user_fields = fields or (
+        {"id", "text", "author_id", "lang", "public_metrics", "created_at", "referenced_tweets"},
+        {"id", "username", "name", "public_metrics"},
+    )
+    params = {**source_params, "tweet.fields": ",".join(sorted(tweet_fields | {"id"}))}
+    if user_fields:
+        params["user.fields"] = ",".join(sorted(user_fields | {"id"}))
+        params["expansions"] = "author_id"
+    if since_id and (source or {}).get("kind", "home") != "list":
+        params["since_id"] = since_id
+    if meta is None:
+        meta = {}
+    meta.update({"pages": 0, "newest_id": None, "truncated": False, "stopped": None, "next_token": None})
+    if resume:
+        params[token_param] = resume["pagination_token"]
+        meta.update({"next_token": resume["pagination_token"], "window_newest_id": resume["newest_id"]})
+    quota = quota or Quota()
+
+    fetched = 0
+    pages = 0
+    while fetched < count and pages < max_pages:
+        if not quota.allows() and not (wait_for_reset and quota.wait(max_wait)):
+            meta["stopped"] = "quota"
+            meta["truncated"] = True
+            meta["next_token"] = params.get(token_param)
+            if pages == 0:
+                quota.save()
+                print(
+                    f"ERROR: X API read quota exhausted until {quota.summary()['reset_at']}. "
+                    "Try again later or use --wait-for-reset.",
+                    file=sys.stderr,
+                )
+                sys.exit(4)
+            break
+
+        params["max_results"] = max(min_results, min(count - fetched, PAGE_SIZE))
+        resp = session.get(url, auth=auth, params=params)
+        quota.update(resp.headers)
+
+        if resp.status_code == 401:
+            meta["stopped"] = "unauthorized"
+            print("ERROR: X API 401 Unauthorized. Check OAuth credentials.", file=sys.stderr)
+            sys.exit(3)
+        if resp.status_code == 429:
+            quota.remaining = 0
+            if wait_for_reset and quota.wait(max_wait):
+                continue
+            meta["stopped"] = "rate_limited"
+            meta["truncated"] = True
+            meta["next_token"] = params.get(token_param)
+            if pages == 0:
+                quota.save()
+                print("ERROR: X API 429 Rate Limited. Try again later.", file=sys.stderr)
+                sys.exit(4)
+            break
+        if resp.status_code == 400 and pages == 0 and meta.get("window_newest_id"):
+            print("WARNING: Saved pagination token rejected; reading from the newest tweet.", file=sys.stderr)
+            del params[token_param], meta["window_newest_id"]
+            meta["next_token"] = None
+            continue
+        if resp.status_code != 200:
+            meta["stopped"] = f"http_{resp.status_code}"
+            print(
+                f"ERROR: X API returned {resp.status_code}: {resp.text}",
+                file=sys.stderr,
+            )
+            sys.exit(5)
+
+        data = resp.json()
+        tweets = data.get("data", [])[: count - fetched]
+        pages += 1
+        fetched += len(tweets)
+        meta["pages"] = pages
+        if tweets and meta["newest_id"] is None:
+            meta["newest_id"] = max((t["id"] for t in tweets), key=int)
+
+        # Build author lookup from includes
+        authors = {}
+        for user in data.get("includes", {}).get("users", []):
+            authors[user["id"]] = user
+
+        # Attach author info to each tweet
+        for tweet in tweets:
+            author = authors.get(tweet.get("author_id"), {})
+            tweet["_author"] = {
+                "username": author.get("username", ""),
+                "name": author.get("name", ""),
+                "followers_count": author.get("public_metrics", {}).get("followers_count", 0),
+            }
+
+        if tweets:
+            yield tweets
+
+        next_token = data.get("meta", {}).get("next_token")
+        meta["truncated"] = bool(next_token and tweets)
+        if not meta["truncated"]:
+            meta["next_token"] = None
+            break
+        params[token_param] = meta["next_token"] = next_token
+
+
+def _created_key(tweet: dict) -> str:
+    return tweet.get("created_at", "")
+
+
+def _prefetch(name: str, pages: Iterator[list[dict]], meta: dict, depth: int = 2) -> Iterator[dict]:
+    """Read `pages` on a background thread; yield its tweets tagged with the source name.
+
+    A failure (including the fetcher's sys.exit) ends only this source: it is
+    recorded in `meta` as `error` (and `truncated`) and the stream stops. The
+    exception is kept under `meta["_exception"]` for merge_sources.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=depth)
+    done = object()
+
+    def produce():
+        try:
+            for page in pages:
+                buffer.put(page)
+        except BaseException as e:  # noqa: BLE001 - recorded for this source only
+            meta["error"] = meta.get("stopped") or (
+                f"exit_{e.code}" if isinstance(e, SystemExit) else f"{type(e).__name__}: {e}"
+            )
+            meta["truncated"] = True
+            meta["_exception"] = e
+        buffer.put(done)
+
+    threading.Thread(target=produce, name=f"fetch-{name}", daemon=True).start()
+    while True:
+        item = buffer.get()
+        if item is done:
+            if "error" in meta:
+                print(f"WARNING: Source {name} failed ({meta['error']}); continuing with the other sources.", file=sys.stderr)
+            return
+        for tweet in item:
+            tweet["_sources"] = [name]
+            yield tweet
+
+
+def merge_sources(
+    named_pages: list[tuple[str, Iterator[list[dict]]]], metas: dict[str, dict] | None = None
+) -> Iterator[list[dict]]:
+    """K-way merge of per-source page streams into newest-first pages without duplicates.
+
+    Each source is reverse-chronological, so heapq.merge on created_at only
+    holds one pending tweet per source. A tweet seen from several sources is
+    emitted once with all of their names in `_sources`. Copies of a tweet
+    share its created_at, so only the current created_at group is kept to
+    merge them; earlier tweets are remembered by id. Pages are cut only
+    between different created_at values, so every copy of a tweet is merged
+    before its page is yielded.
+
+    A source that fails stops on its own (see _prefetch; `metas` receives its
+    error); the run fails only if every source does.
+    """
+    metas = metas if metas is not None else {}
+    streams = [_prefetch(name, pages, metas.setdefault(name, {})) for name, pages in named_pages]
+    emitted: set[str] = set()
+    group: dict[str, dict] = {}
+    page: list[dict] = []
+    for tweet in heapq.merge(*streams, key=_created_key, reverse=True):
+        first = group.get(tweet["id"])
+        if first is not None:
+            first["_sources"].extend(s for s in tweet["_sources"] if s not in first["_sources"])
+            continue
+        if tweet["id"] in emitted:
+            continue
+        if page and _created_key(tweet) != _created_key(page[-1]):
+            group = {}
+            if len(page) >= PAGE_SIZE:
+                yield page
+                page = []
+        emitted.add(tweet["id"])
+        group[tweet["id"]] = tweet
+        page.append(tweet)
+    failures = [metas[name].pop("_exception") for name, _ in named_pages if "_exception" in metas[name]]
+    if failures and len(failures) == len(named_pages):
+        raise failures[0]
+    if page:
+        yield page
+
+
+class Hydrator:
+    """Attach quoted / replied-to tweets to passed tweets as `_referenced`.
+
+    Ids are resolved from this run's cache, then the tweet store, then GET
+    /2/tweets in batches of LOOKUP_BATCH. Ids the API reports in `errors`
+    (deleted, protected) are marked unavailable and cached in the store as
+    such. An API error stops further lookups for the run; the fetch output
+    is still written.
+
+    Calling the hydrator resolves and attaches in one step. For streamed
+    output, add() queues ids across pages, lookup_queued(full_only=True)
+    only sends full batches, and ready() tells which tweets can be attached.
+    """
+
+    def __init__(self, auth: OAuth1, session: requests.Session, store: TweetStore | None = None):
+        self.auth = auth
+        self.session = session
+        self.store = store
+        self.cache: dict[str, dict | None] = {}
+        self.queued: dict[str, None] = {}
+        self.counts = Counter()
+        self.error = None
+
+    def __call__(self, tweets: list[dict]) -> None:
+        self.add(tweets)
+        self.lookup_queued()
+        self.attach(tweets)
+
+    def add(self, tweets: list[dict]) -> None:
+        """Queue the referenced ids of `tweets` that neither cache knows."""
+        wanted = [
+            tweet_id
+            for tweet_id in dict.fromkeys(ref.get("id") for t in tweets for ref in t.get("referenced_tweets", ()))
+            if tweet_id and tweet_id not in self.cache and tweet_id not in self.queued
+        ]
+        if wanted and self.store:
+            cached = self.store.referenced(wanted)
+            self.cache.update(cached)
+            self.counts["cached"] += len(cached)
+            wanted = [tweet_id for tweet_id in wanted if tweet_id not in cached]
+        if not self.error:
+            self.queued.update(dict.fromkeys(wanted))
+
+    def lookup_queued(self, full_only: bool = False) -> None:
+        """Look up the queued ids, LOOKUP_BATCH per request; with `full_only`, leave a partial batch queued."""
+        while self.queued and not self.error and (not full_only or len(self.queued) >= LOOKUP_BATCH):
+            batch = list(self.queued)[:LOOKUP_BATCH]
+            for tweet_id in batch:
+                del self.queued[tweet_id]
+            self.lookup(batch)
+        if self.error:
+            self.queued.clear()
+
+    def ready(self, tweet: dict) -> bool:
+        """True once none of the tweet's referenced ids is waiting for a lookup."""
+        return not any(ref.get("id") in self.queued for ref in tweet.get("referenced_tweets", ()))
+
+    def attach(self, tweets: list[dict]) -> None:
+        for tweet in tweets:
+            refs = []
+            for ref in tweet.get("referenced_tweets", ()):
+                if ref.get("id") not in self.cache:
+                    continue
+                found = self.cache[ref["id"]]
+                entry = {"type": ref.get("type"), "tweet_id": ref["id"]}
+                if found is None:
+                    entry["unavailable"] = True
+                else:
+                    entry.update((key, value) for key, value in found.items() if value is not None)
+                refs.append(entry)
+            if refs:
+                tweet["_referenced"] = refs
+
+    def lookup(self, ids: list[str]) -> None:
+        """Resolve up to LOOKUP_BATCH ids with one request and cache the results."""
+        params = {
+            "ids": ",".join(ids),
+            "tweet.fields": "author_id,created_at,text",
+            "expansions": "author_id",
+            "user.fields": "name,username",
         }
+        resp = self.session.get(f"{API_BASE}/tweets", auth=self.auth, params=params)
+        self.counts["requests"] += 1
+        if resp.status_code != 200:
+            self.error = "rate_limited" if resp.status_code == 429 else f"http_{resp.status_code}"
+            print(f"WARNING: Referenced tweet lookup failed ({resp.status_code}); skipping hydration.", file=sys.stderr)
+            return
+
+        data = resp.json()
+        users = {u["id"]: u for u in data.get("includes", {}).get("users", [])}
+        resolved = {}
+        for item in data.get("data", []):
+            author = users.get(item.get("author_id"), {})
+            resolved[item["id"]] = {
+                "text": item.get("text", ""),
+                "author_id": item.get("author_id"),
+                "author_username": author.get("username"),
+                "author_name": author.get("name"),
+                "created_at": item.get("created_at"),
+            }
+        self.cache.update(resolved)
+        self.counts["fetched"] += len(resolved)
+        # Ids missing from `data` come back in `errors` (deleted, suspended, protected)
+        unavailable = {tweet_id: None for tweet_id in ids if tweet_id not in resolved}
+        self.cache.update(unavailable)
+        self.counts["unavailable"] += len(unavailable)
+        if self.store and (resolved or unavailable):
+            self.store.record_referenced({**resolved, **unavailable})
+
+    def summary(self) -> dict:
+        return {
+            "requests": self.counts["requests"],
+            "cached": self.counts["cached"],
+            "fetched": self.counts["fetched"],
+            "unavailable": self.counts["unavailable"],
+            "error": self.error,
+        }
+
 
+def fetch_home_timeline(auth: OAuth1, user_id: str, count: int, max_pages: int = DEFAULTS["max_pages"]) -> list[dict]:
+    """Fetch reverse-chronological home timeline."""
+    tweets = []
+    for page in fetch_timeline_pages(auth, user_id, count, max_pages):
+        tweets.extend(page)
     return tweets
 
 
@@ -136,91 +706,504 @@ def is_quote(tweet: dict) -> bool:
     return any(r.get("type") == "quoted" for r in refs)
 
 
-def apply_filters(tweets: list[dict], lang: str, min_likes: int) -> tuple[list[dict], list[dict]]:
-    """Apply rule-based filters. Returns (passed, skipped) lists."""
-    passed = []
-    skipped = []
-
-    for tweet in tweets:
-        reason = None
-
-        if DEFAULTS["skip_retweets"] and is_retweet(tweet):
-            reason = "retweet"
-        elif DEFAULTS["skip_replies"] and is_reply(tweet):
-            reason = "reply"
-        elif lang and tweet.get("lang", "") != lang:
-            reason = f"language:{tweet.get('lang', 'unknown')}"
-        elif min_likes > 0:
-            likes = tweet.get("public_metrics", {}).get("like_count", 0)
-            if likes < min_likes:
-                reason = f"min_likes:{likes}<{min_likes}"
-        elif DEFAULTS["skip_media_only"]:
-            text = tweet.get("text", "").strip()
-            if len(text) < 20 and ("https://t.co/" in text or text == ""):
-                reason = "media_only"
-
-        if reason:
-            skipped.append({"tweet_id": tweet["id"], "reason": reason})
+def load_rules(path: str | None, lang: str | None, min_likes: int | None) -> list[dict]:
+    """Rule list from --filters (a JSON list or {"rules": [...]}) with CLI overrides applied."""
+    rules = [dict(rule) for rule in FILTER_RULES]
+    if path:
+        p = Path(path)
+        if not p.exists():
+            print(f"ERROR: Filters file not found: {path}", file=sys.stderr)
+            sys.exit(1)
+        with p.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        rules = data.get("rules", []) if isinstance(data, dict) else data
+    for name, value in (("lang", lang), ("min_likes", min_likes)):
+        if value is None:
+            continue
+        for rule in rules:
+            if rule["rule"] == name:
+                rule["value"] = value
+                rule["enabled"] = True
+                break
         else:
-            passed.append(tweet)
+            rules.append({"rule": name, "value": value})
+    return rules
+
+
+def filter_stats_path(directory: Path, user_id: str) -> Path:
+    return directory / f"filter-stats-{user_id}.json"
+
+
+def load_filter_history(directory: Path, user_id: str) -> dict:
+    try:
+        with filter_stats_path(directory, user_id).open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def apply_filters(
+    tweets: list[dict], chain: FilterChain, seen: dict[str, str] | None = None
+) -> tuple[list[dict], list[dict]]:
+    """Apply the compiled rule chain. Returns (passed, skipped) lists.
 
+    `seen` maps tweet ids already handled in an earlier run to their stored
+    status (see TweetStore.known); those tweets are skipped first.
+    """
+    return chain.apply(tweets, seen)
+
+
+def filter_page(
+    tweets: list[dict], chain: FilterChain, store: TweetStore | None = None
+) -> tuple[list[dict], list[dict]]:
+    """apply_filters with one indexed store lookup and one upsert per page.
+
+    Only rejected tweets are recorded here. Passed tweets are recorded by
+    emit_results once the output has been written, so a run that fails
+    later (quota, HTTP error) does not mark tweets nobody saw as seen.
+    """
+    if not store:
+        return apply_filters(tweets, chain)
+    passed, skipped = apply_filters(tweets, chain, store.known([t["id"] for t in tweets]))
+    by_id = {t["id"]: t for t in tweets}
+    store.record_fetch(
+        [],
+        [(by_id[s["tweet_id"]], s["reason"]) for s in skipped if not s["reason"].startswith("seen:")],
+    )
     return passed, skipped
 
 
-def format_tweet(tweet: dict) -> dict:
-    """Format a tweet for agent consumption."""
-    metrics = tweet.get("public_metrics", {})
-    author = tweet.get("_author", {})
-    return {
-        "tweet_id": tweet["id"],
-        "text": tweet.get("text", ""),
-        "author_id": tweet.get("author_id", ""),
-        "author_username": author.get("username", ""),
-        "author_name": author.get("name", ""),
-        "author_followers": author.get("followers_count", 0),
-        "lang": tweet.get("lang", ""),
-        "likes": metrics.get("like_count", 0),
-        "retweets": metrics.get("retweet_count", 0),
-        "replies": metrics.get("reply_count", 0),
-        "created_at": tweet.get("created_at", ""),
-        "is_quote": is_quote(tweet),
-    }
+def parse_fields(spec: str | None) -> list[str]:
+    """Validate a comma-separated --fields list; tweet_id is always included."""
+    if not spec:
+        return DEFAULT_FIELDS
+    fields = [f.strip() for f in spec.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in OUTPUT_FIELDS]
+    if unknown:
+        print(
+            f"ERROR: Unknown --fields: {', '.join(unknown)} (available: {', '.join(OUTPUT_FIELDS)})",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    return list(dict.fromkeys(["tweet_id", *fields]))
+
+
+def request_fields(
+    fields: list[str], chain: FilterChain, dedup: bool, hydrate: bool = False, store: bool = False, merge: bool = False
+) -> tuple[set[str], set[str]]:
+    """tweet.fields/user.fields needed for the output fields, the enabled filters, dedup and hydration.
+
+    With `store`, the tweet store's indexed columns are always requested, and
+    with `merge`, the created_at merge key; --fields only projects the output.
+    """
+    tweet_fields, user_fields = chain.required_fields()
+    for name in fields:
+        tweet_fields.update(OUTPUT_FIELDS[name][1])
+        user_fields.update(OUTPUT_FIELDS[name][2])
+    if dedup:
+        tweet_fields.update(("text", "public_metrics"))
+    if hydrate:
+        tweet_fields.add("referenced_tweets")
+    if store:
+        tweet_fields.update(STORE_FIELDS)
+    if merge:
+        tweet_fields.add("created_at")
+    if user_fields:
+        tweet_fields.add("author_id")
+    return tweet_fields, user_fields
+
+
+def format_tweet(tweet: dict, fields: list[str] | None = None) -> dict:
+    """Format a tweet for agent consumption, keeping only `fields` (default: all)."""
+    result = {name: OUTPUT_FIELDS[name][0](tweet) for name in fields or DEFAULT_FIELDS}
+    if tweet.get("_duplicates"):
+        result["cluster_size"] = 1 + len(tweet["_duplicates"])
+    if "_sources" in tweet:
+        result["sources"] = tweet["_sources"]
+    if "_referenced" in tweet:
+        result["referenced"] = tweet["_referenced"]
+    return result
+
+
+def advance_cursor(directory: Path, user_id: str, since_id: str | None, meta: dict, full: bool = False) -> dict:
+    """Save the cursor after a run and describe it for the output.
+
+    A finished window moves since_id to its newest id. A truncated one keeps
+    since_id and saves the window as `pending`, so the next run reads the
+    rest of it first; this includes runs stopped by the quota governor or a
+    429. Without a since_id there is no gap to fill: a first run that used
+    its whole page budget starts the cursor at its newest tweet, while a
+    quota-stopped first run and a truncated --full run leave the saved
+    cursor as it was.
+    """
+    # Newest id of the window being read: the resumed one, or this run's head
+    newest = meta.get("window_newest_id") or meta.get("newest_id")
+    truncated = meta.get("truncated", False)
+    result = {"since_id": since_id, "newest_id": newest or since_id, "truncated": truncated}
+    if truncated and meta.get("next_token") and newest and (since_id or full or meta.get("stopped")):
+        if since_id:
+            pending = {"newest_id": newest, "pagination_token": meta["next_token"]}
+            save_cursor(directory, user_id, since_id, pending)
+            result["pending"] = pending
+            result["newest_id"] = since_id
+        return result
+    if newest and (not since_id or int(newest) > int(since_id)):
+        save_cursor(directory, user_id, newest)
+    return result
+
+
+def run_quota(quota: Quota, meta: dict) -> dict:
+    """Persist the quota snapshot and describe it for the output."""
+    quota.save()
+    return {**quota.summary(), "stopped": meta.get("stopped")}
+
+
+def dumps(obj, compact: bool = False) -> str:
+    if compact:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def output_size(size: int) -> dict:
+    return {"bytes": size, "est_tokens": math.ceil(size / BYTES_PER_TOKEN)}
+
+
+def columns(fields: list[str], dedup: bool, sources: bool = False, referenced: bool = False) -> list[str]:
+    extra = [name for name, on in (("cluster_size", dedup), ("sources", sources), ("referenced", referenced)) if on]
+    return [*fields, *extra]
+
+
+def as_row(formatted: dict, names: list[str]) -> list:
+    return [formatted.get(name, 1 if name == "cluster_size" else None) for name in names]
+
+
+def emit_line(obj, compact: bool = False, out=None) -> int:
+    """Write one NDJSON line and flush so readers see it immediately. Returns its size in bytes."""
+    out = out or sys.stdout
+    line = dumps(obj, compact) + "\n"
+    out.write(line)
+    out.flush()
+    return len(line.encode("utf-8"))
 
 
 def main():
     parser = argparse.ArgumentParser(description="Fetch X home timeline with pre-filters")
-    parser.add_argument("--env", required=True, help="Path to .env file with OAuth credentials")
-    parser.add_argument("--count", type=int, default=50, help="Number of raw tweets to fetch (max 100)")
-    parser.add_argument("--lang", default=DEFAULTS["language"], help=f"Language filter (default: {DEFAULTS['language']})")
-    parser.add_argument("--min-likes", type=int, default=DEFAULTS["min_likes"], help=f"Minimum likes filter (default: {DEFAULTS['min_likes']})")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--env", help="Path to .env file with OAuth credentials")
+    target.add_argument("--accounts", nargs="+", metavar="ENV_OR_DIR", help="Fetch several accounts concurrently (.env files or workspace roots)")
+    parser.add_argument("--out-dir", help="With --accounts: directory for timeline-<X_USER_ID>.json files (default: output/ in each workspace)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULTS["concurrency"], help=f"With --accounts: accounts fetched at once (default: {DEFAULTS['concurrency']})")
+    parser.add_argument("--source", action="append", metavar="SPEC", help="Candidate source: home (default), list:<list id> or search:<query>; repeat to merge several")
+    parser.add_argument("--count", type=int, default=50, help="Number of raw tweets to fetch per source (pages of up to 100)")
+    parser.add_argument("--max-pages", type=int, default=DEFAULTS["max_pages"], help=f"Maximum pages to request (default: {DEFAULTS['max_pages']})")
+    parser.add_argument("--ndjson", action="store_true", help="Stream one JSON line per passed tweet, then a summary line")
+    parser.add_argument("--full", action="store_true", help="Ignore the saved since_id cursor and read from the newest tweet")
+    parser.add_argument("--state-dir", help=f"Root for per-account state; each account uses <dir>/<X_USER_ID>/ for its cursor, quota snapshot and tweet store (default: {STATE_DIR_NAME}/ next to --env)")
+    parser.add_argument("--wait-for-reset", action="store_true", help="Sleep until the rate-limit window resets instead of stopping early")
+    parser.add_argument("--max-wait", type=float, default=DEFAULTS["max_wait_seconds"], help=f"Longest reset wait in seconds (default: {DEFAULTS['max_wait_seconds']})")
+    parser.add_argument("--no-store", action="store_true", help="Do not read or update the local tweet store")
+    parser.add_argument("--no-dedup", action="store_true", help="Do not collapse near-duplicate tweets")
+    parser.add_argument("--dedup-threshold", type=float, default=DEFAULT_THRESHOLD, help=f"Estimated Jaccard similarity that counts as a near duplicate (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--fields", help=f"Comma-separated output fields; also limits the API request (default: all of {','.join(OUTPUT_FIELDS)})")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="json", help="json (indented), compact (no indentation, skipped reasons as counts) or columnar (compact, field names listed once)")
+    parser.add_argument("--filters", help="JSON file with the filter rule list (default: built-in FILTER_RULES)")
+    parser.add_argument("--lang", help=f"Language filter (default: {DEFAULTS['language']})")
+    parser.add_argument("--min-likes", type=int, help=f"Minimum likes filter (default: {DEFAULTS['min_likes']})")
+    parser.add_argument("--hydrate", action="store_true", help="Attach the text and author of quoted / replied-to tweets (batched lookups, cached in the tweet store)")
     args = parser.parse_args()
 
+    if args.accounts:
+        sys.exit(asyncio.run(fetch_accounts(args)))
+
     # Load env and auth
     load_env(args.env)
-    auth = get_oauth()
+    run_account(args, os.environ, args.env, get_session(), sys.stdout)
+
 
-    user_id = os.getenv("X_USER_ID")
+def run_account(args, env, env_path: str, session: requests.Session, out, directory: Path | None = None) -> dict:
+    """Fetch, filter and write the output for one account. Returns its counters."""
+    auth = get_oauth(env)
+
+    user_id = env.get("X_USER_ID")
     if not user_id:
         print("ERROR: X_USER_ID not set in environment.", file=sys.stderr)
         sys.exit(2)
 
-    # Fetch
-    raw_tweets = fetch_home_timeline(auth, user_id, args.count)
+    directory = directory or state_dir(env_path, user_id, args.state_dir)
+    filter_history = load_filter_history(directory, user_id)
+    try:
+        chain = FilterChain(load_rules(args.filters, args.lang, args.min_likes), filter_history)
+    except (KeyError, ValueError, re.error) as e:
+        print(f"ERROR: Invalid filter rules: {e}", file=sys.stderr)
+        sys.exit(1)
+    previous = {} if args.full else load_cursor(directory, user_id)
+    since_id = previous.get("since_id")
+    if previous.get("pending"):
+        print(f"Resuming unfinished window down to since_id {since_id}.", file=sys.stderr)
+    fields = parse_fields(args.fields)
+    sources = [parse_source(spec) for spec in dict.fromkeys(args.source or ["home"])]
+    multi = sources != [parse_source("home")]
+    tweet_fields, user_fields = request_fields(
+        fields, chain, not args.no_dedup, args.hydrate, store=not args.no_store, merge=multi
+    )
+
+    # One page stream per source, each with its own quota and progress
+    metas = {src["name"]: {} for src in sources}
+    quotas = {src["name"]: Quota.load(quota_path(directory, user_id, src)) for src in sources}
+    streams = []
+    for src in sources:
+        quota = quotas[src["name"]]
+        max_pages = args.max_pages if args.wait_for_reset else quota.page_budget(args.max_pages)
+        if max_pages < args.max_pages:
+            print(f"Quota snapshot ({src['name']}): {quota.remaining} requests left, page budget {max_pages}.", file=sys.stderr)
+        streams.append((src["name"], fetch_timeline_pages(
+            auth, user_id, args.count, max(1, max_pages),
+            session=session, since_id=since_id if src["kind"] == "home" else None,
+            resume=previous.get("pending") if src["kind"] == "home" else None,
+            meta=metas[src["name"]], quota=quota,
+            wait_for_reset=args.wait_for_reset, max_wait=args.max_wait,
+            fields=(tweet_fields, user_fields), source=src,
+        )))
+    pages = merge_sources(streams, metas) if multi else streams[0][1]
+    # The cursor follows the home timeline; without it there is nothing to advance
+    primary = "home" if "home" in metas else sources[0]["name"]
+    meta = metas["home"] if "home" in metas else {}
+
+    def source_report() -> dict:
+        return {
+            "sources": {
+                name: {
+                    "pages": metas[name].get("pages", 0),
+                    "truncated": metas[name].get("truncated", False),
+                    **({"error": metas[name]["error"]} if metas[name].get("error") else {}),
+                    "quota": run_quota(quotas[name], metas[name]),
+                }
+                for name in metas
+            }
+        } if multi else {}
+
+    store = None if args.no_store else TweetStore(directory / DB_NAME)
+    hydrator = Hydrator(auth, session, store) if args.hydrate else None
+    try:
+        counts = emit_results(
+            args, pages, fields, chain, store, directory, user_id, since_id, meta, quotas[primary], out,
+            sources=multi, report=source_report, hydrator=hydrator,
+        )
+    finally:
+        if store:
+            store.close()
+    write_json_atomic(filter_stats_path(directory, user_id), chain.merged_history(filter_history))
+    return {"user_id": user_id, **counts, "quota": quotas[primary].summary()}
+
+
+def account_env_path(path: str) -> Path:
+    """An --accounts entry is a .env file or a workspace root containing one."""
+    p = Path(path)
+    return p / ".env" if p.is_dir() else p
+
+
+async def fetch_accounts(args) -> int:
+    """Fetch every --accounts entry concurrently; returns the process exit code."""
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+    # One pool for all accounts: at most `concurrency` connections in use at once
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(1, args.concurrency))
+    started = time.monotonic()
+
+    async def one(path: str) -> dict:
+        env_path = account_env_path(path)
+        report = {"env": str(env_path)}
+        async with semaphore:
+            account_started = time.monotonic()
+            try:
+                if not env_path.exists():
+                    raise FileNotFoundError(f".env file not found: {env_path}")
+                env = {k: v for k, v in dotenv_values(env_path).items() if v is not None}
+                user_id = env.get("X_USER_ID") or "unknown"
+                directory = state_dir(str(env_path), user_id, args.state_dir)
+                out_dir = Path(args.out_dir) if args.out_dir else env_path.resolve().parent / "output"
+                output = out_dir / f"timeline-{user_id}.{'ndjson' if args.ndjson else 'json'}"
+                report["output"] = str(output)
+                counts = await asyncio.to_thread(write_account, args, env, env_path, adapter, output, directory)
+                report.update(status="ok", **counts)
+            except SystemExit as e:
+                report.update(status="error", exit_code=e.code)
+            except Exception as e:
+                report.update(status="error", error=f"{type(e).__name__}: {e}")
+            report["seconds"] = round(time.monotonic() - account_started, 3)
+        if report["status"] != "ok":
+            print(f"ERROR: Account {report['env']} failed: {report.get('error', report.get('exit_code'))}", file=sys.stderr)
+        return report
+
+    reports = await asyncio.gather(*(one(path) for path in args.accounts))
+    adapter.close()
+    failed = sum(r["status"] != "ok" for r in reports)
+    json.dump(
+        {
+            "accounts": reports,
+            "ok": len(reports) - failed,
+            "failed": failed,
+            "seconds": round(time.monotonic() - started, 3),
+        },
+        sys.stdout,
+        ensure_ascii=False,
+        indent=2,
+    )
+    print()
+    return 6 if failed else 0
+
+
+def write_account(args, env: dict, env_path: Path, adapter: HTTPAdapter, output: Path, directory: Path) -> dict:
+    """run_account into `output` (via a temp file renamed into place on success)."""
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(f".{output.name}.tmp")
+    try:
+        with tmp.open("w", encoding="utf-8") as out:
+            counts = run_account(args, env, str(env_path), get_session(env, adapter), out, directory)
+        os.replace(tmp, output)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return counts
 
-    # Filter
-    passed, skipped = apply_filters(raw_tweets, args.lang, args.min_likes)
+
+def emit_results(
+    args, pages, fields, chain, store, directory, user_id, since_id, meta, quota, out=None,
+    sources: bool = False, report: Callable[[], dict] | None = None, hydrator: Hydrator | None = None,
+) -> dict:
+    """Filter the fetched pages and write the JSON (or NDJSON) output to `out`. Returns counters.
+
+    `report` adds extra summary fields once every page has been read.
+    `hydrator` attaches referenced tweets to the tweets that are kept.
+    Passed tweets are recorded in `store` in one transaction after the
+    output has been written.
+    """
+    out = out or sys.stdout
+    compact = args.format != "json"
+    names = columns(fields, not args.no_dedup, sources, hydrator is not None)
+    if args.ndjson:
+        # Filter and emit page by page; only counters, LSH signatures and the
+        # passed tweets still to be recorded in the store are kept. A near
+        # duplicate of an already emitted tweet is dropped, so the first
+        # tweet of each cluster is the one kept.
+        fetched = passed_count = written = 0
+        shown = []
+        # With --hydrate, kept tweets wait here until their referenced ids
+        # fill a LOOKUP_BATCH (or the last page has been read)
+        held = []
+        reasons = Counter()
+        index = None if args.no_dedup else NearDuplicateIndex(args.dedup_threshold)
+        if args.format == "columnar":
+            written += emit_line({"fields": names}, compact, out)
+
+        def emit(tweets: list[dict]) -> None:
+            nonlocal passed_count, written
+            for tweet in tweets:
+                passed_count += 1
+                formatted = format_tweet(tweet, fields)
+                written += emit_line(as_row(formatted, names) if args.format == "columnar" else formatted, compact, out)
+
+        for page in pages:
+            passed, skipped = filter_page(page, chain, store)
+            if store:
+                shown.extend(passed)
+            fetched += len(page)
+            reasons.update(entry["reason"].split(":")[0] for entry in skipped)
+            kept = []
+            for tweet in passed:
+                if index and index.add(tweet):
+                    reasons["near_duplicate"] += 1
+                    continue
+                kept.append(tweet)
+            if hydrator:
+                hydrator.add(kept)
+                hydrator.lookup_queued(full_only=True)
+                held.extend(kept)
+                ready = 0
+                while ready < len(held) and hydrator.ready(held[ready]):
+                    ready += 1
+                kept, held = held[:ready], held[ready:]
+                hydrator.attach(kept)
+            emit(kept)
+        if held:
+            hydrator.lookup_queued()
+            hydrator.attach(held)
+            emit(held)
+        print(f"Output: {written} bytes of tweets (~{output_size(written)['est_tokens']} tokens)", file=sys.stderr)
+        emit_line({
+            "summary": {
+                "fetched": fetched,
+                "passed": passed_count,
+                "skipped_count": sum(reasons.values()),
+                "skipped_by_reason": dict(reasons),
+                "filters": chain.summary(),
+                **({"near_duplicates": index.summary()} if index else {}),
+                **({"hydration": hydrator.summary()} if hydrator else {}),
+                "cursor": advance_cursor(directory, user_id, since_id, meta, args.full),
+                "quota": run_quota(quota, meta),
+                **(report() if report else {}),
+                "output_size": output_size(written),
+            }
+        }, compact, out)
+        out.flush()
+        if store:
+            store.record_fetch(shown, [])
+        return {"fetched": fetched, "passed": passed_count}
+
+    # Fetch and filter
+    raw_tweets, passed, skipped = [], [], []
+    for page in pages:
+        page_passed, page_skipped = filter_page(page, chain, store)
+        raw_tweets.extend(page)
+        passed.extend(page_passed)
+        skipped.extend(page_skipped)
+    shown = list(passed)
+
+    # Collapse near duplicates, keeping the most-engaged tweet of each cluster
+    duplicates = None
+    if not args.no_dedup:
+        passed, duplicates = collapse(passed, args.dedup_threshold)
+        for tweet in passed:
+            skipped.extend({"tweet_id": dup, "reason": f"near_duplicate:{tweet['id']}"} for dup in tweet.get("_duplicates", ()))
+
+    # Attach quoted / replied-to tweets in one or two batched lookups
+    if hydrator:
+        hydrator(passed)
 
     # Format output
+    tweets = [format_tweet(t, fields) for t in passed]
     result = {
         "fetched": len(raw_tweets),
         "passed": len(passed),
         "skipped_count": len(skipped),
         "skipped_reasons": skipped,
-        "tweets": [format_tweet(t) for t in passed],
+        "filters": chain.summary(),
+        **({"near_duplicates": duplicates} if duplicates else {}),
+        **({"hydration": hydrator.summary()} if hydrator else {}),
+        "tweets": tweets,
+        "cursor": advance_cursor(directory, user_id, since_id, meta, args.full),
+        "quota": run_quota(quota, meta),
+        **(report() if report else {}),
     }
+    if compact:
+        del result["skipped_reasons"]
+        result["skipped_by_reason"] = dict(Counter(entry["reason"].split(":")[0] for entry in skipped))
+    if args.format == "columnar":
+        result["tweets"] = {"fields": names, "rows": [as_row(t, names) for t in tweets]}
 
-    json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
-    print()  # trailing newline
+    # Size of everything but the size report itself
+    body = json.dumps(result, ensure_ascii=False, indent=None if compact else 2, separators=(",", ":") if compact else None)
+    result["output_size"] = output_size(len(body.encode("utf-8")))
+    print(f"Output: {result['output_size']['bytes']} bytes (~{result['output_size']['est_tokens']} tokens)", file=sys.stderr)
+
+    if compact:
+        out.write(dumps(result, compact=True))
+    else:
+        json.dump(result, out, ensure_ascii=False, indent=2)
+    out.write("\n")  # trailing newline
+    out.flush()
+    if store:
+        store.record_fetch(shown, [])
+    return {"fetched": len(raw_tweets), "passed": len(passed)}
 
 
 if __name__ == "__main__":
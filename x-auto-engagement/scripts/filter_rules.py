@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+filter_rules.py - Declarative pre-filter rules for fetch_timeline.py.
+
+Filters are a list of rule configs, for example:
+
+    [
+        {"rule": "retweet"},
+        {"rule": "lang", "value": "en"},
+        {"rule": "min_likes", "value": 5},
+        {"rule": "deny_keywords", "value": ["giveaway", "airdrop"]},
+        {"rule": "max_followers", "value": 1000000, "enabled": false}
+    ]
+
+FilterChain compiles each enabled rule into a predicate that returns a skip
+reason or None. Keyword and regex lists are each compiled into one pattern.
+Every tweet runs through the whole chain until a rule rejects it, so no
+rule is unreachable. Rules are ordered by cost / rejection rate: cheap
+field checks run before text scans, and rules that rejected more tweets in
+earlier runs move forward. The chain counts evaluations, rejections and
+time per rule.
+"""
+from __future__ import annotations
+
+import re
+import time
+from typing import Callable
+
+# Relative per-tweet cost: field lookups < text checks < regex scans
+RULE_COSTS = {
+    "seen": 0.5,
+    "retweet": 1,
+    "reply": 1,
+    "lang": 1,
+    "min_likes": 1,
+    "min_followers": 1,
+    "max_followers": 1,
+    "media_only": 2,
+    "deny_keywords": 4,
+    "deny_regex": 5,
+}
+
+# API fields each rule reads: (tweet.fields, user.fields)
+RULE_FIELDS = {
+    "seen": ((), ()),
+    "retweet": (("referenced_tweets",), ()),
+    "reply": (("referenced_tweets",), ()),
+    "lang": (("lang",), ()),
+    "min_likes": (("public_metrics",), ()),
+    "min_followers": (("author_id",), ("public_metrics",)),
+    "max_followers": (("author_id",), ("public_metrics",)),
+    "media_only": (("text",), ()),
+    "deny_keywords": (("text",), ()),
+    "deny_regex": (("text",), ()),
+}
+
+# Rejection rate assumed for rules with no history yet
+DEFAULT_REJECT_RATE = 0.1
+
+
+def _ref_types(tweet: dict) -> set[str]:
+    return {r.get("type") for r in tweet.get("referenced_tweets", [])}
+
+
+def _followers(tweet: dict) -> int:
+    return tweet.get("_author", {}).get("followers_count", 0)
+
+
+def _compile_rule(name: str, value) -> Callable[[dict], str | None] | None:
+    """Return a predicate for one rule, or None if the config disables it."""
+    if name == "retweet":
+        return lambda t: "retweet" if "retweeted" in _ref_types(t) else None
+    if name == "reply":
+        return lambda t: "reply" if "replied_to" in _ref_types(t) else None
+    if name == "lang":
+        if not value:
+            return None
+        return lambda t: None if t.get("lang", "") == value else f"language:{t.get('lang', 'unknown')}"
+    if name == "min_likes":
+        if not value or value <= 0:
+            return None
+
+        def min_likes(t):
+            likes = t.get("public_metrics", {}).get("like_count", 0)
+            return f"min_likes:{likes}<{value}" if likes < value else None
+        return min_likes
+    if name == "min_followers":
+        if not value or value <= 0:
+            return None
+        return lambda t: f"min_followers:{_followers(t)}<{value}" if _followers(t) < value else None
+    if name == "max_followers":
+        if value is None:
+            return None
+        return lambda t: f"max_followers:{_followers(t)}>{value}" if _followers(t) > value else None
+    if name == "media_only":
+        def media_only(t):
+            text = t.get("text", "").strip()
+            return "media_only" if len(text) < 20 and ("https://t.co/" in text or text == "") else None
+        return media_only
+    if name == "deny_keywords":
+        if not value:
+            return None
+        pattern = re.compile("|".join(re.escape(k) for k in value), re.IGNORECASE)
+
+        def deny_keywords(t):
+            match = pattern.search(t.get("text", ""))
+            return f"deny_keyword:{match.group(0).lower()}" if match else None
+        return deny_keywords
+    if name == "deny_regex":
+        if not value:
+            return None
+        patterns = [value] if isinstance(value, str) else value
+        pattern = re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+        def deny_regex(t):
+            match = pattern.search(t.get("text", ""))
+            return f"deny_regex:{match.group(0)[:40]}" if match else None
+        return deny_regex
+    raise ValueError(f"Unknown filter rule: {name}")
+
+
+class FilterChain:
+    """Compiled, ordered rule list with per-rule counters.
+
+    `history` is {rule: {"evaluated": n, "rejected": n}} from earlier runs and
+    is only used for ordering.
+    """
+
+    def __init__(self, rules: list[dict], history: dict | None = None):
+        history = history or {}
+        compiled = []
+        for config in rules:
+            name = config["rule"]
+            if name not in RULE_COSTS:
+                raise ValueError(f"Unknown filter rule: {name}")
+            if not config.get("enabled", True) or name == "seen":
+                continue
+            check = _compile_rule(name, config.get("value"))
+            if check:
+                compiled.append((name, check))
+
+        def rank(rule: tuple[str, Callable]) -> float:
+            past = history.get(rule[0], {})
+            rate = past["rejected"] / past["evaluated"] if past.get("evaluated") else DEFAULT_REJECT_RATE
+            return RULE_COSTS[rule[0]] / max(rate, 0.01)
+
+        self.rules = sorted(compiled, key=rank)
+        self.stats = {name: {"evaluated": 0, "rejected": 0, "seconds": 0.0} for name in ["seen", *(n for n, _ in self.rules)]}
+        self.seconds = 0.0
+
+    def order(self) -> list[str]:
+        return [name for name, _ in self.rules]
+
+    def required_fields(self) -> tuple[set[str], set[str]]:
+        """(tweet.fields, user.fields) the enabled rules need from the API."""
+        tweet_fields, user_fields = set(), set()
+        for name, _ in self.rules:
+            tweet_fields.update(RULE_FIELDS[name][0])
+            user_fields.update(RULE_FIELDS[name][1])
+        return tweet_fields, user_fields
+
+    def apply(self, tweets: list[dict], seen: dict[str, str] | None = None) -> tuple[list[dict], list[dict]]:
+        """Run every tweet through the chain. Returns (passed, skipped) lists.
+
+        `seen` maps ids handled in an earlier run to their stored status; those
+        are skipped before any other rule.
+        """
+        passed = []
+        skipped = []
+        seen = seen or {}
+        stats = self.stats
+        clock = time.perf_counter
+        started = clock()
+
+        for tweet in tweets:
+            reason = None
+            if seen:
+                stats["seen"]["evaluated"] += 1
+                status = seen.get(tweet["id"])
+                if status:
+                    stats["seen"]["rejected"] += 1
+                    reason = f"seen:{status}"
+            if reason is None:
+                for name, check in self.rules:
+                    rule_started = clock()
+                    reason = check(tweet)
+                    entry = stats[name]
+                    entry["seconds"] += clock() - rule_started
+                    entry["evaluated"] += 1
+                    if reason:
+                        entry["rejected"] += 1
+                        break
+
+            if reason:
+                skipped.append({"tweet_id": tweet["id"], "reason": reason})
+            else:
+                passed.append(tweet)
+
+        self.seconds += clock() - started
+        return passed, skipped
+
+    def summary(self) -> dict:
+        """Per-rule counters in evaluation order, for the fetch output."""
+        return {
+            "order": self.order(),
+            "ms": round(self.seconds * 1000, 3),
+            "rules": {
+                name: {
+                    "evaluated": entry["evaluated"],
+                    "rejected": entry["rejected"],
+                    "ms": round(entry["seconds"] * 1000, 3),
+                }
+                for name, entry in self.stats.items()
+                if entry["evaluated"]
+            },
+        }
+
+    def merged_history(self, history: dict | None) -> dict:
+        """Add this run's counters to the saved history used for ordering."""
+        merged = {name: dict(counts) for name, counts in (history or {}).items()}
+        for name, entry in self.stats.items():
+            counts = merged.setdefault(name, {"evaluated": 0, "rejected": 0})
+            counts["evaluated"] += entry["evaluated"]
+            counts["rejected"] += entry["rejected"]
+        return merged
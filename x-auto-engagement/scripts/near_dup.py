@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+near_dup.py - Collapse near-duplicate tweets before agent review.
+
+Tweet text is normalized (t.co links and @mentions stripped, lowercased,
+punctuation and whitespace collapsed), cut into character 5-gram shingles
+and fingerprinted with a 64-value MinHash (one 64-bit hash per shingle,
+XORed with 64 fixed random masks). Locality-sensitive hashing
+(16 bands of 4 rows) finds candidate pairs without comparing every tweet
+against every other. A candidate joins a cluster only if its estimated
+Jaccard similarity to a member is at least the threshold.
+
+collapse() keeps the most-engaged tweet of each cluster. NearDuplicateIndex
+does the same incrementally for streaming output, where the first tweet
+of a cluster is kept.
+"""
+from __future__ import annotations
+
+import hashlib
+import random
+import re
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE = 5
+DEFAULT_THRESHOLD = 0.6
+
+_rng = random.Random(0x5EED)
+_MASKS = [_rng.getrandbits(64) for _ in range(NUM_PERM)]
+
+_LINK = re.compile(r"https?://t\.co/\S+")
+_MENTION = re.compile(r"@\w+")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(text: str) -> str:
+    text = _MENTION.sub(" ", _LINK.sub(" ", text.lower()))
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def minhash(text: str) -> tuple[int, ...] | None:
+    """MinHash signature of normalized text, or None if nothing is left to compare."""
+    norm = normalize(text)
+    if not norm:
+        return None
+    shingles = {norm[i:i + SHINGLE] for i in range(max(1, len(norm) - SHINGLE + 1))}
+    hashes = [_hash64(s) for s in shingles]
+    return tuple(min(map(mask.__xor__, hashes)) for mask in _MASKS)
+
+
+def similarity(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def _bands(signature: tuple[int, ...]) -> list[tuple]:
+    return [(band, signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+
+def engagement(tweet: dict) -> int:
+    metrics = tweet.get("public_metrics", {})
+    return (
+        metrics.get("like_count", 0)
+        + 2 * metrics.get("retweet_count", 0)
+        + 2 * metrics.get("quote_count", 0)
+        + metrics.get("reply_count", 0)
+    )
+
+
+class NearDuplicateIndex:
+    """Incremental LSH index; add() reports which kept tweet a new one duplicates."""
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.buckets: dict[tuple, list[str]] = {}
+        self.signatures: dict[str, tuple[int, ...]] = {}
+        self.sizes: dict[str, int] = {}
+
+    def match(self, signature: tuple[int, ...]) -> str | None:
+        candidates = []
+        for key in _bands(signature):
+            candidates.extend(self.buckets.get(key, ()))
+        best, best_sim = None, self.threshold
+        for tweet_id in dict.fromkeys(candidates):
+            sim = similarity(signature, self.signatures[tweet_id])
+            if sim >= best_sim:
+                best, best_sim = tweet_id, sim
+        return best
+
+    def add(self, tweet: dict) -> str | None:
+        """Index `tweet` and return None, or return the id of the kept tweet it duplicates."""
+        signature = minhash(tweet.get("text", ""))
+        if signature is None:
+            return None
+        duplicate_of = self.match(signature)
+        if duplicate_of:
+            self.sizes[duplicate_of] += 1
+            return duplicate_of
+        self.signatures[tweet["id"]] = signature
+        self.sizes[tweet["id"]] = 1
+        for key in _bands(signature):
+            self.buckets.setdefault(key, []).append(tweet["id"])
+        return None
+
+    def summary(self) -> dict:
+        sizes = sorted((size for size in self.sizes.values() if size > 1), reverse=True)
+        return {"clusters": len(sizes), "collapsed": sum(sizes) - len(sizes), "cluster_sizes": sizes}
+
+
+def collapse(tweets: list[dict], threshold: float = DEFAULT_THRESHOLD) -> tuple[list[dict], dict]:
+    """Keep the most-engaged tweet of each near-duplicate cluster.
+
+    Returns (kept, summary); kept tweets stay in input order and carry
+    `_duplicates` (ids of the collapsed tweets) when their cluster has more
+    than one member.
+    """
+    # Visit the most-engaged tweets first so each becomes its cluster's representative
+    index = NearDuplicateIndex(threshold)
+    members: dict[str, list[str]] = {}
+    for tweet in sorted(tweets, key=engagement, reverse=True):
+        duplicate_of = index.add(tweet)
+        if duplicate_of:
+            members.setdefault(duplicate_of, []).append(tweet["id"])
+        else:
+            members.setdefault(tweet["id"], [])
+
+    kept = []
+    for tweet in tweets:
+        if tweet["id"] not in members:
+            continue
+        if members[tweet["id"]]:
+            tweet["_duplicates"] = members[tweet["id"]]
+        kept.append(tweet)
+    return kept, index.summary()
@@ -6,8 +6,13 @@ Reads OAuth 1.0a credentials from .env. For each comment, likes the tweet
 first then posts the reply. Respects delays between posts to avoid rate
 limiting. Uses hardcoded defaults with optional CLI overrides.
 
+Results (liked, replied, reply_id) are recorded in the local tweet store
+shared with fetch_timeline.py, and tweets that already have a recorded
+reply are skipped so the same tweet is never replied to twice.
+
 Usage:
     python3 publish.py --comments <json-file> --env <path> [--max <n>] [--min-delay <s>] [--max-delay <s>]
+                       [--state-dir <path>] [--no-store]
 """
 from __future__ import annotations
 
@@ -24,6 +29,8 @@ import requests
 from dotenv import load_dotenv
 from requests_oauthlib import OAuth1
 
+from tweet_store import DB_NAME, STATE_DIR_NAME, TweetStore, state_dir
+
 
 API_BASE = "https://api.x.com/2"
 
@@ -120,6 +127,8 @@ def main():
     parser.add_argument("--max", type=int, default=DEFAULTS["max_per_batch"], help=f"Max comments per batch (default: {DEFAULTS['max_per_batch']})")
     parser.add_argument("--min-delay", type=float, default=DEFAULTS["min_delay_seconds"], help=f"Min delay between posts in seconds (default: {DEFAULTS['min_delay_seconds']})")
     parser.add_argument("--max-delay", type=float, default=DEFAULTS["max_delay_seconds"], help=f"Max delay between posts in seconds (default: {DEFAULTS['max_delay_seconds']})")
+    parser.add_argument("--state-dir", help=f"Root for per-account state; the tweet store is <dir>/<X_USER_ID>/tweets.db (default: {STATE_DIR_NAME}/ next to --env)")
+    parser.add_argument("--no-store", action="store_true", help="Do not check or record results in the local tweet store")
     args = parser.parse_args()
 
     # Load env
@@ -165,6 +174,8 @@ def main():
         )
         comments = comments[:max_per_batch]
 
+    store = None if args.no_store else TweetStore(state_dir(args.env, user_id, args.state_dir) / DB_NAME)
+
     # Publish loop
     results = []
     success_count = 0
@@ -183,6 +194,16 @@ def main():
             failure_count += 1
             continue
 
+        previous_reply = store.replied(tweet_id) if store else None
+        if previous_reply:
+            results.append({
+                "tweet_id": tweet_id,
+                "status": "skipped",
+                "reason": f"already replied (reply_id {previous_reply})",
+            })
+            print(f"WARNING: Already replied to tweet {tweet_id}, skipping.", file=sys.stderr)
+            continue
+
         entry = {
             "tweet_id": tweet_id,
             "comment": comment_text,
@@ -219,6 +240,12 @@ def main():
             )
 
         results.append(entry)
+        if store:
+            store.record_engagement(
+                tweet_id,
+                liked=bool(entry["like_result"] and entry["like_result"]["success"]),
+                reply_id=reply_res["reply_id"] if reply_res["success"] else None,
+            )
 
         # Delay between posts (skip after last one)
         if i < len(comments) - 1:
@@ -226,6 +253,9 @@ def main():
             print(f"Waiting {delay:.1f}s before next post...", file=sys.stderr)
             time.sleep(delay)
 
+    if store:
+        store.close()
+
     # Build report
     report = {
         "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
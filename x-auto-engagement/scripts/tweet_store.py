@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+tweet_store.py - Local SQLite store of seen and engaged tweets.
+
+Shared by fetch_timeline.py and publish.py. One row per tweet id records
+when it was first and last fetched, whether it passed the pre-filters or
+was rejected (and why), and what publish.py did with it (liked, replied,
+reply_id). Indexed on author_id and created_at.
+
+fetch_timeline.py looks up each page's ids in one query and drops tweets
+the agent has already been shown, rejected or engaged with. publish.py
+refuses to reply to a tweet that already has a recorded reply. Each run
+only touches the rows for the ids it fetched or published, so the cost
+of a run does not grow with the size of the history.
+
+A second table caches referenced (quoted / replied-to) tweets resolved by
+fetch_timeline.py --hydrate, so context is only requested from the API once.
+Ids the API reports as unavailable are cached too, as rows without text.
+
+state_dir() resolves the per-account state directory both scripts use.
+"""
+from __future__ import annotations
+
+import sqlite3
+import time
+from pathlib import Path
+
+DB_NAME = "tweets.db"
+# tweet.fields the indexed columns are filled from; requested even when --fields omits them
+STORE_FIELDS = ("author_id", "created_at")
+STATE_DIR_NAME = ".x-auto-engagement"
+
+# Row status values
+PASSED = "passed"
+REJECTED = "rejected"
+ENGAGED = "engaged"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    id          TEXT PRIMARY KEY,
+    author_id   TEXT,
+    created_at  TEXT,
+    lang        TEXT,
+    likes       INTEGER,
+    text        TEXT,
+    status      TEXT,
+    reason      TEXT,
+    first_seen  TEXT,
+    last_seen   TEXT,
+    liked       INTEGER NOT NULL DEFAULT 0,
+    replied     INTEGER NOT NULL DEFAULT 0,
+    reply_id    TEXT,
+    engaged_at  TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tweets_author_id ON tweets(author_id);
+CREATE INDEX IF NOT EXISTS idx_tweets_created_at ON tweets(created_at);
+CREATE TABLE IF NOT EXISTS referenced (
+    id               TEXT PRIMARY KEY,
+    author_id        TEXT,
+    author_username  TEXT,
+    author_name      TEXT,
+    created_at       TEXT,
+    text             TEXT,
+    fetched_at       TEXT
+);
+"""
+
+# SQLite's default limit on bound parameters is 999 on older builds
+_CHUNK = 500
+
+
+def state_dir(env_path: str | None, user_id: str, override: str | None = None) -> Path:
+    """Directory for per-account state files (cursor, quota, tweet store).
+
+    Default: .x-auto-engagement/ next to the .env file. With --state-dir,
+    each account gets its own <state-dir>/<X_USER_ID>/ subdirectory, in
+    every script and in single- and multi-account runs alike.
+    """
+    if override:
+        return Path(override) / user_id
+    base = Path(env_path).resolve().parent if env_path else Path.cwd()
+    return base / STATE_DIR_NAME
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+class TweetStore:
+    """Thin wrapper around the SQLite file; use as a context manager."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self) -> "TweetStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def known(self, tweet_ids: list[str]) -> dict[str, str]:
+        """Return {tweet_id: status} for the ids that already have a status."""
+        result = {}
+        for start in range(0, len(tweet_ids), _CHUNK):
+            chunk = tweet_ids[start:start + _CHUNK]
+            rows = self.conn.execute(
+                f"SELECT id, status FROM tweets WHERE id IN ({','.join('?' * len(chunk))}) AND status IS NOT NULL",
+                chunk,
+            )
+            result.update(rows)
+        return result
+
+    def record_fetch(self, passed: list[dict], rejected: list[tuple[dict, str]]) -> None:
+        """Upsert one page of filter results in a single transaction.
+
+        `rejected` holds (tweet, reason) pairs. An engaged tweet keeps its
+        status if it is fetched again.
+        """
+        now = _now()
+        rows = [self._row(tweet, PASSED, None, now) for tweet in passed]
+        rows += [self._row(tweet, REJECTED, reason, now) for tweet, reason in rejected]
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO tweets (id, author_id, created_at, lang, likes, text, status, reason, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    likes = excluded.likes,
+                    last_seen = excluded.last_seen,
+                    status = CASE WHEN tweets.status = 'engaged' THEN tweets.status ELSE excluded.status END,
+                    reason = CASE WHEN tweets.status = 'engaged' THEN tweets.reason ELSE excluded.reason END
+                """,
+                rows,
+            )
+
+    @staticmethod
+    def _row(tweet: dict, status: str, reason: str | None, now: str) -> tuple:
+        return (
+            tweet["id"],
+            tweet.get("author_id"),
+            tweet.get("created_at"),
+            tweet.get("lang"),
+            tweet.get("public_metrics", {}).get("like_count"),
+            tweet.get("text"),
+            status,
+            reason,
+            now,
+            now,
+        )
+
+    def referenced(self, tweet_ids: list[str]) -> dict[str, dict | None]:
+        """Return {tweet_id: {text, author_id, ...}} for ids with a cached text.
+
+        Ids cached as unavailable (deleted, protected) map to None. Falls
+        back to tweets fetched from a timeline, which have no author name.
+        """
+        result = {}
+        for start in range(0, len(tweet_ids), _CHUNK):
+            chunk = tweet_ids[start:start + _CHUNK]
+            marks = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT id, text, author_id, author_username, author_name, created_at FROM referenced WHERE id IN ({marks})",
+                chunk,
+            )
+            for row in rows:
+                # A row without text marks an id the API reported as unavailable
+                result[row[0]] = None if row[1] is None else dict(
+                    zip(("text", "author_id", "author_username", "author_name", "created_at"), row[1:])
+                )
+            missing = [tweet_id for tweet_id in chunk if tweet_id not in result]
+            if not missing:
+                continue
+            rows = self.conn.execute(
+                f"SELECT id, text, author_id, created_at FROM tweets WHERE id IN ({','.join('?' * len(missing))}) AND text IS NOT NULL",
+                missing,
+            )
+            for row in rows:
+                result[row[0]] = dict(zip(("text", "author_id", "created_at"), row[1:]))
+        return result
+
+    def record_referenced(self, tweets: dict[str, dict | None]) -> None:
+        """Cache resolved referenced tweets ({tweet_id: {text, author_id, ...}}).
+
+        A None value caches the id as unavailable, so it is not requested again.
+        """
+        now = _now()
+        rows = []
+        for tweet_id, tweet in tweets.items():
+            tweet = tweet or {}
+            rows.append((
+                tweet_id,
+                tweet.get("author_id"),
+                tweet.get("author_username"),
+                tweet.get("author_name"),
+                tweet.get("created_at"),
+                tweet.get("text"),
+                now,
+            ))
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT OR REPLACE INTO referenced (id, author_id, author_username, author_name, created_at, text, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+
+    def replied(self, tweet_id: str) -> str | None:
+        """Return the recorded reply id if we have already replied to tweet_id."""
+        row = self.conn.execute(
+            "SELECT reply_id FROM tweets WHERE id = ? AND replied = 1", (tweet_id,)
+        ).fetchone()
+        return (row[0] or "unknown") if row else None
+
+    def record_engagement(self, tweet_id: str, liked: bool, reply_id: str | None) -> None:
+        """Record a publish result; a successful reply marks the tweet engaged."""
+        now = _now()
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO tweets (id, status, first_seen, last_seen, liked, replied, reply_id, engaged_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    liked = MAX(tweets.liked, excluded.liked),
+                    replied = MAX(tweets.replied, excluded.replied),
+                    reply_id = COALESCE(excluded.reply_id, tweets.reply_id),
+                    status = CASE WHEN excluded.replied = 1 THEN 'engaged' ELSE tweets.status END,
+                    engaged_at = CASE WHEN excluded.replied = 1 THEN excluded.engaged_at ELSE tweets.engaged_at END
+                """,
+                (
+                    tweet_id,
+                    ENGAGED if reply_id else None,
+                    now,
+                    now,
+                    int(liked),
+                    int(bool(reply_id)),
+                    reply_id,
+                    now if reply_id else None,
+                ),
+            )